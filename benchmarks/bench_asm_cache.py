@@ -0,0 +1,38 @@
+# assemble() contra o cache de imagens em disco (src/assembler/cache.py):
+# 200 fontes de ~1000 linhas, montados do zero, depois lidos do cache
+# Uso: python -m benchmarks.bench_asm_cache
+import tempfile
+import time
+from src.assembler.cache import ImageCache
+from src.assembler.core import assemble
+
+def make_sources(n=200, blocks=120):
+    out = []
+    for k in range(n):
+        lines = [f"X: .DATA {0xF00 + k % 16} {k}"]
+        for i in range(blocks):
+            lines += [f"B{i}: LODD X", f"ADDD {k}", "STOD X", f"JZER B{(i + k) % blocks}",
+                      "PUSH", "LODL 0", "POP", "; comentario"]
+        out.append("\n".join(lines + ["HALT"]))
+    return out
+
+def timed(fn, srcs):
+    t = time.perf_counter()
+    for s in srcs: fn(s)
+    return time.perf_counter() - t
+
+def main():
+    srcs = make_sources()
+    with tempfile.TemporaryDirectory() as d:
+        cache = ImageCache(d)
+        t_asm = timed(assemble, srcs)
+        t_miss = timed(cache.assemble, srcs)
+        t_hit = min(timed(cache.assemble, srcs) for _ in range(3))
+        assert all(cache.assemble(s) == assemble(s) for s in srcs[:5])
+        print(f"{len(srcs)} fontes de {srcs[0].count(chr(10)) + 1} linhas ({cache.size() / 1024:.0f} KB no cache)")
+        print(f"  assemble():      {t_asm * 1000:7.1f} ms")
+        print(f"  cache (miss):    {t_miss * 1000:7.1f} ms (monta e grava)")
+        print(f"  cache (acerto):  {t_hit * 1000:7.1f} ms ({t_asm / t_hit:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# Custo dos breakpoints/watchpoints no Mic1CPU.run()
+# Uso: python -m benchmarks.bench_breakpoints
+import time
+from src.hardware.cpu import Mic1CPU
+from benchmarks.programs import load_loop
+
+def bench_run(mc, setup=None):
+    cpu = Mic1CPU()
+    cpu.mem.load_bin(mc)
+    if setup: setup(cpu.breakpoints)
+    t = time.perf_counter()
+    res = cpu.run()
+    return res.cycles, time.perf_counter() - t
+
+CASES = [
+    ("sem paradas", None),
+    ("breakpoint PC", lambda bp: bp.add(0xFFF)), # Nunca atingido: mede so o teste
+    ("watch R/W 0x800-0xEFF", lambda bp: bp.watch(0x800, 0xEFF, read=True, write=True)),
+    ("condicao SP", lambda bp: bp.add_cond("sp", 0)),
+]
+
+def main():
+    mc = load_loop()
+    # Melhor de 10, alternando (a maquina pode estar ocupada)
+    runs = [[bench_run(mc, s) for _, s in CASES] for _ in range(10)]
+    base = None
+    for i, (name, _) in enumerate(CASES):
+        n, t = min((r[i] for r in runs), key=lambda r: r[1])
+        extra = "" if base is None else f" - {(t / base - 1) * 100:+.0f}%"
+        base = base or t
+        print(f"{name:22} {n} instr em {t:.3f}s ({n / t:,.0f} instr/s){extra}")
+
+if __name__ == "__main__":
+    main()
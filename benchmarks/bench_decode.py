@@ -0,0 +1,90 @@
+# Compara a tabela de pre-decodificacao (64K entradas) com o despacho antigo
+# em dois niveis (dict por opcode + dict novo a cada instrucao EXT)
+# Uso: python -m benchmarks.bench_decode
+import time
+from src.common.constants import MASK_12BIT
+from src.common.opcodes import Opcode
+from src.hardware.cpu import Mic1CPU
+from benchmarks.programs import load_loop
+
+class LegacyDispatchCPU(Mic1CPU):
+    """CPU com o execute() antigo (_ops/_ext), so pra comparacao"""
+    def __init__(self):
+        super().__init__()
+        self._ops = {
+            Opcode.LODD: self._lodd, Opcode.STOD: self._stod,
+            Opcode.ADDD: self._addd, Opcode.SUBD: self._subd,
+            Opcode.JPOS: self._jpos, Opcode.JZER: self._jzer,
+            Opcode.JUMP: self._jump, Opcode.LOCO: self._loco_raw,
+            Opcode.LODL: self._lodl, Opcode.STOL: self._stol,
+            Opcode.ADDL: self._addl, Opcode.SUBL: self._subl,
+            Opcode.JNEG: self._jneg, Opcode.JNZE: self._jnze,
+            Opcode.CALL: self._call, Opcode.EXT:  self._ext
+        }
+
+    def execute(self):
+        if self.halted: return
+        op = self.curr_op
+        operand = self.mbr.value & MASK_12BIT
+        self.ctrl_sig = f"EXEC: {op:X}"
+        self._reset_bus()
+        if op in self._ops:
+            self._ops[op](operand)
+        else:
+            self.ctrl_sig = f"ERRO: Op Desconhecido {op}"
+        self.cycle += 1
+
+    def _loco_raw(self, addr):
+        self._loco(addr if not (addr & 0x800) else addr - 0x1000)
+
+    def _ext(self, func):
+        fns = {
+            0: self._halt, 1: self._pshi, 2: self._popi,
+            3: self._push, 4: self._pop, 5: self._retn,
+            6: self._swap, 7: self._insp, 8: self._desp
+        }
+        if func in fns: fns[func]()
+        else: self._nop(func)
+
+def bench_dispatch(cpu, words, reps=20):
+    # So o custo de decodificar + achar o handler (sem executar)
+    t = time.perf_counter()
+    if isinstance(cpu, LegacyDispatchCPU):
+        ops = cpu._ops
+        for _ in range(reps):
+            for w in words:
+                op, arg = w >> 12, w & MASK_12BIT
+                if op == Opcode.EXT:
+                    fns = {0: cpu._halt, 1: cpu._pshi, 2: cpu._popi,
+                           3: cpu._push, 4: cpu._pop, 5: cpu._retn,
+                           6: cpu._swap, 7: cpu._insp, 8: cpu._desp}
+                    fn = fns.get(arg, cpu._nop)
+                else:
+                    fn = ops[op]
+    else:
+        tab = cpu._decode_tab
+        for _ in range(reps):
+            for w in words:
+                fn, arg = tab[w]
+    return time.perf_counter() - t
+
+def bench_cycle_all(cls, mc):
+    cpu = cls()
+    cpu.mem.load_bin(mc)
+    t = time.perf_counter()
+    while not cpu.halted: cpu.cycle_all()
+    return cpu.cycle, time.perf_counter() - t
+
+def main():
+    words = list(range(0, 0x10000, 7))
+    t_old = bench_dispatch(LegacyDispatchCPU(), words)
+    t_new = bench_dispatch(Mic1CPU(), words)
+    print(f"Decodificacao ({len(words) * 20} palavras): antigo {t_old:.3f}s | tabela {t_new:.3f}s ({t_old / t_new:.1f}x)")
+
+    mc = load_loop()
+    n, t_old = bench_cycle_all(LegacyDispatchCPU, mc)
+    _, t_new = bench_cycle_all(Mic1CPU, mc)
+    print(f"cycle_all ({n} instr): antigo {t_old:.3f}s | tabela {t_new:.3f}s ({t_old / t_new:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Front end novo (src/assembler/frontend.py, um regex so pelo fonte inteiro)
+# contra o fluxo antigo clean_lines -> parse_data -> duas passadas com split(),
+# num fonte gerado de 4096 linhas; depois o mesmo fonte com varios erros
+# (o fluxo antigo para no primeiro, o novo acha todos)
+# Uso: python -m benchmarks.bench_frontend
+import time
+from src.assembler.core import assemble, clean_lines, parse_data
+from src.assembler.frontend import assemble_all, encode, split_instr
+
+def legacy_assemble(src):
+    # O assemble() de antes do front end novo
+    symbols, mc, lines, status = parse_data(clean_lines(src))
+    if status != "OK": return {}, status
+    curr = 0
+    temp = []
+    for lno, line in lines:
+        label, instr, op = split_instr(line)
+        if label is not None: symbols[label] = curr
+        if instr is None: continue
+        temp.append((instr, op, curr, lno))
+        curr += 1
+    for instr, op, addr, lno in temp:
+        try:
+            mc[addr] = encode(instr, op, addr, symbols, mc)
+        except ValueError as e:
+            return {}, f"Linha {lno}: {e}"
+    return mc, "OK"
+
+def big_source(n=4096):
+    # Blocos de 8 linhas: label, 6 instrucoes com comentario/numero/simbolo, linha vazia
+    out = ["; programa gerado", "X: .DATA 0xFF0 0", "Y: .DATA 0xFF1 1"]
+    i = 0
+    while len(out) + 8 <= n:
+        out += [f"B{i}: LODD X ; carrega", "    ADDD Y", "    STOD X", f"    LOCO {i % 4096}",
+                "    SUBD 0xFF1", f"    JZER B{i + 1}", "    push", ""]
+        i += 1
+    out += [f"B{i}: HALT"] + ["; fim"] * (n - len(out) - 1)
+    return "\n".join(out)
+
+def best(fn, src, n=7):
+    t = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn(src)
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+def main():
+    src = big_source()
+    assert legacy_assemble(src) == assemble(src) and assemble(src)[1] == "OK"
+    print(f"{src.count(chr(10)) + 1} linhas, {len(assemble(src)[0])} palavras")
+    t_old, t_new = best(legacy_assemble, src), best(assemble, src)
+    print(f"  fluxo antigo:   {t_old * 1000:6.2f} ms")
+    print(f"  front end novo: {t_new * 1000:6.2f} ms ({t_old / t_new:.1f}x)")
+
+    lines = src.splitlines()
+    for k in range(100, len(lines), 400): lines[k] = "    LODD NADA"
+    bad = "\n".join(lines)
+    res = assemble_all(bad)
+    assert legacy_assemble(bad)[1] == res.status
+    print(f"com {len(res.errors)} erros:")
+    print(f"  fluxo antigo (so o primeiro): {best(legacy_assemble, bad) * 1000:6.2f} ms")
+    print(f"  assemble_all (todos):         {best(assemble_all, bad) * 1000:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# assemble() do fonte inteiro contra o IncrementalAssembler depois de editar
+# uma linha, num programa gerado que ocupa quase toda a memoria
+# Uso: python -m benchmarks.bench_incremental
+import time
+from src.assembler.core import assemble
+from src.assembler.incremental import IncrementalAssembler
+
+def big_source(n=3900):
+    # Blocos de 8 instrucoes com label e desvio pro bloco seguinte
+    out = []
+    for i in range(n // 8):
+        out += [f"B{i}: LODD 0xF80", "ADDD 0xF81", "STOD 0xF80", "LOCO 7", "SUBD 0xF81",
+                "JZER B%d" % (i + 1), "PUSH", "POP"]
+    out += [f"B{n // 8}: HALT", "X: .DATA 0xF80 0", ".DATA 0xF81 1"]
+    return out
+
+def best(fn, n=5):
+    t = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+def main():
+    lines = big_source()
+    src = "\n".join(lines)
+    asm = IncrementalAssembler()
+    print(f"{len(lines)} linhas, montagem inicial: {best(lambda: IncrementalAssembler().update(src), 3) * 1000:.1f} ms")
+    print(f"assemble() do fonte inteiro:        {best(lambda: assemble(src)) * 1000:.1f} ms")
+    asm.update(src)
+
+    # Edicoes tipicas (cada uma desfaz a anterior, pra sempre ter mudanca)
+    mid = len(lines) // 2
+    def toggle_operand():
+        lines[mid] = "LOCO 9" if lines[mid] == "LOCO 7" else "LOCO 7"
+    def toggle_line(i):
+        def fn():
+            if lines[i] == "INSP": del lines[i]
+            else: lines.insert(i, "INSP")
+        return fn
+    while lines[mid] != "LOCO 7": mid += 1
+    edits = {
+        "operando de uma linha": toggle_operand,
+        "instrucao nova no meio": toggle_line(mid),
+        "instrucao nova no inicio": toggle_line(0),
+    }
+    for name, fn in edits.items():
+        def edit():
+            fn()
+            return asm.update("\n".join(lines))
+        t = best(edit, 6)
+        patch, msg = edit()
+        print(f"  {name:26s} {t * 1000:6.2f} ms  ({msg}, {len(patch or {})} palavras no patch)")
+
+if __name__ == "__main__":
+    main()
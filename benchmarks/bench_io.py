@@ -0,0 +1,67 @@
+# Custo da E/S mapeada em memoria no Mic1CPU.run(): programa que imprime 10000
+# inteiros, com a saida em bloco (padrao), escrevendo a cada STOD (buffer=1) e
+# sem dispositivo nenhum (o STOD cai na RAM)
+# Uso: python -m benchmarks.bench_io
+import io
+import time
+from src.assembler.core import assemble
+from src.hardware.cpu import Mic1CPU
+from src.hardware.devices import OUT_INT, OutputPort
+
+PRINT_SRC = f"""
+    LOCO 2000
+    STOD 400
+    LOCO 1
+    STOD 401
+Loop:
+    LODD 400
+    JZER Fim
+    STOD {OUT_INT}
+    STOD {OUT_INT}
+    STOD {OUT_INT}
+    STOD {OUT_INT}
+    STOD {OUT_INT}
+    LODD 400
+    SUBD 401
+    STOD 400
+    JUMP Loop
+Fim:
+    HALT
+"""
+
+class CountingIO(io.StringIO):
+    # Conta as chamadas de write (uma por bloco de saida)
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+def bench_run(mc, buffer, translate=False):
+    cpu = Mic1CPU()
+    cpu.mem.load_bin(mc)
+    port = cpu.mem.attach(OUT_INT - 1, OutputPort(CountingIO(), buffer)) if buffer else None
+    t = time.perf_counter()
+    res = cpu.run(translate=translate)
+    return res, time.perf_counter() - t, port
+
+def main():
+    mc, msg = assemble(PRINT_SRC)
+    if msg != "OK": raise RuntimeError(msg)
+    # Melhor de 5, alternando (a maquina pode estar ocupada)
+    for translate in (False, True):
+        best = {}
+        for _ in range(5):
+            for name, buffer in (("sem dispositivo", 0), ("saida em bloco", 4096), ("write por STOD", 1)):
+                res, t, port = bench_run(mc, buffer, translate)
+                best[name] = min(best.get(name, t), t)
+                if port is not None: writes = port.stream.writes
+        print(f"translate={translate}: {res.cycles} instrucoes")
+        for name, t in best.items():
+            print(f"  {name:16s} {t:.3f}s")
+    print(f"  (write por STOD: {writes} chamadas de write no stream)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# Custo do diario de execucao (Journal) no Mic1CPU.run() e velocidade do step back
+# Uso: python -m benchmarks.bench_journal
+import time
+from src.hardware.cpu import Mic1CPU
+from src.hardware.journal import Journal
+from benchmarks.programs import load_loop
+
+def bench_run(mc, journal):
+    cpu = Mic1CPU()
+    cpu.mem.load_bin(mc)
+    if journal: Journal(cpu)
+    t = time.perf_counter()
+    res = cpu.run()
+    return res.cycles, time.perf_counter() - t, cpu
+
+def main():
+    mc = load_loop()
+    # Melhor de 10, alternando (a maquina pode estar ocupada)
+    runs = [(bench_run(mc, False), bench_run(mc, True)) for _ in range(10)]
+    n, t1, _ = min((r[0] for r in runs), key=lambda r: r[1])
+    _, t2, cpu = min((r[1] for r in runs), key=lambda r: r[1])
+    print(f"run():              {n} instr em {t1:.3f}s ({n / t1:,.0f} instr/s)")
+    print(f"run() com Journal:  {n} instr em {t2:.3f}s ({n / t2:,.0f} instr/s) - +{(t2 / t1 - 1) * 100:.0f}%")
+
+    j = cpu.journal
+    k = 2000
+    t = time.perf_counter()
+    for _ in range(k): j.step_back()
+    t3 = time.perf_counter() - t
+    print(f"step_back():        {k} vezes em {t3:.3f}s ({t3 / k * 1e6:.0f} us cada)")
+    t = time.perf_counter()
+    j.goto(j.oldest + 1)
+    print(f"goto() pro inicio:  {time.perf_counter() - t:.4f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Roda o loop de exemplo no motor microprogramado (MicroMic1) e confere com a
+# Mic1CPU instrucao por instrucao
+# Uso: python -m benchmarks.bench_micro
+import time
+from src.hardware.cpu import Mic1CPU
+from src.hardware.microcode import MicroMic1
+from benchmarks.programs import load_loop
+
+def state(pc, sp, h, n, z, halted, cycle, mem):
+    caches = mem.i_cache.pack() + mem.d_cache.pack()
+    return (pc, sp, h, n, z, halted, cycle, mem.last_addr,
+            mem.i_cache.last_status, mem.d_cache.last_status, caches)
+
+def cross_check(mc):
+    cpu, micro = Mic1CPU(), MicroMic1()
+    cpu.mem.load_bin(mc)
+    micro.load_bin(mc)
+    i = 0
+    while not cpu.halted:
+        cpu.cycle_all()
+        micro.step()
+        i += 1
+        a = state(cpu.regs.pc, cpu.regs.sp, cpu.regs.h, cpu.alu.n, cpu.alu.z, cpu.halted, cpu.cycle, cpu.mem)
+        b = state(micro.pc, micro.sp, micro.h, micro.n, micro.z, micro.halted, micro.cycle, micro.mem)
+        if a != b or cpu.mem.ram != micro.mem.ram:
+            raise AssertionError(f"Diferenca na instrucao {i}: {a[:10]} != {b[:10]}")
+    return i
+
+def main():
+    mc = load_loop()
+    n = cross_check(mc)
+    print(f"Mic1CPU e MicroMic1 iguais em {n} instrucoes")
+
+    micro = MicroMic1()
+    micro.load_bin(mc)
+    t = time.perf_counter()
+    res = micro.run()
+    t = time.perf_counter() - t
+    print(f"MicroMic1.run(): {res.cycles} instr / {micro.micro_cycles} microinstr em {t:.3f}s "
+          f"({res.cycles / t:,.0f} instr/s, {micro.micro_cycles / t:,.0f} microinstr/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Otimizador peephole (src/assembler/peephole.py) num programa com a cara de
+# codigo gerado sem cuidado: STOD/LODD seguidos, desvio pra desvio e sobra
+# depois do JUMP. Mede o tempo do otimizador e roda as duas imagens lado a
+# lado (instrucoes, ciclos efetivos com o modelo de tempo e tempo do run())
+# Uso: python -m benchmarks.bench_peephole
+import time
+from src.assembler.core import assemble
+from src.assembler.peephole import compare, optimize, report
+from src.hardware.components import TimingConfig
+from src.hardware.cpu import Mic1CPU
+
+# Soma de 1 a N e contagem dos pares, ~36k instrucoes
+NAIVE_SRC = """
+    LOCO 0
+    STOD 400      ; soma
+    LODD 400
+    STOD 402      ; pares
+    LODD N
+    STOD 401      ; i
+    LODD 401
+Laco:
+    LODD 401
+    JZER Fim
+    JUMP Soma
+    LOCO 0        ; sobra
+Soma:
+    LODD 400
+    ADDD 401
+    STOD 400
+    LODD 400
+    LODD 401
+    SUBD Dois
+    JNEG Dec
+    JZER Par
+    JUMP Dec
+Par:
+    LODD 402
+    ADDD Um
+    STOD 402
+    LODD 402
+    JUMP Dec
+Dec:
+    LODD 401
+    SUBD Um
+    STOD 401
+    LODD 401
+    JUMP Volta
+Volta:
+    JUMP Laco
+Fim:
+    HALT
+Um:   .DATA 300 1
+Dois: .DATA 301 2
+N:    .DATA 302 2000
+"""
+
+def timed_run(mc, n=7):
+    best = None
+    for _ in range(n):
+        cpu = Mic1CPU()
+        cpu.mem.load_bin(mc)
+        t = time.perf_counter()
+        cpu.run()
+        best = min(best or 1e9, time.perf_counter() - t)
+    return best
+
+def main():
+    t = time.perf_counter()
+    for _ in range(100): res = optimize(NAIVE_SRC)
+    t_opt = (time.perf_counter() - t) / 100
+    t = time.perf_counter()
+    for _ in range(100): assemble(NAIVE_SRC)
+    t_asm = (time.perf_counter() - t) / 100
+    print(report(res, compare(res, timing=TimingConfig(0, 10, 100))))
+    print(f"  montagem:              {t_asm * 1000:7.2f} ms")
+    print(f"  montagem + otimizacao: {t_opt * 1000:7.2f} ms")
+    timed_run(res.original, n=1) # Aquece
+    t_orig, t_new = timed_run(res.original), timed_run(res.mc)
+    print(f"  run() original:        {t_orig * 1000:7.1f} ms")
+    print(f"  run() otimizado:       {t_new * 1000:7.1f} ms ({t_orig / t_new:.2f}x)")
+
+if __name__ == "__main__":
+    main()
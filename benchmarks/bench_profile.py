@@ -0,0 +1,45 @@
+# Custo do profiler por linha (src/hardware/profiler.py) no Mic1CPU.run():
+# mesmo programa desligado, ligado, ligado com a pilha de chamadas e com o
+# modelo de tempo; mais o tempo dos relatorios (hotspots, listagem e pilhas)
+# Uso: python -m benchmarks.bench_profile
+import time
+from src.assembler.core import assemble_with_info, source_map
+from src.hardware.components import TimingConfig
+from src.hardware.cpu import Mic1CPU
+from src.hardware.profiler import Profiler
+from benchmarks.programs import LOOP_SRC
+
+def timed_run(mc, profile, timing=None, n=7, stacks=False):
+    best = None
+    for _ in range(n):
+        cpu = Mic1CPU(timing=timing)
+        cpu.mem.load_bin(mc)
+        prof = Profiler(cpu, stacks=stacks) if profile else None
+        t = time.perf_counter()
+        res = cpu.run()
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    return best, res.cycles, prof
+
+def main():
+    mc, msg, symbols, lines = assemble_with_info(LOOP_SRC)
+    timed_run(mc, False, n=1) # Aquece
+    t_off, n, _ = timed_run(mc, False)
+    t_on, _, prof = timed_run(mc, True)
+    t_stk, _, prof = timed_run(mc, True, stacks=True)
+    t_tim, _, _ = timed_run(mc, True, TimingConfig(0, 10, 100))
+    print(f"{n} instrucoes")
+    print(f"  sem profiler:         {t_off * 1000:7.1f} ms")
+    print(f"  com profiler:         {t_on * 1000:7.1f} ms (+{t_on / t_off - 1:.0%})")
+    print(f"  com pilha de chamada: {t_stk * 1000:7.1f} ms (+{t_stk / t_off - 1:.0%})")
+    print(f"  com profiler + tempo: {t_tim * 1000:7.1f} ms")
+    smap = source_map(symbols, lines)
+    t = time.perf_counter()
+    prof.hotspots(smap)
+    prof.listing(LOOP_SRC, smap)
+    prof.collapsed(smap)
+    prof.routine_table(smap)
+    print(f"  relatorios:           {(time.perf_counter() - t) * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Compara o Register (dataclass + property com mascara) com o RegisterFile (__slots__)
+# Uso: python -m benchmarks.bench_regs
+import time
+from src.common.constants import MASK_16BIT
+from src.hardware.components import Register, RegisterFile
+from src.hardware.cpu import Mic1CPU
+from benchmarks.programs import load_loop
+
+N = 200_000
+
+def bench_register():
+    # Mesmo padrao dos handlers antigos: sp.value -= 1; h.value = f(h.value, sp.value)
+    sp, h = Register("SP", 4095), Register("H")
+    t = time.perf_counter()
+    for _ in range(N):
+        sp.value -= 1
+        h.value = h.value + sp.value
+    return time.perf_counter() - t
+
+def bench_regfile():
+    r = RegisterFile()
+    t = time.perf_counter()
+    for _ in range(N):
+        r.sp = (r.sp - 1) & MASK_16BIT
+        r.h = (r.h + r.sp) & MASK_16BIT
+    return time.perf_counter() - t
+
+def bench_view():
+    # Caminho de compatibilidade (getattr(cpu, 'sp').value) usado pela interface
+    r = RegisterFile()
+    sp, h = r.view("sp"), r.view("h")
+    t = time.perf_counter()
+    for _ in range(N):
+        sp.value -= 1
+        h.value = h.value + sp.value
+    return time.perf_counter() - t
+
+def bench_cycle_all(mc):
+    cpu = Mic1CPU()
+    cpu.mem.load_bin(mc)
+    t = time.perf_counter()
+    while not cpu.halted: cpu.cycle_all()
+    return cpu.cycle, time.perf_counter() - t
+
+def main():
+    t1 = min(bench_register() for _ in range(5))
+    t2 = min(bench_regfile() for _ in range(5))
+    t3 = min(bench_view() for _ in range(5))
+    print(f"Register (.value):     {N / t1:,.0f} it/s")
+    print(f"RegisterFile (slots):  {N / t2:,.0f} it/s - {t1 / t2:.1f}x")
+    print(f"RegisterView (.value): {N / t3:,.0f} it/s - {t1 / t3:.1f}x")
+    n, t = min((bench_cycle_all(load_loop()) for _ in range(3)), key=lambda r: r[1])
+    print(f"cycle_all com RegisterFile: {n} instr em {t:.3f}s ({n / t:,.0f} instr/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# Compara o loop de cycle_all() com o modo rapido Mic1CPU.run()
+# Uso: python -m benchmarks.bench_run
+import time
+from src.hardware.cpu import Mic1CPU
+from benchmarks.programs import load_loop
+
+def bench_cycle_all(mc):
+    cpu = Mic1CPU()
+    cpu.mem.load_bin(mc)
+    t = time.perf_counter()
+    while not cpu.halted: cpu.cycle_all()
+    return cpu.cycle, time.perf_counter() - t
+
+def bench_run(mc, translate=False):
+    cpu = Mic1CPU()
+    cpu.mem.load_bin(mc)
+    t = time.perf_counter()
+    res = cpu.run(translate=translate)
+    return res.cycles, time.perf_counter() - t
+
+def main():
+    mc = load_loop()
+    n1, t1 = bench_cycle_all(mc)
+    n2, t2 = bench_run(mc)
+    print(f"cycle_all: {n1} instr em {t1:.3f}s ({n1 / t1:,.0f} instr/s)")
+    n3, t3 = bench_run(mc, translate=True)
+    print(f"run():     {n2} instr em {t2:.3f}s ({n2 / t2:,.0f} instr/s) - {t1 / t2:.1f}x")
+    print(f"run(translate=True): {n3} instr em {t3:.3f}s ({n3 / t3:,.0f} instr/s) - {t1 / t3:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# Custo dos contadores de desempenho (MemorySystem.enable_stats) no Mic1CPU.run()
+# Uso: python -m benchmarks.bench_stats
+import time
+from src.hardware.cpu import Mic1CPU
+from benchmarks.programs import load_loop
+
+def bench_run(mc, stats):
+    cpu = Mic1CPU()
+    cpu.mem.load_bin(mc)
+    if stats: cpu.mem.enable_stats()
+    t = time.perf_counter()
+    res = cpu.run()
+    return res.cycles, time.perf_counter() - t, cpu
+
+def main():
+    mc = load_loop()
+    # Melhor de 10, alternando (a maquina pode estar ocupada)
+    runs = [(bench_run(mc, False), bench_run(mc, True)) for _ in range(10)]
+    n, t1, _ = min((r[0] for r in runs), key=lambda r: r[1])
+    _, t2, cpu = min((r[1] for r in runs), key=lambda r: r[1])
+    print(f"run() sem contadores: {n} instr em {t1:.3f}s ({n / t1:,.0f} instr/s)")
+    print(f"run() com contadores: {n} instr em {t2:.3f}s ({n / t2:,.0f} instr/s) - +{(t2 / t1 - 1) * 100:.0f}%")
+    st = cpu.mem.stats()
+    for name in ("i_cache", "d_cache"):
+        c = st[name]
+        print(f"{name}: {c['hits']} hits, {c['misses']} misses ({c['hit_rate']:.1%}) {c['miss_kinds']}")
+
+if __name__ == "__main__":
+    main()
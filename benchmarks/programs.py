@@ -0,0 +1,37 @@
+# Programas de exemplo usados pelos benchmarks
+from src.assembler.core import assemble
+
+# Loop com chamada de sub-rotina, pilha e acesso local (~32k instrucoes)
+LOOP_SRC = """
+    LOCO 1
+    STOD 400
+    LOCO 2000
+    STOD 401
+    LOCO 0
+    STOD 402
+Main:
+    LODD 401
+    JZER Fim
+    CALL Sub
+    LODD 401
+    SUBD 400
+    STOD 401
+    JUMP Main
+Sub:
+    LODD 402
+    ADDD 401
+    STOD 402
+    PUSH
+    LODL 0
+    ADDL 0
+    STOL 0
+    POP
+    RETN
+Fim:
+    HALT
+"""
+
+def load_loop():
+    mc, msg = assemble(LOOP_SRC)
+    if msg != "OK": raise RuntimeError(msg)
+    return mc
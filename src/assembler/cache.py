@@ -0,0 +1,167 @@
+"""Cache em disco das imagens montadas, indexado pelo hash do fonte.
+
+    cache = ImageCache("~/.cache/mic1")
+    mc, msg = cache.assemble(src)   # igual ao assemble(), mas so monta no miss
+
+A chave e o blake2b do fonte junto com ASM_VERSION (trocar a versao invalida
+tudo). Cada arquivo guarda o codigo de maquina, a tabela de simbolos e o mapa
+endereco -> linha, tudo em uint16 little-endian, e e lido com um read so pra
+dentro de um array('H'):
+
+    cabecalho (HDR_WORDS palavras): MAGIC, ASM_VERSION, n_mc, n_linhas,
+        n_simbolos, tamanho dos nomes em bytes (2 palavras)
+    enderecos do mc, valores do mc, enderecos das linhas, numeros das linhas,
+    valores dos simbolos, nomes dos simbolos (UTF-8 separados por \\n)
+
+Quando o diretorio passa de max_bytes, os arquivos acessados ha mais tempo
+(mtime, atualizado a cada acerto) sao apagados. Cada processo conta o que ele
+mesmo grava e so varre o diretorio quando passa do limite. Varios processos
+podem usar o mesmo diretorio: a escrita vai pra um temporario e depois
+os.replace.
+"""
+import hashlib
+import os
+import sys
+from array import array
+from typing import Dict, Optional, Tuple
+from src.assembler.core import ASM_VERSION, assemble_with_info
+
+MAGIC = 0x434D # "MC"
+HDR_WORDS = 7
+SUFFIX = ".m1c"
+DEFAULT_MAX_BYTES = 64 << 20
+
+class ImageCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        if directory is None:
+            directory = os.environ.get("MIC1_ASM_CACHE") or os.path.join("~", ".cache", "mic1", "asm")
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._size = None # Estimativa do tamanho do diretorio (so reconta quando passa do limite)
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(src: str) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(ASM_VERSION.to_bytes(2, "little"))
+        h.update(src.encode("utf-8"))
+        return h.hexdigest()
+
+    def path(self, src: str) -> str:
+        return os.path.join(self.directory, self.key(src) + SUFFIX)
+
+    def assemble(self, src: str):
+        mc, msg, _, _ = self.assemble_with_info(src)
+        return mc, msg
+
+    def assemble_with_info(self, src: str):
+        """Igual ao core.assemble_with_info; fonte com erro nao vai pro cache"""
+        hit = self.get(src)
+        if hit is not None: return hit[0], "OK", hit[1], hit[2]
+        mc, msg, symbols, lines = assemble_with_info(src)
+        if msg == "OK": self.put(src, mc, symbols, lines)
+        return mc, msg, symbols, lines
+
+    def get(self, src: str) -> Optional[Tuple[Dict[int, int], Dict[str, int], Dict[int, int]]]:
+        """(mc, simbolos, linhas) se esse fonte ja foi montado, senao None"""
+        path = self.path(src)
+        try:
+            with open(path, "rb") as f: buf = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            out = _unpack(buf)
+        except (ValueError, UnicodeDecodeError):
+            out = None
+        if out is None:
+            # Arquivo velho ou estragado: joga fora e monta de novo
+            self.misses += 1
+            self._remove(path)
+            return None
+        self.hits += 1
+        try: os.utime(path) # Marca como usado agora (LRU)
+        except OSError: pass
+        return out
+
+    def put(self, src: str, mc: Dict[int, int], symbols: Dict[str, int], lines: Dict[int, int]):
+        buf = _pack(mc, symbols, lines)
+        if buf is None: return # Nao cabe em 16 bits (fonte gigante): fica sem cache
+        path = self.path(src)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f: f.write(buf)
+            os.replace(tmp, path)
+        except OSError:
+            self._remove(tmp)
+            return
+        if self._size is None: self._size = self.size()
+        else: self._size += len(buf)
+        if self._size > self.max_bytes: self._evict()
+
+    def clear(self):
+        for e in self._entries(): self._remove(e.path)
+
+    def size(self) -> int:
+        return sum(e.stat().st_size for e in self._entries())
+
+    def _entries(self):
+        try:
+            return [e for e in os.scandir(self.directory) if e.name.endswith(SUFFIX)]
+        except OSError:
+            return []
+
+    def _evict(self):
+        files = []
+        for e in self._entries():
+            try: st = e.stat()
+            except OSError: continue
+            files.append((st.st_mtime, st.st_size, e.path))
+        total = sum(f[1] for f in files)
+        files.sort()
+        for mtime, size, path in files:
+            if total <= self.max_bytes: break
+            self._remove(path)
+            total -= size
+        self._size = total
+
+    @staticmethod
+    def _remove(path):
+        try: os.remove(path)
+        except OSError: pass
+
+def _pack(mc, symbols, lines) -> Optional[bytes]:
+    names = "\n".join(symbols).encode("utf-8")
+    try:
+        a = array('H', (MAGIC, ASM_VERSION, len(mc), len(lines), len(symbols),
+                        len(names) & 0xFFFF, len(names) >> 16))
+        a.extend(mc.keys())
+        a.extend(mc.values())
+        a.extend(lines.keys())
+        a.extend(lines.values())
+        a.extend(symbols.values())
+    except OverflowError:
+        return None
+    if sys.byteorder == "big": a.byteswap()
+    return a.tobytes() + names + b"\0" * (len(names) & 1)
+
+def _unpack(buf):
+    if len(buf) < 2 * HDR_WORDS or len(buf) % 2: return None
+    a = array('H')
+    a.frombytes(buf)
+    if sys.byteorder == "big": a.byteswap()
+    magic, version, n_mc, n_lines, n_sym, lo, hi = a[:HDR_WORDS]
+    if magic != MAGIC or version != ASM_VERSION: return None
+    o = HDR_WORDS
+    end = o + 2 * n_mc + 2 * n_lines + n_sym
+    n_names = lo | hi << 16
+    if 2 * end + n_names > len(buf): return None
+    mc = dict(zip(a[o:o + n_mc], a[o + n_mc:o + 2 * n_mc]))
+    o += 2 * n_mc
+    lines = dict(zip(a[o:o + n_lines], a[o + n_lines:o + 2 * n_lines]))
+    o += 2 * n_lines
+    names = buf[2 * end:2 * end + n_names].decode("utf-8").split("\n") if n_sym else []
+    if len(names) != n_sym: return None
+    symbols = dict(zip(names, a[o:o + n_sym]))
+    return mc, symbols, lines
@@ -0,0 +1,216 @@
+"""Front end do montador: uma passada so pelas linhas do fonte.
+
+Cada linha e quebrada uma vez (str.split, que e C puro; um regex pelo fonte
+inteiro ficou mais lento que isso) e ja sai classificada: .DATA vai pro
+segmento de dados, label vai pra tabela e a instrucao ganha endereco, sem as
+listas intermediarias do clean_lines/parse_data. A segunda passada so resolve
+os operandos. Os erros sao todos coletados (assemble_all), com linha e coluna,
+e as mensagens sao as mesmas do assemble().
+
+    tokens(src)        tokens tipados (label, mnemonico, diretiva, numero,
+                       simbolo, comentario) com linha e colunas, pro editor
+    assemble_all(src)  AsmResult com codigo de maquina, simbolos, mapa
+                       endereco -> linha e todos os erros
+"""
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple
+from src.common.opcodes import OPCODE_MAP, Opcode
+
+# Palavras de uma linha (mesmo corte do str.split) e o comentario
+_WORD_RE = re.compile(r"[^\s;]+|;.*")
+
+# Mnemonico em maiusculas -> (nome internado, opcode, sem operando?)
+MNEMONICS = {sys.intern(k): (sys.intern(k), v, k in Opcode.NO_OPERAND_SET) for k, v in OPCODE_MAP.items()}
+
+# Tipos de token
+LABEL, MNEMONIC, DIRECTIVE, NUMBER, SYMBOL, COMMENT = "label", "mnemonic", "directive", "number", "symbol", "comment"
+
+class Token(NamedTuple):
+    kind: str
+    text: str   # Mnemonicos e diretivas em maiusculas (mnemonicos internados)
+    line: int   # 1 = primeira linha
+    col: int    # Coluna inicial (0 = comeco da linha)
+    end: int    # Coluna final (exclusiva)
+
+class AsmError(NamedTuple):
+    line: int
+    col: int
+    msg: str    # Mesma mensagem do assemble() ("Linha N: ..." ou "Erro linha N: ...")
+
+@dataclass
+class AsmResult:
+    mc: Dict[int, int] = field(default_factory=dict)
+    symbols: Dict[str, int] = field(default_factory=dict)
+    lines: Dict[int, int] = field(default_factory=dict)   # Endereco -> linha do fonte
+    errors: List[AsmError] = field(default_factory=list)  # Todos, em ordem de linha
+    status: str = "OK" # Mensagem que o assemble() devolveria (o primeiro erro dele)
+
+def parse_number(s: str) -> int:
+    # Hex (0x) ou decimal, igual em todo o montador
+    return int(s, 16) if "0X" in s.upper() else int(s)
+
+def parse_data_line(line):
+    # Linha com .DATA -> (label ou None, endereco, valor); erro vira excecao
+    parts = line.split()
+    # Acha onde ta o .DATA
+    idx = next(i for i, p in enumerate(parts) if p.upper() == ".DATA")
+    if len(parts) < idx + 3: raise ValueError("Argumentos faltando")
+
+    addr = parse_number(parts[idx+1])
+    val = parse_number(parts[idx+2])
+    if not (0 <= addr < 4096): raise ValueError(f"Endereco {addr} fora do limite")
+
+    # Se tiver label antes do .DATA, guarda na tabela
+    label = parts[idx-1][:-1].upper() if idx > 0 and parts[idx-1].endswith(':') else None
+    return label, addr, val & 0xFFFF
+
+def split_instr(line):
+    # Linha de codigo -> (label ou None, instrucao ou None, operando ou None)
+    parts = line.split()
+    label = None
+
+    # Se comeca com Label: (ex: Inicio:)
+    if parts[0].endswith(':'):
+        label = parts[0][:-1].upper()
+        parts = parts[1:]
+
+    if not parts: return label, None, None
+    return label, parts[0].upper(), parts[1] if len(parts) > 1 else None
+
+def encode(instr, op, addr, symbols, data):
+    # Passada 2 de uma instrucao -> palavra de 16 bits
+    # Erro vira ValueError (quem chama poe o numero da linha na frente)
+
+    # Verifica se nao vai sobrescrever dado definido no .DATA
+    if addr in data: raise ValueError(f"Colisao de memoria em {addr}")
+    ent = MNEMONICS.get(instr)
+    if ent is None: raise ValueError(f"Instrucao '{instr}' nao existe")
+
+    # Instrucoes sem operando (tipo HALT)
+    if ent[2]: return ent[1]
+    return ent[1] | _operand(op, symbols)
+
+def _operand(op, symbols):
+    val = 0
+    if op:
+        # Se for label, pega da tabela de simbolos
+        key = op.upper()
+        if key in symbols:
+            val = symbols[key]
+        else:
+            try:
+                val = parse_number(op)
+            except ValueError:
+                raise ValueError(f"Operando '{op}' invalido") from None
+
+    # Checa limites (-2048 a 4095)
+    if not (-2048 <= val <= 4095):
+        raise ValueError(f"Valor {val} muito grande")
+
+    # 12 bits (negativo em complemento de 2)
+    return val & 0xFFF
+
+def _col(line, k):
+    # Coluna da k-esima palavra da linha (so pra mensagem de erro)
+    words = [m.start() for m in _WORD_RE.finditer(line.split(';')[0])]
+    return words[min(k, len(words) - 1)] if words else 0
+
+def assemble_all(src: str) -> AsmResult:
+    """Monta numa passada pelas linhas (mais a resolucao dos operandos) e
+    junta todos os erros. Sem erro, mc/symbols/lines sao os do assemble_with_info."""
+    res = AsmResult()
+    data, data_syms, code_syms = res.mc, {}, {} # O mc comeca com o .DATA
+    data_errs, code_errs = [], []
+    instrs = [] # (mnemonico, operando, endereco, linha, palavra do mnemonico)
+    curr = 0
+    text = src.splitlines()
+
+    # Passada pelo texto: .DATA, labels e enderecos
+    for lno, line in enumerate(text, 1):
+        raw = line.split(';', 1)[0]
+        parts = raw.split()
+        if not parts: continue
+        if '.' in raw and ".DATA" in raw.upper():
+            try:
+                label, addr, val = parse_data_line(raw)
+            except Exception as e:
+                idx = next((i for i, p in enumerate(parts) if p.upper() == ".DATA"), 0)
+                data_errs.append(AsmError(lno, _col(line, idx), f"Erro linha {lno}: {e}"))
+                continue
+            data[addr] = val
+            if label is not None: data_syms[label] = addr
+            continue
+        op = parts[0]
+        if op[-1] == ':':
+            code_syms[op[:-1].upper()] = curr
+            if len(parts) == 1: continue
+            instrs.append((parts[1].upper(), parts[2] if len(parts) > 2 else None, curr, lno, 1))
+        else:
+            instrs.append((op.upper(), parts[1] if len(parts) > 1 else None, curr, lno, 0))
+        curr += 1
+
+    # Labels do .DATA primeiro, depois as do codigo (igual ao assemble())
+    symbols = res.symbols
+    symbols.update(data_syms)
+    symbols.update(code_syms)
+
+    # Operandos (precisa de todas as labels)
+    mc, lines = res.mc, res.lines
+    mnem = MNEMONICS
+    for op, arg, addr, lno, k in instrs:
+        ent = mnem.get(op)
+        if ent is None or addr in data:
+            pass
+        elif ent[2]:
+            mc[addr] = ent[1]
+            lines[addr] = lno
+            continue
+        elif arg is not None:
+            # Caso comum: simbolo conhecido ou decimal pequeno (o resto vai pro encode)
+            key = arg.upper()
+            val = symbols.get(key)
+            if val is None and key.isdecimal(): val = int(key)
+            if val is not None and -2048 <= val <= 4095:
+                mc[addr] = ent[1] | val & 0xFFF
+                lines[addr] = lno
+                continue
+        try:
+            mc[addr] = encode(op, arg, addr, symbols, data)
+        except ValueError as e:
+            bad_arg = str(e).startswith(("Operando", "Valor"))
+            code_errs.append(AsmError(lno, _col(text[lno - 1], k + bad_arg), f"Linha {lno}: {e}"))
+            continue
+        lines[addr] = lno
+
+    if data_errs or code_errs:
+        res.status = (data_errs or code_errs)[0].msg
+        res.errors = sorted(data_errs + code_errs)
+    return res
+
+def tokens(src: str) -> List[Token]:
+    """Tokens tipados de todas as linhas (pra colorir o editor, por exemplo)"""
+    out = []
+    for lno, line in enumerate(src.splitlines(), 1):
+        first = True
+        for m in _WORD_RE.finditer(line):
+            text, col, end = m.group(), m.start(), m.end()
+            if text[0] == ';':
+                out.append(Token(COMMENT, text, lno, col, end))
+            elif first and text[-1] == ':':
+                out.append(Token(LABEL, text[:-1].upper(), lno, col, end))
+            else:
+                out.append(_classify(text, lno, col, end))
+            first = False
+    return out
+
+def _classify(text, lno, col, end):
+    up = text.upper()
+    if up in MNEMONICS: return Token(MNEMONIC, MNEMONICS[up][0], lno, col, end)
+    if up.startswith("."): return Token(DIRECTIVE, up, lno, col, end)
+    try:
+        parse_number(text)
+        return Token(NUMBER, text, lno, col, end)
+    except ValueError:
+        return Token(SYMBOL, text, lno, col, end)
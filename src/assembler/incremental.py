@@ -0,0 +1,194 @@
+"""Montador incremental: guarda entre uma montagem e outra as linhas ja
+quebradas em tokens, a tabela de simbolos e o endereco de cada linha.
+
+    asm = IncrementalAssembler()
+    patch, msg = asm.update(src)   # patch = {endereco: palavra nova}
+
+update() compara o texto novo com o anterior (prefixo e sufixo iguais) e so
+re-tokeniza as linhas do meio. Depois so recodifica as instrucoes novas, as que
+usam um simbolo que mudou e as que colidem (ou deixaram de colidir) com um
+.DATA; as que so andaram de endereco levam a palavra pronta pro lugar novo.
+O patch e relativo a ultima montagem sem erro (enderecos que ficaram vazios
+voltam a 0), e o resultado e sempre igual ao do assemble(): asm.mc e o mesmo
+dict e a mensagem de erro e a mesma.
+"""
+from typing import Dict, Optional, Tuple
+from src.assembler.frontend import encode, parse_data_line, split_instr
+
+# Tipos de linha
+EMPTY, DATA, CODE = 0, 1, 2
+
+class _Line:
+    """Uma linha do fonte ja tokenizada (o estado da montagem fica aqui)"""
+    __slots__ = ("text", "kind", "label", "instr", "op", "ref", "daddr", "dval", "addr", "word", "err")
+
+    def __init__(self, text):
+        self.text = text
+        self.label = self.instr = self.op = self.ref = self.err = None
+        self.daddr = self.dval = self.word = None
+        self.addr = 0 # Endereco da instrucao (ou o valor de curr nessa linha)
+        raw = text.split(';')[0].strip()
+        if not raw:
+            self.kind = EMPTY
+        elif ".DATA" in raw.upper():
+            self.kind = DATA
+            try:
+                self.label, self.daddr, self.dval = parse_data_line(raw)
+            except Exception as e:
+                self.err = str(e)
+        else:
+            self.kind = CODE
+            self.label, self.instr, self.op = split_instr(raw)
+            # Operando que pode ser label: recodifica quando esse simbolo mudar
+            if self.op: self.ref = self.op.upper()
+
+class IncrementalAssembler:
+    def __init__(self):
+        self.lines = []     # Uma _Line por linha do fonte
+        self.count = 0      # Instrucoes no programa (proximo endereco livre)
+        self.symbols = {}   # Igual a tabela do assemble() depois da passada 1
+        self.data = {}      # Segmento .DATA (endereco -> valor)
+        self.mc = {}        # Codigo de maquina da ultima montagem sem erro
+        self._at = {}       # Endereco -> linha com a instrucao
+        self._refs = {}     # Simbolo -> linhas que usam ele como operando
+        self._errors = 0    # Linhas com erro (.DATA ou instrucao)
+        self._pending = set() # Enderecos mexidos desde a ultima montagem sem erro
+
+    def update(self, src: str) -> Tuple[Optional[Dict[int, int]], str]:
+        """Monta o fonte novo. Devolve (patch, "OK") ou (None, mensagem de erro)."""
+        new = src.splitlines()
+        old = self.lines
+        n_old, n_new = len(old), len(new)
+
+        # Trecho que mudou: old[p:n_old - s] vira new[p:n_new - s]
+        p = 0
+        lim = min(n_old, n_new)
+        while p < lim and old[p].text == new[p]: p += 1
+        s = 0
+        lim -= p
+        while s < lim and old[n_old - 1 - s].text == new[n_new - 1 - s]: s += 1
+        removed = old[p:n_old - s]
+        added = [_Line(t) for t in new[p:n_new - s]]
+        if not removed and not added: return self._finish()
+
+        touched = self._pending
+        todo = set()
+        for ln in removed: self._unregister(ln, touched)
+
+        # Enderecos: o trecho novo comeca onde o antigo comecava
+        curr = old[p].addr if p < n_old else self.count
+        for ln in added:
+            ln.addr = curr
+            if ln.kind == CODE and ln.instr is not None: curr += 1
+        suffix = old[n_old - s:]
+        delta = curr - (suffix[0].addr if suffix else self.count)
+        self.count += delta
+        old[p:n_old - s] = added
+
+        if delta:
+            # Tudo que vem depois andou: sai do endereco velho e vai pro novo
+            at = self._at
+            moved = [ln for ln in suffix if ln.kind == CODE and ln.instr is not None]
+            for ln in moved:
+                if at.get(ln.addr) is ln: del at[ln.addr]
+                touched.add(ln.addr)
+            for ln in suffix: ln.addr += delta
+            for ln in moved:
+                at[ln.addr] = ln
+                touched.add(ln.addr)
+        for ln in added: self._register(ln, todo)
+
+        # Tabela de simbolos e .DATA: so refaz se alguma label ou dado mudou
+        labels = delta or any(ln.label is not None or ln.kind == DATA for ln in removed + added)
+        if labels:
+            todo.update(self._rebuild_data(touched))
+            todo.update(self._rebuild_symbols())
+        if delta:
+            # A palavra so depende do endereco pela colisao com o .DATA
+            data = self.data
+            todo.update(ln for ln in moved if ln.err is not None or ln.addr in data)
+        for ln in todo: self._encode(ln, touched)
+        return self._finish()
+
+    def line_map(self) -> Dict[int, int]:
+        """Endereco -> linha do fonte de cada instrucao (o mapa do assemble_with_info)"""
+        return {ln.addr: lno for lno, ln in enumerate(self.lines, 1) if ln.kind == CODE and ln.instr is not None}
+
+    # --- Estado interno ---
+
+    def _register(self, ln, todo):
+        if ln.err is not None: self._errors += 1
+        if ln.kind != CODE or ln.instr is None: return
+        self._at[ln.addr] = ln
+        if ln.ref is not None: self._refs.setdefault(ln.ref, set()).add(ln)
+        todo.add(ln)
+
+    def _unregister(self, ln, touched):
+        if ln.err is not None: self._errors -= 1
+        if ln.kind != CODE or ln.instr is None: return
+        if self._at.get(ln.addr) is ln: del self._at[ln.addr]
+        if ln.ref is not None:
+            refs = self._refs[ln.ref]
+            refs.discard(ln)
+            if not refs: del self._refs[ln.ref]
+        touched.add(ln.addr)
+
+    def _rebuild_data(self, touched):
+        # Mesma ordem do parse_data (um .DATA repetido fica com o ultimo valor)
+        data = {}
+        for ln in self.lines:
+            if ln.kind == DATA and ln.err is None: data[ln.daddr] = ln.dval
+        old = self.data
+        self.data = data
+        # Instrucoes que passaram a colidir (ou deixaram de colidir) com um dado
+        changed = {a for a in old.keys() | data.keys() if old.get(a) != data.get(a)}
+        touched.update(changed)
+        return [self._at[a] for a in changed if a in self._at]
+
+    def _rebuild_symbols(self):
+        # Labels do .DATA primeiro, depois as do codigo (igual ao assemble())
+        sym = {}
+        for ln in self.lines:
+            if ln.kind == DATA and ln.err is None and ln.label is not None: sym[ln.label] = ln.daddr
+        for ln in self.lines:
+            if ln.kind == CODE and ln.label is not None: sym[ln.label] = ln.addr
+        old = self.symbols
+        self.symbols = sym
+        out = []
+        for k in old.keys() | sym.keys():
+            if old.get(k) != sym.get(k) and k in self._refs: out.extend(self._refs[k])
+        return out
+
+    def _encode(self, ln, touched):
+        if self._at.get(ln.addr) is not ln: return # Ja saiu do programa
+        had = ln.err is not None
+        try:
+            ln.word, ln.err = encode(ln.instr, ln.op, ln.addr, self.symbols, self.data), None
+        except ValueError as e:
+            ln.word, ln.err = None, str(e)
+        self._errors += (ln.err is not None) - had
+        touched.add(ln.addr)
+
+    def _first_error(self) -> str:
+        # Mesma prioridade do assemble(): primeiro erro de .DATA, depois a
+        # primeira instrucao com erro
+        for lno, ln in enumerate(self.lines, 1):
+            if ln.kind == DATA and ln.err is not None: return f"Erro linha {lno}: {ln.err}"
+        for lno, ln in enumerate(self.lines, 1):
+            if ln.kind == CODE and ln.err is not None: return f"Linha {lno}: {ln.err}"
+        return "OK"
+
+    def _finish(self):
+        if self._errors: return None, self._first_error()
+        # Patch dos enderecos mexidos desde a ultima montagem sem erro
+        patch = {}
+        mc, data, at = self.mc, self.data, self._at
+        for a in self._pending:
+            ln = at.get(a)
+            val = data.get(a, ln.word if ln is not None else None)
+            if val != mc.get(a):
+                patch[a] = 0 if val is None else val
+                if val is None: del mc[a]
+                else: mc[a] = val
+        self._pending = set()
+        return patch, "OK"
@@ -0,0 +1,280 @@
+"""Otimizador peephole do codigo montado (etapa opcional entre a montagem e o load_bin).
+
+    res = optimize(src)     # OptResult: res.mc vai pro load_bin no lugar do assemble()
+    cmp = compare(res)      # roda as duas imagens lado a lado na Mic1CPU
+    print(report(res, cmp))
+
+Trabalha em cima do assemble_all (palavras ja resolvidas e a linha de cada
+instrucao) e repete as regras ate nao mudar mais nada:
+
+    cadeia de desvios   Jxxx/CALL pra um JUMP vai direto pro destino final
+    desvio pro proximo  JUMP/Jxxx pra instrucao seguinte sai
+    codigo morto        instrucao que nao e alcancavel a partir do endereco 0
+                        sai (o que sobra depois de HALT/JUMP/RETN ate o proximo
+                        destino de desvio ou retorno de CALL)
+    STOD x; LODD x      o LODD sai se nem ele nem o STOD sao destino de desvio
+                        e a instrucao antes do STOD passou o AC pela ULA (AC e
+                        flags ja sao os que o LODD daria); x nao pode ser volatil
+                        (dispositivo de E/S)
+
+No fim o codigo e compactado: os desvios sao realocados e as labels de codigo
+andam junto (label de instrucao removida vai pra proxima que ficou). O .DATA
+fica onde esta: o codigo so encolhe, entao nao aparece colisao nova.
+
+O programa sai sem mudanca (skipped diz o motivo) quando o codigo e usado como
+dado: LODD/STOD/ADDD/SUBD num endereco de codigo, LOCO com label de codigo
+(endereco calculado pra RETN/PSHI/POPI), desvio pra fora do codigo ou
+instrucao que pode passar do fim dele. Escrita no codigo por endereco
+calculado (POPI/STOL com um numero) nao da pra ver sem rodar: compare() confere
+o resultado final das duas imagens.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional
+from src.assembler.frontend import assemble_all, split_instr
+from src.common.constants import MASK_12BIT
+from src.common.opcodes import OPCODE_MAP, Opcode
+from src.hardware.cpu import Mic1CPU, RunResult
+from src.hardware.devices import CYCLES_HI, IO_BASE, standard_io
+
+# Nomes das regras (campo rule do Change)
+CHAIN, NEXT, DEAD, RELOAD = "cadeia de desvios", "desvio pro proximo", "codigo morto", "LODD depois de STOD"
+
+# Enderecos que o LODD nao pode deixar de ler (mapa padrao de E/S)
+DEFAULT_VOLATILE = frozenset(range(IO_BASE, CYCLES_HI + 1))
+
+JUMPS = frozenset((Opcode.JUMP, Opcode.JPOS, Opcode.JZER, Opcode.JNEG, Opcode.JNZE))
+DIRECT = frozenset((Opcode.LODD, Opcode.STOD, Opcode.ADDD, Opcode.SUBD))
+# Escrevem o AC pela ULA (flags = AC depois delas)
+ALU_WRITERS = frozenset((Opcode.LODD, Opcode.ADDD, Opcode.SUBD, Opcode.LOCO, Opcode.LODL, Opcode.ADDL, Opcode.SUBL))
+POP, HALT, RETN = OPCODE_MAP["POP"], OPCODE_MAP["HALT"], OPCODE_MAP["RETN"]
+
+class Change(NamedTuple):
+    line: int   # Linha do fonte da instrucao mudada ou removida
+    rule: str
+    detail: str
+
+@dataclass
+class OptResult:
+    mc: Dict[int, int] = field(default_factory=dict)        # Imagem otimizada (ou a original, se skipped)
+    status: str = "OK"                                     # Erro de montagem (mesma mensagem do assemble())
+    symbols: Dict[str, int] = field(default_factory=dict)
+    lines: Dict[int, int] = field(default_factory=dict)    # Endereco novo -> linha do fonte
+    changes: List[Change] = field(default_factory=list)
+    skipped: Optional[str] = None                          # Motivo de nao otimizar
+    original: Dict[int, int] = field(default_factory=dict) # Imagem do assemble()
+    relocation: List[int] = field(default_factory=list)    # Endereco de codigo velho (0..fim) -> novo
+    words_before: int = 0 # Palavras de codigo
+    words_after: int = 0
+
+    @property
+    def words_saved(self) -> int:
+        return self.words_before - self.words_after
+
+def _falls_through(w):
+    return w >> 12 != Opcode.JUMP and w != HALT and w != RETN
+
+def optimize(src: str, volatile=DEFAULT_VOLATILE) -> OptResult:
+    """Monta e otimiza. Com erro de montagem volta so o status (igual ao assemble())."""
+    asm = assemble_all(src)
+    res = OptResult(status=asm.status)
+    if asm.errors: return res
+    res.original, res.symbols, res.lines = asm.mc, asm.symbols, asm.lines
+    res.mc = asm.mc
+    n = res.words_before = res.words_after = len(asm.lines)
+    res.relocation = list(range(n + 1))
+    words = [asm.mc[a] for a in range(n)]
+    lnos = [asm.lines[a] for a in range(n)]
+    text = src.splitlines()
+
+    # Labels de codigo (uma label de .DATA com o mesmo nome perde pra ela, igual no assemble)
+    code_names = set()
+    for line in text:
+        raw = line.split(';', 1)[0]
+        if raw.split() and ".DATA" not in raw.upper():
+            label = split_instr(raw)[0]
+            if label is not None: code_names.add(label)
+
+    res.skipped = _check(words, lnos, text, asm.symbols, code_names)
+    if res.skipped is not None: return res
+
+    alive = [True] * n
+    nxt = list(range(n + 1)) # Primeira instrucao viva a partir de cada endereco (n = fim)
+
+    def drop(i, rule, detail):
+        alive[i] = False
+        res.changes.append(Change(lnos[i], rule, detail))
+        j = i
+        while j >= 0 and nxt[j] == i:
+            nxt[j] = nxt[i + 1]
+            j -= 1
+
+    changed = True
+    while changed:
+        changed = False
+        # Cadeia de desvios
+        for i in range(n):
+            w = words[i]
+            if not alive[i] or (w >> 12 not in JUMPS and w >> 12 != Opcode.CALL): continue
+            t = first = nxt[w & MASK_12BIT]
+            seen = {i}
+            while t < n and words[t] >> 12 == Opcode.JUMP and t not in seen:
+                seen.add(t)
+                t = nxt[words[t] & MASK_12BIT]
+            if t != first:
+                words[i] = w & 0xF000 | t
+                res.changes.append(Change(lnos[i], CHAIN, f"destino -> linha {lnos[t]}" if t < n else "destino -> fim"))
+                changed = True
+
+        # Desvio pro proximo
+        for i in range(n):
+            w = words[i]
+            if alive[i] and w >> 12 in JUMPS and nxt[w & MASK_12BIT] == nxt[i + 1]:
+                drop(i, NEXT, text[lnos[i] - 1].strip())
+                changed = True
+
+        # Codigo morto
+        seen = [False] * n
+        todo = [nxt[0]]
+        while todo:
+            i = todo.pop()
+            if i >= n or seen[i]: continue
+            seen[i] = True
+            w = words[i]
+            if w >> 12 in JUMPS or w >> 12 == Opcode.CALL: todo.append(nxt[w & MASK_12BIT])
+            if _falls_through(w): todo.append(nxt[i + 1])
+        for i in range(n):
+            if alive[i] and not seen[i]:
+                drop(i, DEAD, text[lnos[i] - 1].strip())
+                changed = True
+
+        # STOD x; LODD x
+        targets = {nxt[0]}
+        targets.update(nxt[words[i] & MASK_12BIT] for i in range(n)
+                       if alive[i] and (words[i] >> 12 in JUMPS or words[i] >> 12 == Opcode.CALL))
+        order = [i for i in range(n) if alive[i]]
+        for p, s, ld in zip(order, order[1:], order[2:]):
+            ws, wl = words[s], words[ld]
+            if (ws >> 12 == Opcode.STOD and wl >> 12 == Opcode.LODD and ws & MASK_12BIT == wl & MASK_12BIT
+                    and alive[p] and s not in targets and ld not in targets and (ws & MASK_12BIT) not in volatile
+                    and (words[p] >> 12 in ALU_WRITERS or words[p] == POP)):
+                drop(ld, RELOAD, text[lnos[ld] - 1].strip())
+                changed = True
+
+    # Compacta: endereco velho -> novo (o fim vai pro fim novo)
+    new = [0] * (n + 1)
+    k = 0
+    for i in range(n):
+        new[i] = k
+        k += alive[i]
+    new[n] = k
+    mc = {a: v for a, v in asm.mc.items() if a not in asm.lines}
+    lines = {}
+    for i in range(n):
+        if not alive[i]: continue
+        w = words[i]
+        if w >> 12 in JUMPS or w >> 12 == Opcode.CALL: w = w & 0xF000 | new[nxt[w & MASK_12BIT]]
+        mc[new[i]] = w
+        lines[new[i]] = lnos[i]
+    res.mc, res.lines, res.words_after = mc, lines, k
+    res.relocation = [new[nxt[a]] for a in range(n + 1)]
+    res.symbols = {name: res.relocation[a] if name in code_names else a for name, a in asm.symbols.items()}
+    return res
+
+def _check(words, lnos, text, symbols, code_names):
+    # Motivo pra nao mexer no programa (None = pode otimizar)
+    n = len(words)
+    for i, w in enumerate(words):
+        op, arg = w >> 12, w & MASK_12BIT
+        if op in DIRECT and arg < n:
+            return f"linha {lnos[i]}: o codigo e lido/escrito como dado"
+        if (op in JUMPS or op == Opcode.CALL) and arg >= n:
+            return f"linha {lnos[i]}: desvio pra fora do codigo"
+        if op == Opcode.LOCO:
+            ref = split_instr(text[lnos[i] - 1].split(';', 1)[0])[2]
+            if ref is not None and ref.upper() in code_names and ref.upper() in symbols:
+                return f"linha {lnos[i]}: LOCO com endereco de codigo"
+    # Alguma instrucao alcancavel que segue reto passa do fim?
+    seen = [False] * n
+    todo = [0] if n else []
+    while todo:
+        i = todo.pop()
+        if seen[i]: continue
+        seen[i] = True
+        w = words[i]
+        if w >> 12 in JUMPS or w >> 12 == Opcode.CALL: todo.append(w & MASK_12BIT)
+        if _falls_through(w):
+            if i + 1 >= n: return f"linha {lnos[i]}: o programa pode passar do fim do codigo"
+            todo.append(i + 1)
+    return None
+
+@dataclass
+class Comparison:
+    """As duas imagens rodadas do reset ate o HALT (ou o limite) na Mic1CPU"""
+    before: RunResult
+    after: RunResult
+    same_result: bool # AC, SP, flags, RAM fora do codigo e saida de E/S iguais no fim (ver compare)
+
+    @property
+    def cycles_saved(self) -> int:
+        return self.before.cycles - self.after.cycles
+
+    @property
+    def effective_saved(self) -> int:
+        return self.before.effective_cycles - self.after.effective_cycles
+
+def compare(res: OptResult, max_cycles: Optional[int] = 1_000_000, timing=None, io_input: Optional[str] = None,
+            **cpu_kw) -> Comparison:
+    """Roda a imagem original e a otimizada (CPUs novas, mesma configuracao).
+    Com io_input liga a E/S padrao nas duas (a saida entra na comparacao).
+
+    Tudo e comparado exato, menos os enderecos de retorno de CALL, que andam
+    junto com o codigo: vale o mesmo endereco realocado so numa palavra da
+    pilha (do menor SP alcancado ate o topo; o RETN deixa o endereco abaixo
+    do SP final) e no AC, e so se o valor original e o retorno de um CALL."""
+    runs, finals = [], []
+    for mc in (res.original, res.mc):
+        cpu = Mic1CPU(timing=timing, **cpu_kw)
+        cpu.mem.load_bin(mc)
+        devs = standard_io(cpu.mem, inp=io_input) if io_input is not None else ()
+        low = [cpu.regs.sp]
+
+        def track(sp, low=low):
+            # Condicao que nunca para: so anota o menor SP antes de cada instrucao
+            if sp < low[0]: low[0] = sp
+            return False
+        cpu.breakpoints.add_cond("sp", track)
+        runs.append(cpu.run(max_cycles))
+        regs = cpu.regs
+        finals.append((regs.h, regs.sp, cpu.alu.n, cpu.alu.z, cpu.mem.ram.tolist(), min(low[0], regs.sp),
+                       devs[0].text() if devs else None))
+    old, new = finals
+    n, reloc = res.words_before, res.relocation
+    rets = {a + 1 for a in range(n) if res.original[a] >> 12 == Opcode.CALL}
+
+    def moved(a, b): return a in rets and reloc[a] == b
+
+    ram_a, ram_b = old[4], new[4]
+    base = min(old[5], new[5], len(ram_a))
+    same = (old[1:4] == new[1:4] and old[6] == new[6] and (old[0] == new[0] or moved(old[0], new[0]))
+            and ram_a[n:base] == ram_b[n:base]
+            and all(a == b or moved(a, b) for a, b in zip(ram_a[max(n, base):], ram_b[max(n, base):])))
+    return Comparison(runs[0], runs[1], same)
+
+def report(res: OptResult, cmp: Optional[Comparison] = None) -> str:
+    """Texto com as mudancas, as palavras economizadas e (com cmp) os ciclos"""
+    if res.status != "OK": return res.status
+    if res.skipped is not None: return f"Sem otimizacao: {res.skipped}"
+    out = [f"Linha {c.line:>5}  {c.rule:<20} {c.detail}" for c in sorted(res.changes)]
+    out.append(f"Codigo: {res.words_before} -> {res.words_after} palavras ({res.words_saved} a menos)")
+    if cmp is not None:
+        b, a = cmp.before, cmp.after
+        out.append(f"Instrucoes: {b.cycles} -> {a.cycles} ({cmp.cycles_saved} a menos, {_pct(cmp.cycles_saved, b.cycles)})")
+        if b.stall_cycles or a.stall_cycles:
+            out.append(f"Ciclos efetivos: {b.effective_cycles} -> {a.effective_cycles} "
+                       f"({cmp.effective_saved} a menos, {_pct(cmp.effective_saved, b.effective_cycles)})")
+        if b.reason != "HALT" or a.reason != "HALT": out.append(f"Parada: {b.reason} / {a.reason}")
+        out.append("Resultado igual: " + ("sim" if cmp.same_result else "NAO"))
+    return "\n".join(out)
+
+def _pct(part, total):
+    return f"{100 * part / total:.1f}%" if total else "-"
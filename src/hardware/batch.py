@@ -0,0 +1,175 @@
+"""Simulacao em lote: N maquinas MIC-1 rodando o mesmo programa em passo travado.
+
+Cada maquina tem seus proprios registradores, flags e RAM, guardados em arrays
+NumPy. A cada passo todas as maquinas ativas executam a instrucao atual e o
+trabalho e agrupado por opcode, entao o custo cresce com N e nao com o despacho
+em Python. As caches nao sao simuladas (so RAM, registradores e flags).
+Precisa do NumPy (opcional, so pra esse modulo).
+"""
+import numpy as np
+from src.common.constants import MASK_12BIT, MASK_16BIT, MEM_SIZE
+from src.common.opcodes import Opcode, OPCODE_MAP
+
+# Mesma ordem usada na interface grafica
+REG_NAMES = ["MAR", "MDR", "PC", "MBR", "SP", "LV", "CPP", "TOS", "OPC", "H"]
+MAR, MDR, PC, MBR, SP, LV, CPP, TOS, OPC, H = range(len(REG_NAMES))
+
+# Codigos das instrucoes estendidas (12 bits baixos de 0xFxxx)
+EXT_FUNC = {name: OPCODE_MAP[name] & MASK_12BIT for name in Opcode.NO_OPERAND_SET}
+
+class BatchMic1:
+    """N maquinas MIC-1 em arrays NumPy (RAM (N, 4096) uint16)"""
+    def __init__(self, n: int, code_dict=None):
+        self.n = n
+        self.ram = np.zeros((n, MEM_SIZE), dtype=np.uint16)
+        self.regs = np.zeros((n, len(REG_NAMES)), dtype=np.uint16)
+        self.flag_n = np.zeros(n, dtype=bool)
+        self.flag_z = np.zeros(n, dtype=bool)
+        self.halted = np.zeros(n, dtype=bool)
+        self.cycles = np.zeros(n, dtype=np.int64)
+        self.reset()
+        if code_dict is not None: self.load_bin(code_dict)
+
+    def reset(self):
+        # Igual ao Mic1CPU.reset (a RAM fica como esta)
+        self.regs[:] = 0
+        self.regs[:, SP] = 4095
+        self.flag_n[:] = False
+        self.flag_z[:] = False
+        self.halted[:] = False
+        self.cycles[:] = 0
+
+    def load_bin(self, code_dict):
+        # Mesmo programa em todas as maquinas
+        self.ram[:] = 0
+        for addr, val in code_dict.items():
+            if 0 <= addr < MEM_SIZE:
+                self.ram[:, addr] = val & MASK_16BIT
+
+    def load_data(self, data_sets):
+        # Um dict {endereco: valor} por maquina (ex: as diretivas .DATA de cada caso)
+        for i, data in enumerate(data_sets):
+            for addr, val in data.items():
+                if 0 <= addr < MEM_SIZE:
+                    self.ram[i, addr] = val & MASK_16BIT
+
+    def reg(self, name: str):
+        # Coluna de um registrador (view, da pra escrever)
+        return self.regs[:, REG_NAMES.index(name.upper())]
+
+    def _set_flags(self, rows, res):
+        self.flag_z[rows] = res == 0
+        self.flag_n[rows] = (res & 0x8000) != 0
+
+    def step(self) -> int:
+        """Executa uma instrucao em cada maquina ativa. Devolve quantas rodaram."""
+        rows = np.flatnonzero(~self.halted)
+        if rows.size == 0: return 0
+
+        regs, ram = self.regs, self.ram
+        pc = regs[rows, PC]
+        word = ram[rows, pc & MASK_12BIT]
+
+        # Busca + Decodificacao
+        regs[rows, OPC] = pc
+        regs[rows, MAR] = pc
+        regs[rows, MDR] = word
+        regs[rows, MBR] = word
+        regs[rows, PC] = pc + 1 # uint16 ja da a volta em 16 bits
+
+        op = word >> 12
+        arg = (word & MASK_12BIT).astype(np.int32)
+
+        # Agrupa por opcode (so os que aparecem nesse passo)
+        for code in np.unique(op):
+            m = op == code
+            r, a = rows[m], arg[m]
+            if code == Opcode.EXT: self._exec_ext(r, a)
+            else: self._exec(int(code), r, a)
+
+        self.cycles[rows] += 1
+        return rows.size
+
+    def _exec(self, op, r, a):
+        regs, ram = self.regs, self.ram
+        h = regs[r, H].astype(np.int32)
+        sp = regs[r, SP].astype(np.int32)
+
+        if op in (Opcode.LODD, Opcode.ADDD, Opcode.SUBD, Opcode.LODL, Opcode.ADDL, Opcode.SUBL):
+            eff = a if op in (Opcode.LODD, Opcode.ADDD, Opcode.SUBD) else (sp + a) & MASK_12BIT
+            val = ram[r, eff].astype(np.int32)
+            if op in (Opcode.ADDD, Opcode.ADDL): val = h + val
+            elif op in (Opcode.SUBD, Opcode.SUBL): val = h - val
+            res = (val & MASK_16BIT).astype(np.uint16)
+            regs[r, H] = res
+            self._set_flags(r, res)
+        elif op == Opcode.STOD:
+            ram[r, a] = regs[r, H]
+        elif op == Opcode.STOL:
+            ram[r, (sp + a) & MASK_12BIT] = regs[r, H]
+        elif op == Opcode.LOCO:
+            res = (np.where(a & 0x800, a - 0x1000, a) & MASK_16BIT).astype(np.uint16)
+            regs[r, H] = res
+            self._set_flags(r, res)
+        elif op == Opcode.CALL:
+            sp = (sp - 1) & MASK_16BIT
+            regs[r, SP] = sp
+            ram[r, sp & MASK_12BIT] = regs[r, PC]
+            regs[r, PC] = a
+        else:
+            # Desvios (condicionais ou nao)
+            n, z = self.flag_n[r], self.flag_z[r]
+            if op == Opcode.JUMP: take = np.ones(r.size, dtype=bool)
+            elif op == Opcode.JPOS: take = ~n & ~z
+            elif op == Opcode.JZER: take = z
+            elif op == Opcode.JNEG: take = n
+            else: take = ~z # JNZE
+            regs[r[take], PC] = a[take]
+
+    def _exec_ext(self, r, func):
+        regs, ram = self.regs, self.ram
+        for code in np.unique(func):
+            m = func == code
+            rr = r[m]
+            h = regs[rr, H].astype(np.int32)
+            sp = regs[rr, SP].astype(np.int32)
+
+            if code == EXT_FUNC['HALT']:
+                self.halted[rr] = True
+            elif code == EXT_FUNC['PSHI']:
+                val = ram[rr, h & MASK_12BIT]
+                sp = (sp - 1) & MASK_16BIT
+                regs[rr, SP] = sp
+                ram[rr, sp & MASK_12BIT] = val
+            elif code == EXT_FUNC['POPI']:
+                val = ram[rr, sp & MASK_12BIT]
+                regs[rr, SP] = (sp + 1) & MASK_16BIT
+                ram[rr, h & MASK_12BIT] = val
+            elif code == EXT_FUNC['PUSH']:
+                sp = (sp - 1) & MASK_16BIT
+                regs[rr, SP] = sp
+                ram[rr, sp & MASK_12BIT] = regs[rr, H]
+            elif code == EXT_FUNC['POP']:
+                res = ram[rr, sp & MASK_12BIT]
+                regs[rr, H] = res
+                regs[rr, SP] = (sp + 1) & MASK_16BIT
+                self._set_flags(rr, res)
+            elif code == EXT_FUNC['RETN']:
+                regs[rr, PC] = ram[rr, sp & MASK_12BIT]
+                regs[rr, SP] = (sp + 1) & MASK_16BIT
+            elif code == EXT_FUNC['SWAP']:
+                regs[rr, H] = sp
+                regs[rr, SP] = h
+            elif code == EXT_FUNC['INSP']:
+                regs[rr, SP] = (sp + 1) & MASK_16BIT
+            elif code == EXT_FUNC['DESP']:
+                regs[rr, SP] = (sp - 1) & MASK_16BIT
+            # Qualquer outro codigo e NOP
+
+    def run(self, max_cycles=None):
+        """Roda ate todas pararem (ou max_cycles passos). Devolve os ciclos de cada uma."""
+        steps = 0
+        while max_cycles is None or steps < max_cycles:
+            if not self.step(): break
+            steps += 1
+        return self.cycles
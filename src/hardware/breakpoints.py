@@ -0,0 +1,136 @@
+"""Breakpoints de PC, watchpoints de memoria e paradas condicionais em registrador.
+
+Cada tipo fica num bytearray de 4096 posicoes (1 = ligado), entao o laco do
+Mic1CPU.run so faz um indice por instrucao. Sem nada ligado o run() nem olha
+(o teste e feito uma vez antes do laco) e o MemorySystem continua com os
+metodos normais de leitura/escrita.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+from src.common.constants import MASK_12BIT, MEM_SIZE
+
+@dataclass
+class BreakHit:
+    """Motivo da ultima parada"""
+    kind: str  # 'PC', 'REG', 'READ' ou 'WRITE'
+    addr: int  # Endereco (PC ou memoria); -1 pra REG
+    old: int = 0  # Valor antes (memoria) ou valor do registrador
+    new: int = 0  # Valor depois (igual ao old numa leitura)
+    reg: str = ""
+
+    def __str__(self):
+        if self.kind == "PC": return f"BREAK PC x{self.addr:03X}"
+        if self.kind == "REG": return f"BREAK {self.reg.upper()}={self.old:04X}"
+        return f"WATCH {self.kind[0]} [{self.addr:03X}] {self.old:04X}->{self.new:04X}"
+
+# Registradores que podem ter condicao (os que o run() muda)
+COND_REGS = ("pc", "sp", "h")
+
+class Breakpoints:
+    """Conjunto de paradas de uma Mic1CPU (cpu.breakpoints)"""
+    def __init__(self, mem):
+        self.mem = mem
+        self.pc = bytearray(MEM_SIZE)
+        self.rd = bytearray(MEM_SIZE)
+        self.wr = bytearray(MEM_SIZE)
+        self.conds = [] # (registrador, valor ou funcao)
+        self.enabled = True
+        self.hit: Optional[BreakHit] = None
+        self._counts = [0, 0, 0] # Quantos enderecos ligados em pc, rd, wr
+
+    # --- Configuracao ---
+
+    def _set(self, i, bits, addr, on):
+        addr &= MASK_12BIT
+        if bits[addr] == on: return
+        bits[addr] = on
+        self._counts[i] += 1 if on else -1
+        if i: self._sync_mem()
+
+    def add(self, addr: int): self._set(0, self.pc, addr, 1)
+    def remove(self, addr: int): self._set(0, self.pc, addr, 0)
+
+    def toggle(self, addr: int) -> bool:
+        on = not self.pc[addr & MASK_12BIT]
+        self._set(0, self.pc, addr, int(on))
+        return on
+
+    def watch(self, start: int, end: Optional[int] = None, read=False, write=True):
+        """Vigia os enderecos start..end (inclusive)"""
+        for a in range(start, (start if end is None else end) + 1):
+            if read: self._set(1, self.rd, a, 1)
+            if write: self._set(2, self.wr, a, 1)
+
+    def watching(self, addr: int) -> bool:
+        addr &= MASK_12BIT
+        return bool(self.rd[addr] or self.wr[addr])
+
+    def unwatch(self, start: int, end: Optional[int] = None):
+        for a in range(start, (start if end is None else end) + 1):
+            self._set(1, self.rd, a, 0)
+            self._set(2, self.wr, a, 0)
+
+    def add_cond(self, reg: str, cond: Union[int, Callable[[int], bool]]):
+        """Para quando o registrador (pc, sp ou h) tiver esse valor ou cond(valor) for verdadeiro"""
+        reg = reg.lower()
+        if reg not in COND_REGS: raise ValueError(f"Condicao so em {', '.join(COND_REGS)} (nao {reg})")
+        self.conds.append((reg, cond))
+
+    def clear(self):
+        self.pc[:] = self.rd[:] = self.wr[:] = bytes(MEM_SIZE)
+        self._counts = [0, 0, 0]
+        self.conds.clear()
+        self._sync_mem()
+
+    def _sync_mem(self):
+        self.mem.set_watch(self.rd if self._counts[1] else None, self.wr if self._counts[2] else None)
+
+    # --- Consulta (usada pelo run() e pela interface) ---
+
+    @property
+    def active(self) -> bool:
+        return self.has_pc or self.has_conds or self.has_watch
+
+    @property
+    def has_pc(self) -> bool:
+        return self.enabled and self._counts[0] > 0
+
+    @property
+    def has_conds(self) -> bool:
+        return self.enabled and bool(self.conds)
+
+    @property
+    def has_watch(self) -> bool:
+        return self.enabled and (self._counts[1] > 0 or self._counts[2] > 0)
+
+    def check_regs(self, pc, sp, h) -> Optional[BreakHit]:
+        vals = {"pc": pc, "sp": sp, "h": h}
+        for reg, cond in self.conds:
+            v = vals[reg]
+            if (cond(v) if callable(cond) else v == cond):
+                return BreakHit("REG", -1, v, v, reg)
+        return None
+
+    def check(self, pc, sp, h) -> Optional[BreakHit]:
+        # Mesmo teste que o run() faz antes de cada instrucao (usado pela interface)
+        if self.has_pc and self.pc[pc & MASK_12BIT]: return BreakHit("PC", pc & MASK_12BIT)
+        if self.has_conds: return self.check_regs(pc, sp, h)
+        return None
+
+    def take_watch_hit(self) -> Optional[BreakHit]:
+        # Pega (e limpa) o acesso vigiado que o MemorySystem anotou
+        h = self.mem.watch_hit
+        if h is None: return None
+        self.mem.watch_hit = None
+        return BreakHit(*h)
+
+    @contextmanager
+    def paused(self):
+        # Desliga as paradas temporariamente (ex: diario re-executando instrucoes)
+        old = self.enabled
+        self.enabled = False
+        try:
+            yield
+        finally:
+            self.enabled = old
@@ -1,6 +1,13 @@
-from dataclasses import dataclass
-from typing import List
+import hashlib
+import mmap
+import os
+import sys
+from array import array
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Union
 from src.common.constants import MASK_16BIT, MASK_12BIT, CACHE_SIZE_L1, MEM_SIZE
+from src.hardware.stats import CacheStats, COMPULSORY, CAPACITY, CONFLICT, FLUSH
 
 @dataclass
 class Register:
@@ -20,63 +27,853 @@ class Register:
     def __repr__(self):
         return f"[{self.name}: {self.value:04X}]"
 
-class CacheLine:
+# Registradores da MIC-1 (ordem usada no RegisterFile e no snapshot da CPU)
+REG_NAMES = ("mar", "mdr", "pc", "mbr", "sp", "lv", "cpp", "tos", "opc", "h")
+
+class RegisterFile:
+    """Todos os registradores num objeto so, com __slots__.
+
+    Quem escreve ja mascara pra 16 bits, entao ler e so pegar o atributo
+    (regs.pc), sem property nem mascara como no Register.
+    """
+    __slots__ = REG_NAMES
+
     def __init__(self):
-        self.valid = False
-        self.tag = 0
-        self.data = 0
+        self.reset()
+
+    def reset(self):
+        for r in REG_NAMES: setattr(self, r, 0)
+        self.sp = 4095 # Pilha comeca no topo
+
+    def view(self, name: str) -> "RegisterView":
+        return RegisterView(name.upper(), self, name.lower())
+
+class RegisterView:
+    """Fachada com .value (igual ao Register) pra um registrador do RegisterFile.
+    Mantem funcionando codigo antigo tipo getattr(cpu, 'pc').value"""
+    __slots__ = ("name", "_file", "_attr")
+
+    def __init__(self, name: str, regfile: RegisterFile, attr: str):
+        self.name = name
+        self._file = regfile
+        self._attr = attr
+
+    @property
+    def value(self) -> int:
+        return getattr(self._file, self._attr)
+
+    @value.setter
+    def value(self, val: int):
+        setattr(self._file, self._attr, val & MASK_16BIT)
+
+    def __repr__(self):
+        return f"[{self.name}: {self.value:04X}]"
+
+# Bit que marca registro de cache no diario de desfazer (ver MemorySystem.log)
+LOG_CACHE = 1 << 60
+# Qual cache gravou (bits 58-59: 0 = I, 1 = D, 2 = L2)
+LOG_CACHE_SHIFT = 58
+# Tipos de registro de cache no diario (bits 56-57) e onde fica o indice
+LOG_META, LOG_WORD, LOG_REPL, LOG_RNG = 0, 1, 2, 3
+LOG_KIND_SHIFT = 56
+LOG_IDX_SHIFT = 44
+LOG_VAL_MASK = (1 << LOG_IDX_SHIFT) - 1
+# Registro de dispositivo de E/S (src/hardware/devices.py): indice << 44 | pos antigo
+LOG_DEV = 1 << 61
+
+# Tipo de acesso em cada palavra de um trace (ver MemorySystem.set_trace):
+# tipo | endereco de 12 bits, cabe num uint16
+TRACE_FETCH, TRACE_READ, TRACE_WRITE = 0, 1 << 12, 2 << 12
+
+# Status de Cache que contam como miss (ver MemorySystem.set_miss_count)
+MISS_STATUSES = frozenset(("MISS", "MISS-WB", "WR-MISS", "WR-MISS-WB"))
+
+# Politicas de substituicao (so importam com mais de uma via)
+REPL_POLICIES = ("LRU", "FIFO", "RANDOM", "PLRU")
+
+@dataclass(frozen=True)
+class CacheConfig:
+    """Geometria e politicas de escrita de uma cache (o padrao e a L1 do trabalho:
+    16 linhas de 1 palavra, mapeamento direto, write-through sem write-allocate)"""
+    lines: int = CACHE_SIZE_L1  # Total de linhas
+    block: int = 1  # Palavras por linha
+    ways: int = 1  # Vias por conjunto (1 = mapeamento direto, lines = totalmente associativa)
+    policy: str = "LRU"  # LRU, FIFO, RANDOM ou PLRU
+    write_back: bool = False  # False = write-through
+    write_allocate: bool = False
+
+    def __post_init__(self):
+        for name in ("lines", "block", "ways"):
+            v = getattr(self, name)
+            if v < 1 or v & (v - 1): raise ValueError(f"{name} precisa ser potencia de 2 (nao {v})")
+        if self.ways > self.lines: raise ValueError(f"{self.ways} vias nao cabem em {self.lines} linhas")
+        if self.lines * self.block > MEM_SIZE:
+            raise ValueError(f"Cache de {self.lines * self.block} palavras e maior que a RAM")
+        if self.policy not in REPL_POLICIES:
+            raise ValueError(f"Politica {self.policy} invalida (use {', '.join(REPL_POLICIES)})")
+
+    @property
+    def sets(self) -> int:
+        return self.lines // self.ways
+
+@dataclass(frozen=True)
+class TimingConfig:
+    """Latencia (em ciclos) de um acesso a cada nivel da memoria.
+
+    A busca e em serie: parar na L1 custa l1, na L2 custa l1 + l2 e ir ate a
+    RAM custa l1 (+ l2) + ram. Tudo isso conta como ciclos de espera (stall)
+    alem do ciclo da instrucao; com l1 = 0 um acerto na L1 nao atrasa nada.
+    Escritas write-through e linhas sujas expulsas pagam o nivel de baixo.
+    """
+    l1: int = 0
+    l2: int = 10
+    ram: int = 100
+
+    def __post_init__(self):
+        for name in ("l1", "l2", "ram"):
+            if getattr(self, name) < 0: raise ValueError(f"Latencia {name} negativa")
 
 class Cache:
-    """Implementacao da Cache L1 (Mapeamento Direto)"""
-    def __init__(self, size=CACHE_SIZE_L1, name="L1"):
-        self.size = size
+    """Cache configuravel (L1 ou L2, ver CacheConfig), toda em arrays planos.
+
+    A linha `slot = conjunto * ways + via` tem valid/dirty/tag no indice slot e
+    as palavras em data[slot * block:(slot + 1) * block]. A RAM continua sempre
+    atualizada (o MemorySystem escreve nela antes), entao no write-back a
+    escrita so marca a linha como suja e o status avisa quando uma linha suja
+    sai da cache.
+    """
+    # Status possiveis (o indice vai no snapshot)
+    STATUSES = ("COLD", "HIT", "MISS", "WR-HIT", "WR-MISS", "FLUSHED", "MISS-WB", "WR-MISS-WB", "INVAL")
+
+    def __init__(self, config: Optional[CacheConfig] = None, name="L1"):
+        cfg = self.config = config or CacheConfig()
         self.name = name
+        self.size = cfg.lines
+        self.block = cfg.block
+        self.ways = cfg.ways
+        self.policy = cfg.policy
+        self.write_back = cfg.write_back
+        self.write_allocate = cfg.write_allocate
+        self.bshift = cfg.block.bit_length() - 1
+        self.smask = cfg.sets - 1
+        self.tshift = self.bshift + cfg.sets.bit_length() - 1
         self.last_status = "COLD"
-        self.lines = [CacheLine() for _ in range(size)]
+        self.valid = bytearray(self.size)
+        self.dirty = bytearray(self.size)
+        self.tags = [0] * self.size
+        self.data = [0] * (self.size * self.block)
+        # LRU/FIFO: carimbo do ultimo acesso/preenchimento de cada linha (menor sai)
+        self.stamps = [0] * self.size
+        self.clock = 1
+        # PLRU: ways - 1 bits de arvore por conjunto (1 = proxima vitima a direita)
+        self.plru = bytearray(cfg.sets * (self.ways - 1))
+        self.rng = 0xACE1 # xorshift de 16 bits pra RANDOM (deterministico)
+        # Contadores (src/hardware/stats.py) ou None quando desligados
+        self.stats = None
+        # Enderecos ja trazidos pra essa cache (detector de codigo auto-modificavel) ou None
+        self.fetched = None
+        # Hierarquia (ver set_level): nivel de baixo (a L2 ou None = RAM),
+        # latencias e os ciclos de espera gastos nesse nivel
+        self.lower = None
+        self.timed = False
+        self.chained = False # lower ou timed: tem alguem embaixo pra avisar
+        self.latency = self.ram_latency = 0
+        self.stall = 0
+        # Diario de desfazer (array compartilhado com o MemorySystem) ou None
+        self.set_log(None)
+
+    def _find(self, addr):
+        # Devolve (slot da linha com o endereco ou -1, conjunto, tag)
+        s = addr >> self.bshift & self.smask
+        tag = addr >> self.tshift
+        base = s * self.ways
+        valid, tags = self.valid, self.tags
+        for slot in range(base, base + self.ways):
+            if valid[slot] and tags[slot] == tag: return slot, s, tag
+        return -1, s, tag
+
+    def set_log(self, log, tag=0):
+        self.log, self.log_tag = log, tag
+        self._pick_reader()
+
+    def set_stats(self, stats: Optional[CacheStats]):
+        self.stats = stats
+        self._pick_reader()
+
+    def set_fetched(self, fetched: Optional[bytearray]):
+        self.fetched = fetched
+        self._pick_reader()
+
+    def set_level(self, lower: Optional["Cache"], latency: int = 0, ram_latency: int = 0, timed: bool = False):
+        """Liga a cache no nivel de baixo (None = RAM) e define as latencias.
+        Com timed=False nada e contado e as latencias sao ignoradas."""
+        self.lower = lower
+        self.timed = timed
+        self.chained = timed or lower is not None
+        self.latency, self.ram_latency = (latency, ram_latency) if timed else (0, 0)
+        self._pick_reader()
+
+    def _pick_reader(self):
+        # L1 padrao (mapeamento direto, 1 palavra, write-through) sem diario,
+        # sem contadores e sem nivel de baixo/tempo usa o read() enxuto; o resto
+        # passa pelo generico
+        cfg = self.config
+        if self.log is None and self.fetched is None and not self.chained and \
+                cfg.ways == 1 and cfg.block == 1 and not cfg.write_back:
+            self.read = self._direct_reader() if self.stats is None else self._direct_counting_reader()
+        else:
+            self.__dict__.pop("read", None)
+
+    def _direct_reader(self):
+        # read() da L1 padrao com os arrays e constantes ja em variaveis locais
+        # (por isso flush/unpack mexem nos arrays no lugar em vez de trocar)
+        cache, tags, valid, data = self, self.tags, self.valid, self.data
+        mask, shift = self.smask, self.tshift
+
+        def read(addr: int, ram_ref: List[int]) -> int:
+            slot = addr & mask
+            tag = addr >> shift
+            if tags[slot] == tag and valid[slot]:
+                cache.last_status = "HIT"
+                return data[slot]
+            cache.last_status = "MISS"
+            valid[slot] = 1
+            tags[slot] = tag
+            data[slot] = val = ram_ref[addr]
+            return val
+        return read
+
+    def _direct_counting_reader(self):
+        # Mesmo read() enxuto, contando direto (sem passar pelo CacheStats.access)
+        cache, tags, valid, data = self, self.tags, self.valid, self.data
+        mask, shift, lines = self.smask, self.tshift, self.size
+        st = self.stats
+        line_access, set_access, addr_reads = st.line_access, st.set_access, st.addr_reads
+        seen, flushed, shadow, kinds = st.seen, st.flushed, st.shadow, st.miss_kinds
+
+        def read(addr: int, ram_ref: List[int]) -> int:
+            slot = addr & mask
+            tag = addr >> shift
+            addr_reads[addr] += 1
+            line_access[slot] += 1
+            set_access[slot] += 1
+            # Com 1 palavra por linha o bloco e o proprio endereco
+            in_fa = addr in shadow
+            if in_fa: shadow.move_to_end(addr)
+            else:
+                shadow[addr] = None
+                if len(shadow) > lines: shadow.popitem(last=False)
+            if tags[slot] == tag and valid[slot]:
+                st.read_hits += 1
+                cache.last_status = "HIT"
+                return data[slot]
+            st.read_misses += 1
+            kinds[COMPULSORY if not seen[addr] else FLUSH if flushed[addr] else CONFLICT if in_fa else CAPACITY] += 1
+            seen[addr] = 1
+            flushed[addr] = 0
+            if valid[slot]: st.evictions += 1
+            st.ram_words_read += 1
+            cache.last_status = "MISS"
+            valid[slot] = 1
+            tags[slot] = tag
+            data[slot] = val = ram_ref[addr]
+            return val
+        return read
 
     def read(self, addr: int, ram_ref: List[int]) -> int:
-        idx = addr % self.size
-        tag = addr // self.size
-        line = self.lines[idx]
+        st = self.stats
+        if self.timed: self._wait(self.latency)
+        if self.ways == 1:
+            s = addr >> self.bshift & self.smask
+            tag = addr >> self.tshift
+            slot = s if self.valid[s] and self.tags[s] == tag else -1
+        else:
+            slot, s, tag = self._find(addr)
+            if slot >= 0:
+                if self.policy == "LRU": self._stamp(slot)
+                elif self.policy == "PLRU": self._plru_touch(s, slot)
 
-        # Verifica Hit
-        if line.valid and line.tag == tag:
+        if slot >= 0:
             self.last_status = "HIT"
-            return line.data
-        
-        # Miss: busca na RAM e atualiza a linha
-        self.last_status = "MISS"
-        val = ram_ref[addr]
-        line.valid = True
-        line.tag = tag
-        line.data = val
-        return val
+            if st is not None:
+                st.read_hits += 1; st.addr_reads[addr] += 1
+                st.access(slot, s, addr >> self.bshift)
+            return self.data[slot << self.bshift | addr & (self.block - 1)]
 
-    def write_through(self, addr: int, val: int):
-        # Politica Write-Through: atualiza cache se der match
-        idx = addr % self.size
-        tag = addr // self.size
-        line = self.lines[idx]
+        # Miss: traz o bloco inteiro do nivel de baixo
+        if st is not None:
+            st.read_misses += 1; st.addr_reads[addr] += 1
+            st.miss(addr >> self.bshift)
+        slot, wb = self._fill(s, tag, addr, ram_ref)
+        self.last_status = "MISS-WB" if wb else "MISS"
+        return self.data[slot << self.bshift | addr & (self.block - 1)]
 
-        if line.valid and line.tag == tag:
-            line.data = val & MASK_16BIT
+    def write(self, addr: int, val: int, ram_ref: List[int]):
+        # Chamado depois da RAM ja ter o valor novo
+        slot, s, tag = self._find(addr)
+        st = self.stats
+        if self.timed: self._wait(self.latency)
+        if st is not None:
+            st.addr_writes[addr] += 1
+            if not self.write_back: st.ram_words_written += 1
+        if slot >= 0:
+            if self.block == 1:
+                if self.log is not None:
+                    self.log.append(self.log_tag | LOG_WORD << LOG_KIND_SHIFT | slot << LOG_IDX_SHIFT | self.data[slot])
+                self.data[slot] = val & MASK_16BIT
+            else:
+                # Recarrega a linha inteira da RAM (que ja esta em dia): assim a
+                # L2 tambem pega as outras palavras de uma linha suja da L1
+                self._reload(slot, addr & ~(self.block - 1), ram_ref)
+            if self.write_back:
+                if self.log is not None and not self.dirty[slot]: self._log_meta(slot)
+                self.dirty[slot] = 1
+            elif self.chained: self._to_lower(addr, 1, ram_ref)
+            if self.policy == "LRU": self._stamp(slot)
+            elif self.policy == "PLRU": self._plru_touch(s, slot)
             self.last_status = "WR-HIT"
+            if st is not None:
+                st.write_hits += 1
+                st.access(slot, s, addr >> self.bshift)
+            return
+        if st is not None:
+            st.write_misses += 1
+            st.miss(addr >> self.bshift)
+        if self.write_allocate:
+            slot, wb = self._fill(s, tag, addr, ram_ref)
+            if self.write_back: self.dirty[slot] = 1
+            elif self.chained: self._to_lower(addr, 1, ram_ref)
+            self.last_status = "WR-MISS-WB" if wb else "WR-MISS"
         else:
+            if st is not None:
+                st.seen[addr >> self.bshift] = 1
+                if self.write_back: st.ram_words_written += 1 # Vai direto pra RAM
+            if self.chained: self._to_lower(addr, 1, ram_ref)
             self.last_status = "WR-MISS"
 
+    def _reload(self, slot, start, ram):
+        b = self.block
+        off = slot * b
+        new = ram[start:start + b]
+        if self.log is not None:
+            t = self.log_tag | LOG_WORD << LOG_KIND_SHIFT
+            self.log.extend([t | (off + k) << LOG_IDX_SHIFT | w
+                             for k, w in enumerate(self.data[off:off + b]) if w != new[k]])
+        self.data[off:off + b] = new
+
+    def _wait(self, n):
+        # Soma ciclos de espera (o diario guarda o total antigo como LOG_RNG indice 1)
+        if self.log is not None: self.log.append(self.log_tag | LOG_RNG << LOG_KIND_SHIFT | 1 << LOG_IDX_SHIFT | self.stall)
+        self.stall += n
+
+    def _from_lower(self, start, n, ram):
+        # Busca as palavras [start, start + n) no nivel de baixo
+        lo = self.lower
+        if lo is None:
+            if self.timed: self._wait(self.ram_latency)
+            return
+        for a in range(start, start + n, lo.block): lo.read(a, ram)
+
+    def _to_lower(self, start, n, ram):
+        # Manda as palavras [start, start + n) pro nivel de baixo (write-through
+        # ou linha suja saindo); a RAM em si ja esta em dia
+        lo = self.lower
+        if lo is None:
+            if self.timed: self._wait(self.ram_latency)
+            return
+        for a in range(start, start + n, lo.block): lo.write(a, ram[a], ram)
+
+    def _fill(self, s, tag, addr, ram):
+        # Escolhe a vitima no conjunto s e carrega o bloco de addr nela.
+        # Devolve (slot, se a vitima estava suja)
+        slot = self._victim(s)
+        b = self.block
+        off = slot * b
+        log = self.log
+        if log is not None:
+            self._log_meta(slot)
+            t = self.log_tag | LOG_WORD << LOG_KIND_SHIFT
+            log.extend([t | (off + k) << LOG_IDX_SHIFT | w for k, w in enumerate(self.data[off:off + b])])
+        wb = bool(self.valid[slot] and self.dirty[slot])
+        st = self.stats
+        if st is not None:
+            st.ram_words_read += b
+            if self.valid[slot]: st.evictions += 1
+            if wb:
+                st.writebacks += 1
+                st.ram_words_written += b
+            st.access(slot, s, addr >> self.bshift)
+        start = addr & ~(b - 1)
+        if self.chained:
+            if wb: self._to_lower((self.tags[slot] << self.tshift | s << self.bshift), b, ram)
+            self._from_lower(start, b, ram)
+        self.valid[slot] = 1
+        self.dirty[slot] = 0
+        self.tags[slot] = tag
+        self.data[off:off + b] = ram[start:start + b]
+        if self.fetched is not None: self.fetched[start:start + b] = b"\x01" * b
+        if self.ways > 1:
+            if self.policy == "PLRU": self._plru_touch(s, slot)
+            else: self._stamp(slot)
+        return slot, wb
+
+    def _victim(self, s):
+        base = s * self.ways
+        if self.ways == 1: return base
+        valid = self.valid
+        for slot in range(base, base + self.ways):
+            if not valid[slot]: return slot
+        p = self.policy
+        if p == "RANDOM":
+            x = self.rng
+            if self.log is not None: self.log.append(self.log_tag | LOG_RNG << LOG_KIND_SHIFT | x)
+            x ^= x << 7 & MASK_16BIT
+            x ^= x >> 9
+            x ^= x << 8 & MASK_16BIT
+            self.rng = x
+            return base + (x & (self.ways - 1))
+        if p == "PLRU":
+            # Segue os bits da arvore ate uma folha
+            node, nb = 0, s * (self.ways - 1)
+            while node < self.ways - 1:
+                node = 2 * node + 1 + self.plru[nb + node]
+            return base + node - (self.ways - 1)
+        stamps = self.stamps
+        return min(range(base, base + self.ways), key=stamps.__getitem__)
+
+    def _stamp(self, slot):
+        if self.log is not None:
+            self.log.append(self.log_tag | LOG_REPL << LOG_KIND_SHIFT | slot << LOG_IDX_SHIFT | self.stamps[slot])
+        self.stamps[slot] = self.clock
+        self.clock += 1
+
+    def _plru_touch(self, s, slot):
+        # Aponta cada no do caminho pra longe da via usada
+        ways = self.ways
+        nb = s * (ways - 1)
+        node = (slot - s * ways) + ways - 1
+        plru, log = self.plru, self.log
+        while node:
+            parent = (node - 1) >> 1
+            away = 0 if node == 2 * parent + 2 else 1
+            i = nb + parent
+            if plru[i] != away:
+                if log is not None: log.append(self.log_tag | LOG_REPL << LOG_KIND_SHIFT | i << LOG_IDX_SHIFT | plru[i])
+                plru[i] = away
+            node = parent
+
+    def _log_meta(self, slot):
+        self.log.append(self.log_tag | LOG_META << LOG_KIND_SHIFT | slot << LOG_IDX_SHIFT |
+                        self.valid[slot] << 17 | self.dirty[slot] << 16 | self.tags[slot])
+
+    def undo(self, rec: int):
+        # Desfaz um registro do diario gravado por essa cache
+        kind, i, v = rec >> LOG_KIND_SHIFT & 3, rec >> LOG_IDX_SHIFT & 0xFFF, rec & LOG_VAL_MASK
+        if kind == LOG_META:
+            self.valid[i], self.dirty[i], self.tags[i] = v >> 17 & 1, v >> 16 & 1, v & MASK_16BIT
+        elif kind == LOG_WORD: self.data[i] = v
+        elif kind == LOG_RNG:
+            if i: self.stall = v
+            else: self.rng = v
+        elif self.policy == "PLRU": self.plru[i] = v
+        else: self.stamps[i] = v
+
+    def invalidate(self, addr: int) -> bool:
+        """Descarta so a linha que tem addr (coerencia com escritas de dados).
+        Devolve True se ela estava na cache."""
+        if self.ways == 1:
+            slot = addr >> self.bshift & self.smask
+            if not (self.valid[slot] and self.tags[slot] == addr >> self.tshift): return False
+        else:
+            slot = self._find(addr)[0]
+            if slot < 0: return False
+        b = self.block
+        off = slot * b
+        log = self.log
+        if log is not None:
+            self._log_meta(slot)
+            t = self.log_tag | LOG_WORD << LOG_KIND_SHIFT
+            log.extend([t | (off + k) << LOG_IDX_SHIFT | w for k, w in enumerate(self.data[off:off + b]) if w])
+            # PLRU nao usa stamps (o registro LOG_REPL dela vai pra arvore de bits)
+            if self.policy != "PLRU" and self.stamps[slot]:
+                log.append(self.log_tag | LOG_REPL << LOG_KIND_SHIFT | slot << LOG_IDX_SHIFT | self.stamps[slot])
+        st = self.stats
+        if st is not None:
+            st.invalidations += 1
+            st.flushed[addr >> self.bshift] = 1
+            if self.dirty[slot]:
+                st.writebacks += 1
+                st.ram_words_written += b
+        # Linha invalida fica zerada (o flush() conta com isso)
+        self.valid[slot] = self.dirty[slot] = 0
+        self.tags[slot] = self.stamps[slot] = 0
+        self.data[off:off + b] = [0] * b
+        self.last_status = "INVAL"
+        return True
+
     def flush(self):
         # Limpa tudo (usado quando reseta ou carrega programa novo)
-        self.lines = [CacheLine() for _ in range(self.size)]
+        # Linha invalida ja fica zerada, entao sem nenhuma valida nao tem o que limpar
         self.last_status = "FLUSHED"
+        if self.stats is not None: self.stats.flush(self)
+        if 1 not in self.valid: return
+        log = self.log
+        if log is not None:
+            b = self.block
+            for slot in range(self.size):
+                if self.valid[slot]:
+                    self._log_meta(slot)
+                    t = self.log_tag | LOG_WORD << LOG_KIND_SHIFT
+                    log.extend([t | (slot * b + k) << LOG_IDX_SHIFT | w
+                                for k, w in enumerate(self.data[slot * b:(slot + 1) * b]) if w])
+            if self.policy == "PLRU":
+                log.extend([self.log_tag | LOG_REPL << LOG_KIND_SHIFT | i << LOG_IDX_SHIFT | 1 for i, v in enumerate(self.plru) if v])
+            else:
+                log.extend([self.log_tag | LOG_REPL << LOG_KIND_SHIFT | i << LOG_IDX_SHIFT | v for i, v in enumerate(self.stamps) if v])
+        n = self.size
+        self.valid[:] = self.dirty[:] = bytes(n)
+        self.tags[:] = [0] * n
+        self.data[:] = [0] * (n * self.block)
+        self.stamps[:] = [0] * n
+        self.plru[:] = bytes(len(self.plru))
+
+    def line(self, slot: int):
+        """(valid, dirty, tag, palavras) de uma linha (pra interface e ferramentas)"""
+        b = self.block
+        return bool(self.valid[slot]), bool(self.dirty[slot]), self.tags[slot], self.data[slot * b:(slot + 1) * b]
+
+    def copy(self):
+        other = Cache(self.config, self.name)
+        other.last_status = self.last_status
+        other.valid[:], other.dirty[:], other.plru[:] = self.valid, self.dirty, self.plru
+        other.tags[:], other.data[:], other.stamps[:] = self.tags, self.data, self.stamps
+        other.clock, other.rng, other.stall = self.clock, self.rng, self.stall
+        return other
+
+    def _ranks(self):
+        # Ordem de cada linha dentro do conjunto pelo carimbo (so a ordem importa)
+        ranks = [0] * self.size
+        stamps = self.stamps
+        for base in range(0, self.size, self.ways):
+            order = sorted(range(base, base + self.ways), key=lambda i: (stamps[i], i))
+            for r, slot in enumerate(order): ranks[slot] = r
+        return ranks
+
+    def pack(self) -> bytes:
+        # status | valid | dirty (1 byte/linha) | PLRU | tags | dados | ordem LRU/FIFO | rng (uint16) | stall (uint64)
+        words = array('H', self.tags + self.data + self._ranks() + [self.rng])
+        if sys.byteorder == "big": words.byteswap()
+        return bytes([self.STATUSES.index(self.last_status)]) + self.valid + self.dirty + \
+            self.plru + words.tobytes() + self.stall.to_bytes(8, "little")
+
+    def unpack(self, buf) -> int:
+        # Le o formato do pack(); devolve quantos bytes consumiu
+        n, nd, npl = self.size, self.size * self.block, len(self.plru)
+        self.last_status = self.STATUSES[buf[0]]
+        self.valid[:] = buf[1:1 + n]
+        self.dirty[:] = buf[1 + n:1 + 2 * n]
+        self.plru[:] = buf[1 + 2 * n:1 + 2 * n + npl]
+        off = 1 + 2 * n + npl
+        words = array('H')
+        words.frombytes(buf[off:off + 2 * (2 * n + nd + 1)])
+        if sys.byteorder == "big": words.byteswap()
+        w = words.tolist()
+        self.tags[:], self.data[:], self.rng = w[:n], w[n:n + nd], w[-1]
+        # Ordem LRU/FIFO; a PLRU fica com stamps zerado (o estado dela e o plru)
+        self.stamps[:] = w[n + nd:2 * n + nd] if self.policy != "PLRU" else [0] * n
+        self.clock = max(self.clock, self.ways)
+        off += 2 * len(w)
+        self.stall = int.from_bytes(buf[off:off + 8], "little")
+        return off + 8
+
+# Quantas escritas em codigo o detector guarda (smc_count conta todas)
+SMC_MAX_HITS = 1000
 
 class MemorySystem:
-    """Gerencia RAM e as duas Caches (Instrucao e Dados)"""
-    def __init__(self, size=MEM_SIZE):
+    """Gerencia RAM, as duas L1 (Instrucao e Dados) e a L2 unificada opcional"""
+    def __init__(self, size=MEM_SIZE, i_cache: Optional[CacheConfig] = None,
+                 d_cache: Optional[CacheConfig] = None, flush_icache_on_write: bool = False,
+                 l2: Optional[CacheConfig] = None, timing: Optional[TimingConfig] = None):
         self.size = size
-        self.ram = [0] * size
-        self.i_cache = Cache(name="I-Cache")
-        self.d_cache = Cache(name="D-Cache")
+        # RAM contigua (uint16 nativo): ram[addr] continua funcionando e da pra
+        # passar ela direto pra memoryview/hashlib/arquivo sem copiar (ver ram_view)
+        self.ram = array('H', bytes(2 * size))
+        self.i_cache = Cache(i_cache, name="I-Cache")
+        self.d_cache = Cache(d_cache, name="D-Cache")
+        # L2 unificada: as duas L1 buscam nela em vez de ir direto na RAM
+        self.l2 = Cache(l2, name="L2") if l2 is not None else None
+        self.caches = (self.i_cache, self.d_cache) + ((self.l2,) if self.l2 is not None else ())
+        # Modelo de tempo (ver set_timing); None = so conta instrucoes
+        self.set_timing(timing)
         self.last_addr = -1
+        # Escrita de dados descarta so a linha da I-Cache com aquele endereco;
+        # True volta pro modo antigo (limpa a I-Cache inteira a cada escrita)
+        self.flush_icache_on_write = flush_icache_on_write
+        # Detector de codigo auto-modificavel (ver set_smc_detect)
+        self.smc = None
+        self.smc_hits = []
+        self.smc_count = 0
+        # Callback opcional avisado quando a RAM muda (ex: cache de blocos traduzidos)
+        # Recebe o endereco escrito, ou None quando a RAM inteira foi trocada
+        self.code_hook = None
+        # RAM compartilhada com um fork: copia so na primeira escrita
+        self._ram_shared = False
+        # Watchpoints (src/hardware/breakpoints.py): ver set_watch()
+        self.watch_hit = None
+        self._watch_rd = self._watch_wr = None
+        # Trace de enderecos (src/hardware/trace.py): ver set_trace()
+        self.trace = None
+        # Misses da D-Cache (profiler, src/hardware/profiler.py): ver set_miss_count()
+        self.d_misses = None
+        # Diario de desfazer (src/hardware/journal.py): array('q') onde RAM e
+        # caches anotam o valor antigo de tudo que mudam, ou None quando desligado
+        # Cada registro e um inteiro so (assim o coletor de lixo nem olha o log):
+        #   RAM:   endereco << 16 | valor antigo
+        #   Cache: LOG_CACHE | cache << 58 | tipo << 56 | indice << 44 | valor antigo
+        #          (tipos LOG_META, LOG_WORD, LOG_REPL e LOG_RNG, ver Cache.undo)
+        #   E/S:   LOG_DEV | dispositivo << 44 | pos antigo
+        self.log = None
+        # Dispositivos mapeados em memoria (ver attach): _io_map[endereco] =
+        # indice em devices + 1, ou 0 = RAM
+        self.devices = []
+        self._dev_base = []
+        self._io_map = None
+
+    def set_watch(self, rd=None, wr=None):
+        """Liga os watchpoints (bytearray com 1 nos enderecos vigiados, None = nenhum).
+        Sem watchpoint ficam os metodos normais, entao nao custa nada."""
+        self._watch_rd, self._watch_wr = rd, wr
+        self.watch_hit = None # (tipo, endereco, antigo, novo) do primeiro acesso vigiado
+        self._bind_hooks()
+
+    def set_trace(self, trace: Optional[array]):
+        """Anota cada acesso da CPU em trace (array('H') com TRACE_* | endereco),
+        ou None pra parar. Igual aos watchpoints, desligado nao custa nada."""
+        self.trace = trace
+        self._bind_hooks()
+
+    def set_miss_count(self, on: bool = True):
+        """Conta em d_misses os misses da D-Cache (leitura e escrita), ou None
+        pra parar. Igual ao trace, desligado nao custa nada."""
+        self.d_misses = 0 if on else None
+        self._bind_hooks()
+
+    def _bind_hooks(self):
+        # Monta a cadeia de acessos so com o que estiver ligado, de dentro pra
+        # fora: caches/RAM, contador de misses, trace, dispositivos, watchpoints.
+        # Sem nada ficam os metodos da classe (nao custa nada)
+        ri = MemorySystem.read_instr.__get__(self)
+        rd = MemorySystem.read_data.__get__(self)
+        wr = MemorySystem.write.__get__(self)
+        if self.d_misses is not None: rd, wr = self._counted(rd, wr)
+        if self.trace is not None: ri, rd, wr = self._traced(ri, rd, wr)
+        if self.devices: ri, rd, wr = self._mapped(ri, rd, wr)
+        if self._watch_rd is not None: rd = self._watched_rd(rd)
+        if self._watch_wr is not None: wr = self._watched_wr(wr)
+        for name, fn in (("read_instr", ri), ("read_data", rd), ("write", wr)):
+            if getattr(fn, "__func__", None) is getattr(MemorySystem, name): self.__dict__.pop(name, None)
+            else: setattr(self, name, fn)
+        # Blocos traduzidos guardaram os metodos antigos
+        if self.code_hook: self.code_hook(None)
+
+    def _counted(self, rd, wr):
+        d = self.d_cache
+
+        def read_data(addr: int) -> int:
+            val = rd(addr)
+            if d.last_status in MISS_STATUSES: self.d_misses += 1
+            return val
+
+        def write(addr: int, val: int):
+            wr(addr, val)
+            if d.last_status in MISS_STATUSES: self.d_misses += 1
+        return read_data, write
+
+    def _traced(self, ri, rd, wr):
+        app = self.trace.append
+
+        def read_instr(addr: int) -> int:
+            app(TRACE_FETCH | addr & MASK_12BIT)
+            return ri(addr)
+
+        def read_data(addr: int) -> int:
+            app(TRACE_READ | addr & MASK_12BIT)
+            return rd(addr)
+
+        def write(addr: int, val: int):
+            app(TRACE_WRITE | addr & MASK_12BIT)
+            wr(addr, val)
+        return read_instr, read_data, write
+
+    def _mapped(self, ri, rd, wr):
+        # Enderecos de dispositivo nao vao pra RAM nem pras caches (nem pro trace)
+        io_map, devs, bases = self._io_map, self.devices, self._dev_base
+
+        def access(k, addr):
+            self.last_addr = addr
+            dev = devs[k]
+            if self.log is not None: self.log.append(LOG_DEV | k << LOG_IDX_SHIFT | dev.pos)
+            return dev, addr - bases[k]
+
+        def read_data(addr: int) -> int:
+            addr &= MASK_12BIT
+            k = io_map[addr]
+            if not k: return rd(addr)
+            dev, off = access(k - 1, addr)
+            return dev.read(off) & MASK_16BIT
+
+        def write(addr: int, val: int):
+            addr &= MASK_12BIT
+            k = io_map[addr]
+            if not k: return wr(addr, val)
+            dev, off = access(k - 1, addr)
+            dev.write(off, val & MASK_16BIT)
+
+        clocks = [(k, d) for k, d in enumerate(devs) if d.clocked]
+        if not clocks: return ri, read_data, write
+
+        def read_instr(addr: int) -> int:
+            log = self.log
+            for k, dev in clocks:
+                if log is not None: log.append(LOG_DEV | k << LOG_IDX_SHIFT | dev.pos)
+                dev.tick()
+            return ri(addr)
+        return read_instr, read_data, write
+
+    def _watched_rd(self, rd):
+        watch = self._watch_rd
+
+        def read_data(addr: int) -> int:
+            val = rd(addr)
+            addr &= MASK_12BIT
+            if watch[addr] and self.watch_hit is None:
+                self.watch_hit = ("READ", addr, val, val)
+            return val
+        return read_data
+
+    def _watched_wr(self, wr):
+        watch = self._watch_wr
+
+        def write(addr: int, val: int):
+            addr &= MASK_12BIT
+            old = self.ram[addr]
+            wr(addr, val)
+            if watch[addr] and self.watch_hit is None:
+                self.watch_hit = ("WRITE", addr, old, val & MASK_16BIT)
+        return write
+
+    # --- Dispositivos de E/S (src/hardware/devices.py) ---
+
+    def attach(self, base: int, device):
+        """Liga um dispositivo em base..base+device.size-1. Leituras e escritas
+        de dados nesses enderecos vao pro dispositivo (sem RAM e sem D-Cache)."""
+        if base < 0 or base + device.size > self.size:
+            raise ValueError(f"Dispositivo em {base:03X} passa do fim da memoria")
+        if self._io_map is None: self._io_map = bytearray(self.size)
+        if any(self._io_map[base:base + device.size]):
+            raise ValueError(f"Enderecos {base:03X}-{base + device.size - 1:03X} ja tem dispositivo")
+        if len(self.devices) >= 255: raise ValueError("Maximo de 255 dispositivos")
+        self.devices.append(device)
+        self._dev_base.append(base)
+        self._io_map[base:base + device.size] = bytes([len(self.devices)]) * device.size
+        self._bind_hooks()
+        return device
+
+    def detach(self, device):
+        k = self.devices.index(device)
+        device.flush()
+        del self.devices[k], self._dev_base[k]
+        self._io_map = bytearray(self.size)
+        for k, (base, dev) in enumerate(zip(self._dev_base, self.devices)):
+            self._io_map[base:base + dev.size] = bytes([k + 1]) * dev.size
+        if not self.devices: self._io_map = None
+        self._bind_hooks()
+
+    def device_at(self, addr: int):
+        k = self._io_map[addr & MASK_12BIT] if self._io_map is not None else 0
+        return self.devices[k - 1] if k else None
+
+    def flush_devices(self):
+        # Manda a saida acumulada (chamado no fim de cada run())
+        for d in self.devices: d.flush()
+
+    def reset_devices(self):
+        for d in self.devices: d.reset()
+
+    # --- Modelo de tempo ---
+
+    def set_timing(self, timing: Optional[TimingConfig]):
+        """Liga as latencias de cada nivel (None desliga). Os ciclos de espera
+        ficam em stall_cycles; sem L2 e sem tempo as L1 usam o caminho rapido."""
+        self.timing = timing
+        t = timing or TimingConfig()
+        on = timing is not None
+        l2 = self.l2
+        for c in (self.i_cache, self.d_cache):
+            c.set_level(l2, t.l1, t.ram if l2 is None else 0, on)
+        if l2 is not None: l2.set_level(None, t.l2, t.ram, on)
+
+    @property
+    def stall_cycles(self) -> int:
+        return sum(c.stall for c in self.caches)
+
+    def reset_stall(self):
+        for c in self.caches: c.stall = 0
+
+    # --- Contadores de desempenho (src/hardware/stats.py) ---
+
+    def enable_stats(self, on: bool = True):
+        """Liga (zerando) ou desliga os contadores das caches e da RAM.
+        Desligados, as caches voltam pro caminho rapido."""
+        for c in self.caches:
+            c.set_stats(CacheStats.for_cache(c, self.size) if on else None)
+
+    @property
+    def stats_enabled(self) -> bool:
+        return self.d_cache.stats is not None
+
+    def reset_stats(self):
+        if self.stats_enabled: self.enable_stats()
+
+    @contextmanager
+    def stats_paused(self):
+        # Para de contar temporariamente (ex: diario re-executando instrucoes)
+        saved = [c.stats for c in self.caches]
+        for c in self.caches: c.set_stats(None)
+        try:
+            yield
+        finally:
+            for c, st in zip(self.caches, saved): c.set_stats(st)
+
+    def stats(self) -> dict:
+        """Todos os contadores num dict (pronto pro JSON); vazio se desligados"""
+        if not self.stats_enabled: return {}
+        i, d = self.i_cache.stats, self.d_cache.stats
+        levels = (("i_cache", self.i_cache), ("d_cache", self.d_cache), ("l2", self.l2))
+        out = {key: {"config": asdict(c.config), **c.stats.as_dict()} for key, c in levels if c is not None}
+        reads = [a + b for a, b in zip(i.addr_reads, d.addr_reads)]
+        # Trafego com a RAM sai do ultimo nivel (com L2 as L1 falam com ela)
+        last = (self.l2.stats,) if self.l2 is not None else (i, d)
+        out["ram"] = {
+            "reads": i.reads + d.reads, "writes": d.writes,
+            "words_read": sum(c.ram_words_read for c in last),
+            "words_written": sum(c.ram_words_written for c in last),
+            "reads_by_addr": reads, "writes_by_addr": d.addr_writes.tolist(),
+        }
+        return out
+
+    def set_log(self, log):
+        self.log = log
+        for k, c in enumerate(self.caches): c.set_log(log, LOG_CACHE | k << LOG_CACHE_SHIFT)
+
+    def undo(self, rec: int):
+        # Desfaz um registro do diario (ver formato no __init__)
+        if rec >= LOG_DEV:
+            self.devices[rec >> LOG_IDX_SHIFT & 0xFF].pos = rec & LOG_VAL_MASK
+        elif rec >= LOG_CACHE:
+            self.caches[rec >> LOG_CACHE_SHIFT & 3].undo(rec)
+        else:
+            self.poke(rec >> 16, rec & MASK_16BIT)
 
     def read_instr(self, addr: int) -> int:
         addr &= MASK_12BIT
@@ -92,61 +889,226 @@ class MemorySystem:
         addr &= MASK_12BIT
         val &= MASK_16BIT
         self.last_addr = addr
-        self.ram[addr] = val
+        old = self.ram[addr]
+        if self.log is not None: self.log.append(addr << 16 | old)
+        self.poke(addr, val)
         
-        # Atualiza D-Cache e limpa I-Cache (pra evitar codigo velho)
-        self.d_cache.write_through(addr, val)
-        self.i_cache.flush() 
+        # Atualiza D-Cache e tira o endereco da I-Cache (pra nao executar codigo velho)
+        self.d_cache.write(addr, val, self.ram)
+        if self.flush_icache_on_write: self.i_cache.flush()
+        else: self.i_cache.invalidate(addr)
+        if self.smc is not None and self.smc[addr]: self._smc_store(addr, old, val)
+
+    def set_smc_detect(self, on: bool = True):
+        """Liga o detector de codigo auto-modificavel: anota escritas em enderecos
+        que ja foram buscados como instrucao (blocos inteiros da I-Cache)"""
+        self.smc = bytearray(self.size) if on else None
+        self.i_cache.set_fetched(self.smc)
+        self.smc_hits = []
+        self.smc_count = 0
+
+    def _smc_store(self, addr, old, new):
+        self.smc_count += 1
+        if len(self.smc_hits) < SMC_MAX_HITS: self.smc_hits.append((addr, old, new))
+
+    def poke(self, addr: int, val: int):
+        # Escreve direto na RAM, sem passar pelas caches
+        if self._ram_shared:
+            self.ram = array('H', self.ram)
+            self._ram_shared = False
+        self.ram[addr] = val
+        if self.code_hook: self.code_hook(addr)
 
     def load_bin(self, code_dict):
         # Carrega o codigo de maquina na RAM
-        self.ram = [0] * self.size
+        self.ram = array('H', bytes(2 * self.size))
+        self._ram_shared = False
         if isinstance(code_dict, dict):
             for addr, val in code_dict.items():
                 if 0 <= addr < self.size:
                     self.ram[addr] = val & MASK_16BIT
         self.flush_all()
+        if self.code_hook: self.code_hook(None)
+
+    # --- Imagens da RAM (.bin: uint16 little-endian, 2 bytes por palavra) ---
+
+    @property
+    def ram_view(self) -> memoryview:
+        """A RAM como memoryview so de leitura (sem copiar; formato 'H' nativo)"""
+        return memoryview(self.ram).toreadonly()
+
+    def load_image(self, image: Union[str, bytes, bytearray, memoryview, mmap.mmap]):
+        """Carrega uma imagem crua (caminho de arquivo ou bytes/memoryview/mmap,
+        ver open_image) do endereco 0 em diante; o resto da RAM fica zerado."""
+        if isinstance(image, (str, os.PathLike)):
+            with open(image, "rb") as f: image = f.read()
+        buf = memoryview(image).cast('B')
+        if len(buf) % 2 or len(buf) > 2 * self.size:
+            raise ValueError(f"Imagem com {len(buf)} bytes (maximo {2 * self.size}, numero par)")
+        ram = array('H')
+        ram.frombytes(buf)
+        if sys.byteorder == "big": ram.byteswap()
+        if len(ram) < self.size: ram.frombytes(bytes(2 * (self.size - len(ram))))
+        self.ram = ram
+        self._ram_shared = False
+        self.flush_all()
+        if self.code_hook: self.code_hook(None)
+
+    @staticmethod
+    def open_image(path: str) -> Union[mmap.mmap, bytes]:
+        """Mapeia um .bin so pra leitura. Varias CPUs (ou varias execucoes) podem
+        carregar o mesmo mapa com load_image sem ler o arquivo de novo."""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0: return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def save_image(self, path: str):
+        with open(path, "wb") as f: f.write(self.dump_ram())
+
+    def ram_hash(self) -> str:
+        """Hash da RAM inteira (comparar execucoes sem guardar a RAM)"""
+        return hashlib.blake2b(self.dump_ram() if sys.byteorder == "big" else self.ram, digest_size=16).hexdigest()
 
     def flush_all(self):
-        self.i_cache.flush()
-        self.d_cache.flush()
+        for c in self.caches: c.flush()
+
+    def fork(self):
+        # Clone com a RAM em copy-on-write (os dois copiam antes de escrever)
+        # Os dispositivos de E/S ficam so no original
+        other = MemorySystem(self.size, self.i_cache.config, self.d_cache.config, self.flush_icache_on_write,
+                             self.l2.config if self.l2 is not None else None, self.timing)
+        other.ram = self.ram
+        other._ram_shared = self._ram_shared = True
+        other.i_cache = self.i_cache.copy()
+        other.d_cache = self.d_cache.copy()
+        if self.l2 is not None: other.l2 = self.l2.copy()
+        other.caches = (other.i_cache, other.d_cache) + ((other.l2,) if other.l2 is not None else ())
+        other.set_timing(self.timing) # Religa os niveis das copias
+        other.last_addr = self.last_addr
+        return other
+
+    def dump_ram(self) -> bytes:
+        # RAM inteira como uint16 little-endian (2 bytes por palavra)
+        if sys.byteorder == "little": return self.ram.tobytes()
+        a = array('H', self.ram)
+        a.byteswap()
+        return a.tobytes()
+
+    def restore_ram(self, buf):
+        new = array('H')
+        new.frombytes(buf)
+        if sys.byteorder == "big": new.byteswap()
+        if len(new) != self.size: raise ValueError(f"Imagem com {len(new)} palavras (esperado {self.size})")
+        if self.code_hook:
+            # Avisa so os enderecos que mudaram (nao joga fora todos os blocos)
+            # Compara em fatias de 64 palavras pra nao varrer tudo em Python
+            old = self.ram
+            for base in range(0, self.size, 64):
+                if old[base:base + 64] != new[base:base + 64]:
+                    for addr in range(base, min(base + 64, self.size)):
+                        if old[addr] != new[addr]: self.code_hook(addr)
+        self.ram = new
+        self._ram_shared = False
+
+    def snapshot(self) -> bytes:
+        # RAM + caches (L1 I, L1 D e a L2 se tiver) + ultimo endereco (a CPU junta com os registradores)
+        # + estado dos dispositivos (quantidade e o pos de cada um)
+        return (self.last_addr & MASK_16BIT).to_bytes(2, "little") + self.dump_ram() + \
+            b"".join(c.pack() for c in self.caches) + \
+            bytes([len(self.devices)]) + b"".join(d.pos.to_bytes(8, "little") for d in self.devices)
+
+    def restore(self, blob):
+        last = int.from_bytes(blob[:2], "little")
+        self.last_addr = -1 if last == MASK_16BIT else last
+        off = 2 + 2 * self.size
+        self.restore_ram(blob[2:off])
+        for c in self.caches: off += c.unpack(blob[off:])
+        # Dispositivos ligados depois do snapshot ficam como estao
+        for k, d in enumerate(self.devices[:blob[off]]):
+            d.pos = int.from_bytes(blob[off + 1 + 8 * k:off + 9 + 8 * k], "little")
+
+class AluOp:
+    # Codigos das operacoes da ULA (indice na tabela _ALU_FNS)
+    A = 0
+    B = 1
+    ADD = 2
+    SUB = 3
+    AND = 4
+    OR = 5
+    INC_A = 6
+    DEC_A = 7
+    INV_A = 8
+
+class ShiftOp:
+    # Codigos do deslocador
+    NONE = 0
+    RSHIFT = 1
+    LSHIFT = 2
+
+# Uma funcao por AluOp. Como o resultado e mascarado pra 16 bits, somar e
+# subtrair sem converter pra complemento de 2 da o mesmo valor
+_ALU_FNS = (
+    lambda a, b: a,       # A
+    lambda a, b: b,       # B
+    lambda a, b: a + b,   # ADD
+    lambda a, b: a - b,   # SUB
+    lambda a, b: a & b,   # AND
+    lambda a, b: a | b,   # OR
+    lambda a, b: a + 1,   # INC_A
+    lambda a, b: a - 1,   # DEC_A
+    lambda a, b: ~a,      # INV_A
+)
 
 class ALU:
-    """Unidade Logica e Aritmetica"""
+    """Unidade Logica e Aritmetica
+
+    As flags N e Z so sao calculadas quando alguem le (jumps condicionais,
+    interface): compute() so guarda o resultado.
+    """
     def __init__(self):
-        self.n = False # Flag Negative
-        self.z = False # Flag Zero
         self.last_res = 0
+        # Resultado de onde saem as flags, ou -1 quando elas foram atribuidas
+        # direto (ficam em _n/_z)
+        self._flag_res = -1
+        self._n = False # Flag Negative
+        self._z = False # Flag Zero
+
+    def _pin_flags(self):
+        # Materializa as flags antes de alguem sobrescrever uma delas
+        r = self._flag_res
+        if r >= 0:
+            self._n, self._z = r >= 0x8000, r == 0
+            self._flag_res = -1
+
+    @property
+    def n(self) -> bool:
+        r = self._flag_res
+        return self._n if r < 0 else r >= 0x8000
+
+    @n.setter
+    def n(self, val: bool):
+        self._pin_flags()
+        self._n = val
+
+    @property
+    def z(self) -> bool:
+        r = self._flag_res
+        return self._z if r < 0 else r == 0
+
+    @z.setter
+    def z(self, val: bool):
+        self._pin_flags()
+        self._z = val
 
     def compute(self, a, b, op):
-        # Simula complemento de 2 para operacoes com sinal
-        sa = a if a < 0x8000 else a - 0x10000
-        sb = b if b < 0x8000 else b - 0x10000
-        res = 0
-        
-        if op == 'ADD':   res = sa + sb
-        elif op == 'SUB': res = sa - sb
-        elif op == 'AND': res = a & b
-        elif op == 'OR':  res = a | b
-        elif op == 'A':   res = a
-        elif op == 'B':   res = b
-        elif op == 'INC_A': res = sa + 1
-        elif op == 'DEC_A': res = sa - 1
-        elif op == 'INV_A': res = ~a
-        else: res = a 
-
-        self.last_res = res & MASK_16BIT
-        
-        # Atualiza as flags pra usar nos Jumps depois
-        self.z = (self.last_res == 0)
-        self.n = (self.last_res & 0x8000) != 0
-        
-        return self.last_res
+        # op e um AluOp (indice direto na tabela, sem cadeia de if)
+        res = self.last_res = self._flag_res = _ALU_FNS[op](a, b) & MASK_16BIT
+        return res
 
 class Shifter:
     @staticmethod
-    def compute(val, op):
+    def compute(val, op=ShiftOp.NONE):
         val &= MASK_16BIT
-        if op == 'LSHIFT': return (val << 1) & MASK_16BIT
-        if op == 'RSHIFT': return (val >> 1) & MASK_16BIT
-        return val
\ No newline at end of file
+        if op == ShiftOp.LSHIFT: return (val << 1) & MASK_16BIT
+        if op == ShiftOp.RSHIFT: return val >> 1
+        return val
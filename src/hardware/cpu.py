@@ -1,22 +1,145 @@
-from src.common.constants import MASK_12BIT
+import struct
+from dataclasses import dataclass
+from typing import Optional
+from src.common.constants import MASK_12BIT, MASK_16BIT, MEM_SIZE
 from src.common.opcodes import Opcode
-from src.hardware.components import Register, MemorySystem, ALU, Shifter
+from src.hardware.breakpoints import Breakpoints, BreakHit
+from src.hardware.components import REG_NAMES, RegisterFile, MemorySystem, CacheConfig, TimingConfig, ALU, AluOp, Shifter, ShiftOp
+
+@dataclass
+class RunResult:
+    """Resultado de uma execucao headless (Mic1CPU.run)"""
+    cycles: int  # Instrucoes executadas nessa chamada
+    reason: str  # 'HALT', 'MAX_CYCLES' ou 'BREAK' (detalhes em cpu.breakpoints.hit)
+    stall_cycles: int = 0  # Ciclos esperando a memoria nessa chamada (com TimingConfig)
+
+    @property
+    def effective_cycles(self) -> int:
+        return self.cycles + self.stall_cycles
+
+# Instrucoes que terminam um bloco basico (desvio ou parada)
+BLOCK_END_OPS = {Opcode.JUMP, Opcode.JPOS, Opcode.JZER, Opcode.JNEG, Opcode.JNZE, Opcode.CALL}
+BLOCK_END_EXT = {0, 5} # HALT, RETN
+MAX_BLOCK_LEN = 64
+
+# Cabecalho do snapshot: versao, 10 registradores, last_res, N, Z, halted,
+# cycle, curr_op (seguido do MemorySystem.snapshot(): RAM e as caches)
+SNAP_VERSION = 4 # 2: caches com dirty, ordem de substituicao e blocos; 3: L2 e ciclos de espera; 4: dispositivos
+_SNAP_HDR = struct.Struct("<B10HH???qh")
+REG_ORDER = REG_NAMES
+
+class _Block:
+    """Trecho de codigo linear ja traduzido pra uma funcao Python"""
+    __slots__ = ("start", "words", "fn", "halts")
+
+    def __init__(self, start, words, fn, halts):
+        self.start = start
+        self.words = words
+        self.fn = fn
+        self.halts = halts
+
+def _gen_block(start, words):
+    # Gera o codigo-fonte de um bloco: cada instrucao vira umas poucas linhas
+    # Assinatura: blk(sp, h, n, z, last) -> (pc, sp, h, n, z, last, executadas)
+    # As leituras de I-Cache continuam acontecendo (estado das caches fica igual)
+    src = ["def blk(sp, h, n, z, last):"]
+    alu = False # Ja passou alguma instrucao pela ULA nesse bloco?
+
+    def flags():
+        return ("last >= 32768", "last == 0") if alu else ("n", "z")
+
+    def ret(pc, k):
+        fn, fz = flags()
+        return f"    return {pc}, sp, h, {fn}, {fz}, last, {k}"
+
+    for i, w in enumerate(words):
+        a = start + i
+        nxt = (a + 1) & MASK_16BIT
+        op, arg = w >> 12, w & MASK_12BIT
+        src.append(f"    ri({a})")
+        store = False
+        if op == Opcode.LODD:
+            src.append(f"    h = last = rd({arg})"); alu = True
+        elif op == Opcode.STOD:
+            src.append(f"    wr({arg}, h)"); store = True
+        elif op == Opcode.ADDD:
+            src.append(f"    h = last = (h + rd({arg})) & 65535"); alu = True
+        elif op == Opcode.SUBD:
+            src.append(f"    h = last = (h - rd({arg})) & 65535"); alu = True
+        elif op == Opcode.LOCO:
+            val = (arg - 0x1000 if arg & 0x800 else arg) & MASK_16BIT
+            src.append(f"    h = last = {val}"); alu = True
+        elif op == Opcode.LODL:
+            src.append(f"    h = last = rd((sp + {arg}) & 4095)"); alu = True
+        elif op == Opcode.STOL:
+            src.append(f"    wr((sp + {arg}) & 4095, h)"); store = True
+        elif op == Opcode.ADDL:
+            src.append(f"    h = last = (h + rd((sp + {arg}) & 4095)) & 65535"); alu = True
+        elif op == Opcode.SUBL:
+            src.append(f"    h = last = (h - rd((sp + {arg}) & 4095)) & 65535"); alu = True
+        elif op in BLOCK_END_OPS:
+            fn, fz = flags()
+            cond = {
+                Opcode.JUMP: "True", Opcode.CALL: "True",
+                Opcode.JPOS: f"not ({fn}) and not ({fz})", Opcode.JZER: fz,
+                Opcode.JNEG: fn, Opcode.JNZE: f"not ({fz})"
+            }[op]
+            if op == Opcode.CALL:
+                src.append("    sp = (sp - 1) & 65535")
+                src.append(f"    wr(sp, {nxt})")
+            pc = arg if cond == "True" else f"{arg} if {cond} else {nxt}"
+            src.append(ret(pc, i + 1))
+        elif arg == 0: # HALT
+            src.append(ret(nxt, i + 1))
+        elif arg == 1: # PSHI
+            src.append("    v = rd(h)")
+            src.append("    sp = (sp - 1) & 65535")
+            src.append("    wr(sp, v)"); store = True
+        elif arg == 2: # POPI
+            src.append("    v = rd(sp)")
+            src.append("    sp = (sp + 1) & 65535")
+            src.append("    wr(h, v)"); store = True
+        elif arg == 3: # PUSH
+            src.append("    sp = (sp - 1) & 65535")
+            src.append("    wr(sp, h)"); store = True
+        elif arg == 4: # POP
+            src.append("    h = last = rd(sp)")
+            src.append("    sp = (sp + 1) & 65535"); alu = True
+        elif arg == 5: # RETN
+            src.append("    pc = rd(sp)")
+            src.append("    sp = (sp + 1) & 65535")
+            src.append(ret("pc", i + 1))
+        elif arg == 6: # SWAP
+            src.append("    h, sp = sp, h")
+        elif arg == 7: # INSP
+            src.append("    sp = (sp + 1) & 65535")
+        elif arg == 8: # DESP
+            src.append("    sp = (sp - 1) & 65535")
+
+        # Se a escrita invalidou algum bloco (codigo auto-modificavel), sai ja
+        if store:
+            src.append("    if dirty[0]:")
+            src.append("    " + ret(nxt, i + 1))
+
+    if not _ends_block(words[-1]):
+        src.append(ret((start + len(words)) & MASK_16BIT, len(words)))
+    return "\n".join(src)
+
+def _ends_block(word):
+    op = word >> 12
+    if op == Opcode.EXT: return (word & MASK_12BIT) in BLOCK_END_EXT
+    return op in BLOCK_END_OPS
 
 class Mic1CPU:
-    def __init__(self):
-        # Inicializacao dos registradores
-        self.mar = Register("MAR")
-        self.mdr = Register("MDR")
-        self.pc  = Register("PC")
-        self.mbr = Register("MBR")
-        self.sp  = Register("SP", 4095) # Pilha comeca no topo
-        self.opc = Register("OPC")      # Guarda PC antigo
-        self.h   = Register("H")        # Acumulador auxiliar
-        self.lv  = Register("LV")
-        self.cpp = Register("CPP")
-        self.tos = Register("TOS")
-
-        self.mem = MemorySystem()
+    def __init__(self, i_cache: Optional[CacheConfig] = None, d_cache: Optional[CacheConfig] = None,
+                 l2: Optional[CacheConfig] = None, timing: Optional[TimingConfig] = None):
+        # Registradores num RegisterFile (ja ficam em 16 bits, leitura sem mascara)
+        # self.pc, self.sp, ... sao fachadas com .value pra interface grafica
+        self.regs = RegisterFile()
+        for r in REG_NAMES:
+            setattr(self, r, self.regs.view(r))
+
+        self.mem = MemorySystem(i_cache=i_cache, d_cache=d_cache, l2=l2, timing=timing)
         self.alu = ALU()
         self.shifter = Shifter()
         
@@ -31,59 +154,108 @@ class Mic1CPU:
             'rd': False, 'wr': False
         }
 
-        # Tabela de despacho (evita aquele monte de if/else)
-        self._ops = {
-            Opcode.LODD: self._lodd, Opcode.STOD: self._stod,
-            Opcode.ADDD: self._addd, Opcode.SUBD: self._subd,
-            Opcode.JPOS: self._jpos, Opcode.JZER: self._jzer,
-            Opcode.JUMP: self._jump, Opcode.LOCO: self._loco,
-            Opcode.LODL: self._lodl, Opcode.STOL: self._stol,
-            Opcode.ADDL: self._addl, Opcode.SUBL: self._subl,
-            Opcode.JNEG: self._jneg, Opcode.JNZE: self._jnze,
-            Opcode.CALL: self._call, Opcode.EXT:  self._ext
+        # Tabela de pre-decodificacao (compartilhada entre todas as CPUs)
+        self._decode_tab = self._get_decode_tab()
+
+        # Diario pra execucao reversa (src/hardware/journal.py), None = desligado
+        self.journal = None
+        # Breakpoints/watchpoints (src/hardware/breakpoints.py)
+        self.breakpoints = Breakpoints(self.mem)
+        # Contadores por PC (src/hardware/profiler.py), None = desligado
+        self.profiler = None
+
+        # Cache de blocos traduzidos (modo run(translate=True))
+        self._blocks = {}
+        self._blk_cover = None # end -> lista de blocos que cobrem esse endereco
+        self._blk_dirty = [False]
+
+    @classmethod
+    def _get_decode_tab(cls):
+        # Monta uma vez so a tabela palavra(16 bits) -> (handler, operando)
+        # Assim o execute() faz um indice na lista em vez de dois dicts
+        tab = cls.__dict__.get("_DECODE_TAB")
+        if tab is not None: return tab
+
+        ops = {
+            Opcode.LODD: cls._lodd, Opcode.STOD: cls._stod,
+            Opcode.ADDD: cls._addd, Opcode.SUBD: cls._subd,
+            Opcode.JPOS: cls._jpos, Opcode.JZER: cls._jzer,
+            Opcode.JUMP: cls._jump, Opcode.LOCO: cls._loco,
+            Opcode.LODL: cls._lodl, Opcode.STOL: cls._stol,
+            Opcode.ADDL: cls._addl, Opcode.SUBL: cls._subl,
+            Opcode.JNEG: cls._jneg, Opcode.JNZE: cls._jnze,
+            Opcode.CALL: cls._call
         }
+        ext = [cls._halt, cls._pshi, cls._popi, cls._push, cls._pop,
+               cls._retn, cls._swap, cls._insp, cls._desp]
+
+        tab = []
+        for word in range(0x10000):
+            op, arg = word >> 12, word & MASK_12BIT
+            if op == Opcode.EXT:
+                # Funcao estendida desconhecida vira NOP
+                fn = ext[arg] if arg < len(ext) else cls._nop
+            else:
+                fn = ops[op]
+                # LOCO ja guarda a constante com sinal (12 bits)
+                if op == Opcode.LOCO and arg & 0x800: arg -= 0x1000
+            tab.append((fn, arg))
+
+        cls._DECODE_TAB = tab
+        return tab
 
     def reset(self):
         # Zera tudo
-        for r in [self.mar, self.mdr, self.pc, self.mbr, self.lv, self.cpp, self.tos, self.opc, self.h]:
-            r.value = 0
-        self.sp.value = 4095
+        self.regs.reset()
         self.alu.n = False
         self.alu.z = False
         self.mem.flush_all()
         self.mem.last_addr = -1
         self.halted = False
         self.cycle = 0
+        self.mem.reset_stall()
+        self.mem.reset_devices()
         self.ctrl_sig = "RESET"
         self.curr_op = -1
         self._reset_bus()
 
+    # Tempo simulado: cycle conta instrucoes; com mem.timing ligado cada acesso
+    # que passa da L1 soma ciclos de espera (ver TimingConfig)
+    @property
+    def stall_cycles(self) -> int:
+        return self.mem.stall_cycles
+
+    @property
+    def effective_cycles(self) -> int:
+        return self.cycle + self.mem.stall_cycles
+
     def _reset_bus(self):
         for k in self.bus: self.bus[k] = False
 
-    def _alu_sh(self, a, b, alu_op, sh_op=None):
+    def _alu_sh(self, a, b, alu_op, sh_op=ShiftOp.NONE):
         # Helper pra rodar ULA + Shifter juntos
         res = self.alu.compute(a, b, alu_op)
-        return self.shifter.compute(res, sh_op)
+        return self.shifter.compute(res, sh_op) if sh_op else res
 
     # --- Micro-Passos (Ciclo de Instrucao) ---
 
     def fetch(self):
         # Passo 1: Busca Endereco
-        self.opc.value = self.pc.value
-        self.mar.value = self.pc.value
+        self.regs.opc = self.regs.pc
+        self.regs.mar = self.regs.pc
         self._reset_bus()
         self.bus['b'] = True # PC -> Barramento B
         self.bus['c'] = True # ... -> Barramento C -> MAR
         self.ctrl_sig = "BUSCA: PC->MAR"
+        if self.profiler is not None: self.profiler.begin(self.mem)
 
     def decode(self):
         # Passo 2: Le da memoria e Decodifica
-        val = self.mem.read_instr(self.mar.value)
-        self.pc.value += 1
-        self.mdr.value = val
-        self.mbr.value = self.mdr.value
-        self.curr_op = self.mbr.value >> 12 # Pega os 4 bits mais significativos
+        val = self.mem.read_instr(self.regs.mar)
+        self.regs.pc = (self.regs.pc + 1) & MASK_16BIT
+        self.regs.mdr = val
+        self.regs.mbr = self.regs.mdr
+        self.curr_op = self.regs.mbr >> 12 # Pega os 4 bits mais significativos
         self._reset_bus()
         self.bus['rd'] = True
         self.bus['c'] = True
@@ -92,168 +264,468 @@ class Mic1CPU:
     def execute(self):
         # Passo 3: Executa a operacao de fato
         if self.halted: return
-        op = self.curr_op
-        operand = self.mbr.value & MASK_12BIT
-        self.ctrl_sig = f"EXEC: {op:X}"
+        fn, arg = self._decode_tab[self.regs.mbr]
+        self.ctrl_sig = f"EXEC: {self.curr_op:X}"
         self._reset_bus()
-        
-        if op in self._ops:
-            self._ops[op](operand)
-        else:
-            self.ctrl_sig = f"ERRO: Op Desconhecido {op}"
+        fn(self, arg)
         self.cycle += 1
+        if self.profiler is not None: self.profiler.end(self.regs.opc & MASK_12BIT, self.mem, self.regs.mbr, self.regs)
 
     # --- Implementacao das Instrucoes ---
     
     def _lodd(self, addr):
         # Carrega Direto: Mem[addr] -> H
         val = self.mem.read_data(addr)
-        self.h.value = self._alu_sh(val, 0, 'A')
+        self.regs.h = self._alu_sh(val, 0, AluOp.A)
         self.ctrl_sig = f"LODD x{addr:03X}"
         self.bus.update({'rd': True, 'c': True})
 
     def _stod(self, addr):
         # Armazena Direto: H -> Mem[addr]
-        self.mem.write(addr, self.h.value)
+        self.mem.write(addr, self.regs.h)
         self.ctrl_sig = f"STOD x{addr:03X}"
         self.bus.update({'wr': True, 'b': True})
 
     def _addd(self, addr):
         # Soma Direta: H + Mem[addr] -> H
         val = self.mem.read_data(addr)
-        self.h.value = self._alu_sh(self.h.value, val, 'ADD')
+        self.regs.h = self._alu_sh(self.regs.h, val, AluOp.ADD)
         self.bus.update({'a': True, 'b': True, 'c': True})
 
     def _subd(self, addr):
         val = self.mem.read_data(addr)
-        self.h.value = self._alu_sh(self.h.value, val, 'SUB')
+        self.regs.h = self._alu_sh(self.regs.h, val, AluOp.SUB)
         self.bus.update({'a': True, 'b': True, 'c': True})
 
     def _jpos(self, addr):
         # Pula se Positivo (N=0 e Z=0)
         take = not self.alu.n and not self.alu.z
-        if take: self.pc.value = addr
+        if take: self.regs.pc = addr
         self.ctrl_sig = f"JPOS {'(SIM)' if take else '(NAO)'}"
         self.bus['c'] = True
 
     def _jzer(self, addr):
         # Pula se Zero (Z=1)
         take = self.alu.z
-        if take: self.pc.value = addr
+        if take: self.regs.pc = addr
         self.ctrl_sig = f"JZER {'(SIM)' if take else '(NAO)'}"
         self.bus['c'] = True
 
     def _jump(self, addr):
         # Pulo incondicional
-        self.pc.value = addr
+        self.regs.pc = addr
         self.bus['c'] = True
 
-    def _loco(self, addr):
-        # Carrega constante imediata (0-4095)
-        # Verifica sinal (12 bits)
-        val = addr if not (addr & 0x800) else addr - 0x1000
-        self.h.value = self._alu_sh(val, 0, 'A')
+    def _loco(self, val):
+        # Carrega constante imediata (-2048 a 2047)
+        # O sinal (12 bits) ja vem estendido da tabela de decodificacao
+        self.regs.h = self._alu_sh(val, 0, AluOp.A)
         self.ctrl_sig = f"LOCO {val}"
         self.bus['c'] = True
 
     def _lodl(self, addr):
         # Load Local: Mem[SP + addr] -> H
-        eff = (self.sp.value + addr) & MASK_12BIT
+        eff = (self.regs.sp + addr) & MASK_12BIT
         val = self.mem.read_data(eff)
-        self.h.value = self._alu_sh(val, 0, 'A')
+        self.regs.h = self._alu_sh(val, 0, AluOp.A)
         self.bus.update({'rd': True, 'b': True, 'c': True})
 
     def _stol(self, addr):
         # Store Local: H -> Mem[SP + addr]
-        eff = (self.sp.value + addr) & MASK_12BIT
-        self.mem.write(eff, self.h.value)
+        eff = (self.regs.sp + addr) & MASK_12BIT
+        self.mem.write(eff, self.regs.h)
         self.bus.update({'wr': True, 'b': True})
 
     def _addl(self, addr):
-        eff = (self.sp.value + addr) & MASK_12BIT
+        eff = (self.regs.sp + addr) & MASK_12BIT
         val = self.mem.read_data(eff)
-        self.h.value = self._alu_sh(self.h.value, val, 'ADD')
+        self.regs.h = self._alu_sh(self.regs.h, val, AluOp.ADD)
         self.bus.update({'rd': True, 'a': True, 'c': True})
 
     def _subl(self, addr):
-        eff = (self.sp.value + addr) & MASK_12BIT
+        eff = (self.regs.sp + addr) & MASK_12BIT
         val = self.mem.read_data(eff)
-        self.h.value = self._alu_sh(self.h.value, val, 'SUB')
+        self.regs.h = self._alu_sh(self.regs.h, val, AluOp.SUB)
         self.bus.update({'rd': True, 'a': True, 'c': True})
 
     def _jneg(self, addr):
-        if self.alu.n: self.pc.value = addr
+        if self.alu.n: self.regs.pc = addr
         self.bus['c'] = True
 
     def _jnze(self, addr):
-        if not self.alu.z: self.pc.value = addr
+        if not self.alu.z: self.regs.pc = addr
         self.bus['c'] = True
 
     def _call(self, addr):
         # Chamada de funcao: Salva PC na pilha e pula
-        self.sp.value -= 1
-        self.mem.write(self.sp.value, self.pc.value)
-        self.pc.value = addr
+        self.regs.sp = (self.regs.sp - 1) & MASK_16BIT
+        self.mem.write(self.regs.sp, self.regs.pc)
+        self.regs.pc = addr
         self.bus.update({'wr': True, 'c': True})
 
-    def _ext(self, func):
-        # Instrucoes estendidas (sem operando ou operacoes de pilha)
-        fns = {
-            0: self._halt, 1: self._pshi, 2: self._popi, 
-            3: self._push, 4: self._pop, 5: self._retn, 
-            6: self._swap, 7: self._insp, 8: self._desp
-        }
-        if func in fns: fns[func]()
-        else: self.ctrl_sig = f"NOP x{func:X}"
+    # Instrucoes estendidas (sem operando ou operacoes de pilha)
+    # Recebem o codigo da funcao (12 bits baixos) so pra manter a mesma assinatura
 
-    def _halt(self): 
+    def _nop(self, func):
+        self.ctrl_sig = f"NOP x{func:X}"
+
+    def _halt(self, func=0):
         self.halted = True
         self.ctrl_sig = "HALTED"
 
-    def _pshi(self):
+    def _pshi(self, func=0):
         # Push Indireto (Mem[H] -> Pilha)
-        val = self.mem.read_data(self.h.value)
-        self.sp.value -= 1
-        self.mem.write(self.sp.value, val)
+        val = self.mem.read_data(self.regs.h)
+        self.regs.sp = (self.regs.sp - 1) & MASK_16BIT
+        self.mem.write(self.regs.sp, val)
         self.bus.update({'rd': True, 'wr': True})
 
-    def _popi(self):
+    def _popi(self, func=0):
         # Pop Indireto (Pilha -> Mem[H])
-        val = self.mem.read_data(self.sp.value)
-        self.sp.value += 1
-        self.mem.write(self.h.value, val)
+        val = self.mem.read_data(self.regs.sp)
+        self.regs.sp = (self.regs.sp + 1) & MASK_16BIT
+        self.mem.write(self.regs.h, val)
         self.bus.update({'rd': True, 'wr': True})
 
-    def _push(self):
+    def _push(self, func=0):
         # Empilha H
-        self.sp.value -= 1
-        self.mem.write(self.sp.value, self.h.value)
+        self.regs.sp = (self.regs.sp - 1) & MASK_16BIT
+        self.mem.write(self.regs.sp, self.regs.h)
         self.bus.update({'wr': True, 'b': True})
 
-    def _pop(self):
+    def _pop(self, func=0):
         # Desempilha para H
-        val = self.mem.read_data(self.sp.value)
-        self.sp.value += 1
-        self.h.value = self._alu_sh(val, 0, 'A')
+        val = self.mem.read_data(self.regs.sp)
+        self.regs.sp = (self.regs.sp + 1) & MASK_16BIT
+        self.regs.h = self._alu_sh(val, 0, AluOp.A)
         self.bus.update({'rd': True, 'c': True})
 
-    def _retn(self):
+    def _retn(self, func=0):
         # Retorno de funcao (Recupera PC da pilha)
-        ret = self.mem.read_data(self.sp.value)
-        self.sp.value += 1
-        self.pc.value = ret
+        ret = self.mem.read_data(self.regs.sp)
+        self.regs.sp = (self.regs.sp + 1) & MASK_16BIT
+        self.regs.pc = ret
         self.bus.update({'rd': True, 'c': True})
 
-    def _swap(self):
+    def _swap(self, func=0):
         # Troca H com SP
-        self.h.value, self.sp.value = self.sp.value, self.h.value
+        self.regs.h, self.regs.sp = self.regs.sp, self.regs.h
         self.bus['c'] = True
 
-    def _insp(self): self.sp.value += 1 # Incrementa SP
-    def _desp(self): self.sp.value -= 1 # Decrementa SP
+    def _insp(self, func=0): self.regs.sp = (self.regs.sp + 1) & MASK_16BIT # Incrementa SP
+    def _desp(self, func=0): self.regs.sp = (self.regs.sp - 1) & MASK_16BIT # Decrementa SP
 
     def cycle_all(self):
         # Roda um ciclo completo (debug)
         self.fetch()
         self.decode()
-        self.execute()
\ No newline at end of file
+        self.execute()
+
+    # --- Modo rapido (sem interface) ---
+
+    def run(self, max_cycles: Optional[int] = None, until_halt: bool = True,
+            translate: bool = False, resume: bool = True) -> RunResult:
+        """Executa sem atualizar bus/ctrl_sig (pra scripts).
+
+        O estado final (registradores, flags, RAM e caches) fica igual ao de
+        chamar cycle_all() max_cycles vezes. Com until_halt=False o HALT nao
+        encerra a execucao: igual ao cycle_all, a CPU parada continua buscando
+        e decodificando ate gastar o orcamento (entao max_cycles e obrigatorio).
+        Com translate=True os blocos basicos sao traduzidos e guardados em cache
+        (ignorado se tiver um diario de execucao, breakpoints, trace ou profiler ligados).
+        Breakpoints de PC e condicoes em registrador param antes da instrucao
+        (menos a primeira se resume=True, pra poder continuar de um breakpoint;
+        quem roda em fatias passa resume=False depois da primeira); watchpoints
+        param depois da instrucao que acessou o endereco.
+        """
+        if max_cycles is None and not until_halt:
+            raise ValueError("max_cycles e obrigatorio quando until_halt=False")
+        bp = self.breakpoints
+        bp.hit = None
+        if translate and self.journal is None and not bp.active and self.mem.trace is None and self.profiler is None:
+            return self._run_translated(max_cycles, until_halt)
+
+        mem = self.mem
+        read_instr, read_data, write = mem.read_instr, mem.read_data, mem.write
+        alu = self.alu
+        M = MASK_16BIT
+
+        # Copia os registradores pra variaveis locais (bem mais rapido)
+        pc, sp, h = self.regs.pc, self.regs.sp, self.regs.h
+        mar, mdr, mbr, opc = self.regs.mar, self.regs.mdr, self.regs.mbr, self.regs.opc
+        n, z, last = alu.n, alu.z, alu.last_res
+        halted = self.halted
+        op = self.curr_op
+        start = self.cycle
+        cycle = start
+        stall = mem.stall_cycles
+        budget = -1 if max_cycles is None else max_cycles
+        # Sem breakpoint nenhum esses testes ficam so no "is not None"
+        pcbits = bp.pc if bp.has_pc else None
+        conds = bp if bp.has_conds else None
+        watch = bp.has_watch
+        if watch: mem.watch_hit = None
+        bstart = budget if resume else -1
+        journal = self.journal
+        if journal is not None:
+            # So conta as instrucoes e tira um snapshot a cada checkpoint_every
+            journal.drop_window()
+            jleft = journal.until_checkpoint()
+            jbudget = budget
+        prof = self.profiler
+        if prof is not None:
+            # Contadores por PC: ciclos = 1 + espera da memoria, misses pelo contador do MemorySystem
+            pcount, pcyc, pmiss = prof.counts, prof.cycles, prof.d_misses
+            timed = mem.timing is not None
+            pstall, pm = mem.stall_cycles, mem.d_misses or 0
+            # Pilha sombra (Profiler(stacks=True)): ciclos no contexto de chamada atual
+            tree = prof.tree
+            if tree is not None: tw, node = tree.weight, tree.node
+
+        while budget:
+            if halted and until_halt: break
+            if pcbits is not None and pcbits[pc & MASK_12BIT] and budget != bstart:
+                bp.hit = BreakHit("PC", pc & MASK_12BIT)
+                break
+            if conds is not None and budget != bstart:
+                bp.hit = conds.check_regs(pc, sp, h)
+                if bp.hit: break
+            budget -= 1
+            if journal is not None:
+                if not jleft:
+                    journal.checkpoint((pc, sp, h, mar, mdr, mbr, opc, n, z, last, halted, op, cycle),
+                                       journal.pos + jbudget - budget - 1)
+                    jleft = journal.checkpoint_every
+                jleft -= 1
+
+            # Busca + Decodificacao
+            opc = mar = pc
+            mdr = mbr = word = read_instr(mar)
+            pc = (pc + 1) & M
+            op = word >> 12
+            if halted: continue
+            addr = word & MASK_12BIT
+
+            # Execucao (ordem mais ou menos por frequencia)
+            res = -1
+            if op == Opcode.LODD:
+                res = h = read_data(addr)
+            elif op == Opcode.STOD:
+                write(addr, h)
+            elif op == Opcode.ADDD:
+                res = h = (h + read_data(addr)) & M
+            elif op == Opcode.SUBD:
+                res = h = (h - read_data(addr)) & M
+            elif op == Opcode.JUMP:
+                pc = addr
+            elif op == Opcode.JZER:
+                if z: pc = addr
+            elif op == Opcode.JPOS:
+                if not n and not z: pc = addr
+            elif op == Opcode.JNEG:
+                if n: pc = addr
+            elif op == Opcode.JNZE:
+                if not z: pc = addr
+            elif op == Opcode.LOCO:
+                res = h = (addr - 0x1000 if addr & 0x800 else addr) & M
+            elif op == Opcode.LODL:
+                res = h = read_data((sp + addr) & MASK_12BIT)
+            elif op == Opcode.STOL:
+                write((sp + addr) & MASK_12BIT, h)
+            elif op == Opcode.ADDL:
+                res = h = (h + read_data((sp + addr) & MASK_12BIT)) & M
+            elif op == Opcode.SUBL:
+                res = h = (h - read_data((sp + addr) & MASK_12BIT)) & M
+            elif op == Opcode.CALL:
+                sp = (sp - 1) & M
+                write(sp, pc)
+                pc = addr
+            elif addr == 0: # HALT
+                halted = True
+            elif addr == 1: # PSHI
+                val = read_data(h)
+                sp = (sp - 1) & M
+                write(sp, val)
+            elif addr == 2: # POPI
+                val = read_data(sp)
+                sp = (sp + 1) & M
+                write(h, val)
+            elif addr == 3: # PUSH
+                sp = (sp - 1) & M
+                write(sp, h)
+            elif addr == 4: # POP
+                res = h = read_data(sp)
+                sp = (sp + 1) & M
+            elif addr == 5: # RETN
+                pc = read_data(sp)
+                sp = (sp + 1) & M
+            elif addr == 6: # SWAP
+                h, sp = sp, h
+            elif addr == 7: # INSP
+                sp = (sp + 1) & M
+            elif addr == 8: # DESP
+                sp = (sp - 1) & M
+
+            # So quem passou pela ULA mexe nas flags
+            if res >= 0:
+                last = res
+                z = res == 0
+                n = (res & 0x8000) != 0
+            cycle += 1
+            if prof is not None:
+                k = opc & MASK_12BIT
+                pcount[k] += 1
+                if timed:
+                    s = mem.stall_cycles
+                    c = 1 + s - pstall
+                    pstall = s
+                else: c = 1
+                pcyc[k] += c
+                if mem.d_misses != pm:
+                    pmiss[k] += mem.d_misses - pm
+                    pm = mem.d_misses
+                if tree is not None:
+                    tw[node] += c
+                    if op == Opcode.CALL: node = tree.call(addr, (opc + 1) & M, sp)
+                    elif op == Opcode.EXT and addr == 5: node = tree.retn(pc)
+            if watch and mem.watch_hit is not None:
+                bp.hit = bp.take_watch_hit()
+                break
+
+        if journal is not None: journal.pos += jbudget - budget
+
+        # Devolve o estado pros objetos
+        self.regs.pc, self.regs.sp, self.regs.h = pc, sp, h
+        self.regs.mar, self.regs.mdr, self.regs.mbr, self.regs.opc = mar, mdr, mbr, opc
+        alu.n, alu.z, alu.last_res = n, z, last
+        self.halted = halted
+        self.curr_op = op
+        self.cycle = cycle
+
+        stall = mem.stall_cycles - stall
+        if mem.devices: mem.flush_devices() # Saida dos dispositivos vai em bloco
+        if bp.hit is not None: return RunResult(cycle - start, "BREAK", stall)
+        return RunResult(cycle - start, "HALT" if halted else "MAX_CYCLES", stall)
+
+    # --- Snapshots ---
+
+    def snapshot(self) -> bytes:
+        """Todo o estado da CPU num blob de bytes (~8 KB, quase tudo RAM)"""
+        alu = self.alu
+        hdr = _SNAP_HDR.pack(SNAP_VERSION, *(getattr(self.regs, r) for r in REG_ORDER),
+                             alu.last_res, alu.n, alu.z, self.halted, self.cycle, self.curr_op)
+        return hdr + self.mem.snapshot()
+
+    def restore(self, blob: bytes):
+        """Volta pro estado salvo por snapshot()"""
+        vals = _SNAP_HDR.unpack_from(blob)
+        if vals[0] != SNAP_VERSION: raise ValueError(f"Versao de snapshot {vals[0]} nao suportada")
+        for r, v in zip(REG_ORDER, vals[1:11]):
+            setattr(self.regs, r, v)
+        alu = self.alu
+        alu.last_res, alu.n, alu.z, self.halted, self.cycle, self.curr_op = vals[11:]
+        self.mem.restore(blob[_SNAP_HDR.size:])
+        self.ctrl_sig = "RESTORE"
+        self._reset_bus()
+
+    def fork(self):
+        """Clone independente; a RAM so e copiada quando um dos dois escrever"""
+        mem = self.mem
+        other = type(self)(mem.i_cache.config, mem.d_cache.config, mem.l2 and mem.l2.config, mem.timing)
+        for r in REG_ORDER:
+            setattr(other.regs, r, getattr(self.regs, r))
+        other.alu.n, other.alu.z, other.alu.last_res = self.alu.n, self.alu.z, self.alu.last_res
+        other.halted, other.cycle = self.halted, self.cycle
+        other.ctrl_sig, other.curr_op = self.ctrl_sig, self.curr_op
+        other.mem = self.mem.fork()
+        other.breakpoints = Breakpoints(other.mem) # Clone comeca sem paradas
+        return other
+
+    # --- Traducao de blocos basicos ---
+
+    def _translate(self, pc):
+        # Le a RAM direto (sem passar pela cache) ate achar um desvio
+        if pc >= MEM_SIZE: return None
+        if self._blk_cover is None:
+            self._blk_cover = [[] for _ in range(MEM_SIZE)]
+            self.mem.code_hook = self._invalidate_blocks
+
+        ram = self.mem.ram
+        words = []
+        a = pc
+        while a < MEM_SIZE and len(words) < MAX_BLOCK_LEN:
+            words.append(ram[a])
+            a += 1
+            if _ends_block(words[-1]): break
+
+        ns = {'ri': self.mem.read_instr, 'rd': self.mem.read_data,
+              'wr': self.mem.write, 'dirty': self._blk_dirty}
+        exec(_gen_block(pc, words), ns)
+        last = words[-1]
+        blk = _Block(pc, words, ns['blk'], last >> 12 == Opcode.EXT and last & MASK_12BIT == 0)
+
+        self._blocks[pc] = blk
+        for a in range(pc, pc + len(words)):
+            self._blk_cover[a].append(pc)
+        return blk
+
+    def _invalidate_blocks(self, addr):
+        # Chamado pelo MemorySystem quando a RAM muda (addr None = tudo)
+        if addr is None:
+            if self._blocks: self._blk_dirty[0] = True
+            self._blocks.clear()
+            for c in self._blk_cover: c.clear()
+            return
+        starts = self._blk_cover[addr]
+        if not starts: return
+        for pc in list(starts):
+            blk = self._blocks.pop(pc)
+            for a in range(pc, pc + len(blk.words)):
+                self._blk_cover[a].remove(pc)
+        self._blk_dirty[0] = True
+
+    def _run_translated(self, max_cycles, until_halt):
+        start = self.cycle
+        stall = self.mem.stall_cycles
+        budget = max_cycles
+        blocks = self._blocks
+        dirty = self._blk_dirty
+        alu = self.alu
+
+        while not self.halted and (budget is None or budget > 0):
+            pc = self.regs.pc
+            blk = blocks.get(pc) or self._translate(pc)
+            if blk is None or (budget is not None and budget < len(blk.words)):
+                # Fora da RAM ou sem orcamento pro bloco inteiro: interpreta
+                res = self.run(1 if blk is None else budget)
+                if budget is not None: budget -= res.cycles
+                continue
+
+            # Roda blocos em sequencia com o estado em variaveis locais
+            sp, h = self.regs.sp, self.regs.h
+            n, z, last = alu.n, alu.z, alu.last_res
+            while True:
+                dirty[0] = False
+                pc, sp, h, n, z, last, k = blk.fn(sp, h, n, z, last)
+                self.cycle += k
+                if budget is not None: budget -= k
+                if (blk.halts and k == len(blk.words)) or (budget is not None and budget <= 0): break
+                nblk = blocks.get(pc)
+                if nblk is None or (budget is not None and budget < len(nblk.words)): break
+                blk = nblk
+
+            # Registradores que refletem a ultima instrucao executada
+            word = blk.words[k - 1]
+            self.regs.opc = self.regs.mar = blk.start + k - 1
+            self.regs.mdr = self.regs.mbr = word
+            self.curr_op = word >> 12
+            self.regs.pc, self.regs.sp, self.regs.h = pc, sp, h
+            alu.n, alu.z, alu.last_res = n, z, last
+            if blk.halts and k == len(blk.words): self.halted = True
+
+        # CPU parada com until_halt=False: o resto do orcamento so busca/decodifica
+        if self.halted and not until_halt and budget:
+            self.run(budget, until_halt=False)
+
+        if self.mem.devices: self.mem.flush_devices()
+        return RunResult(self.cycle - start, "HALT" if self.halted else "MAX_CYCLES", self.mem.stall_cycles - stall)
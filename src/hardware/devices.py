@@ -0,0 +1,141 @@
+"""Dispositivos de E/S mapeados em memoria (MemorySystem.attach).
+
+Um dispositivo ocupa `size` enderecos a partir de onde foi ligado. Os acessos
+de dados nesses enderecos (LODD/STOD, LODL/STOL, PUSH/POP...) vao pro
+dispositivo em vez da RAM e nao passam pela D-Cache.
+
+    OutputPort:   escrita em base+0 sai como caractere, em base+1 como inteiro
+                  (com sinal, um por linha). Fica num buffer e vai pro stream
+                  em bloco (no fim do run() ou quando o buffer enche).
+    InputPort:    leitura devolve o proximo valor de um arquivo, texto ou
+                  iteravel (EOF = 0xFFFF, ou seja -1: da pra testar com JNEG).
+    CycleCounter: instrucoes buscadas desde o reset; base+0 = 16 bits baixos,
+                  base+1 = 16 bits altos.
+
+O estado de cada dispositivo e um inteiro so (pos): quantos valores ja sairam,
+quantos ja foram lidos, quantas instrucoes passaram. Ele vai no snapshot e no
+diario de desfazer, entao voltar no tempo (step_back, goto) nao imprime de novo
+nem consome outra entrada: a saida ja emitida fica, e a entrada ja lida e
+repetida do historico.
+"""
+import io
+from typing import IO, Iterable, Optional, Union
+from src.common.constants import MASK_16BIT
+
+# Mapa padrao (standard_io): logo abaixo da pilha, que desce de 4095
+IO_BASE = 0xF00
+OUT_CHAR, OUT_INT = IO_BASE, IO_BASE + 1
+IN_PORT = IO_BASE + 2
+CYCLES_LO, CYCLES_HI = IO_BASE + 3, IO_BASE + 4
+
+EOF = MASK_16BIT
+
+class Device:
+    """Base: size enderecos; read/write recebem o deslocamento a partir da base"""
+    size = 1
+    clocked = False # True: MemorySystem chama tick() a cada busca de instrucao
+
+    def __init__(self):
+        self.pos = 0
+
+    def read(self, off: int) -> int:
+        return 0
+
+    def write(self, off: int, val: int):
+        pass
+
+    def tick(self):
+        self.pos += 1
+
+    def flush(self):
+        pass
+
+    def reset(self):
+        self.pos = 0
+
+class OutputPort(Device):
+    """Saida em texto: base+0 = caractere, base+1 = inteiro com sinal + newline.
+    Sem stream guarda tudo num StringIO (ver text())."""
+    size = 2
+
+    def __init__(self, stream: Optional[IO[str]] = None, buffer: int = 4096):
+        super().__init__()
+        self.stream = io.StringIO() if stream is None else stream
+        self.limit = buffer
+        self.sent = 0 # Valores ja emitidos (pos < sent: re-execucao, nao emite de novo)
+        self._buf = []
+
+    def write(self, off: int, val: int):
+        pos = self.pos
+        self.pos = pos + 1
+        if pos < self.sent: return
+        self.sent = pos + 1
+        buf = self._buf
+        if off: buf.append(f"{val - 0x10000 if val & 0x8000 else val}\n")
+        else: buf.append(chr(val))
+        if len(buf) >= self.limit: self.flush()
+
+    def flush(self):
+        if not self._buf: return
+        self.stream.write("".join(self._buf))
+        self._buf.clear()
+        if hasattr(self.stream, "flush"): self.stream.flush()
+
+    def text(self) -> str:
+        # Tudo que saiu (so com o StringIO padrao)
+        self.flush()
+        return self.stream.getvalue()
+
+    def reset(self):
+        self.flush()
+        self.pos = self.sent = 0
+
+class InputPort(Device):
+    """Entrada: cada leitura consome um valor. source pode ser um arquivo ou
+    texto (mode 'int': inteiros separados por espaco, aceita 0x...; 'char': um
+    caractere por leitura) ou um iteravel de inteiros."""
+
+    def __init__(self, source: Union[IO[str], str, Iterable[int]] = (), mode: str = "int"):
+        super().__init__()
+        if mode not in ("int", "char"): raise ValueError(f"Modo {mode} invalido (use int ou char)")
+        self.mode = mode
+        self.history = [] # Tudo que ja foi lido (re-execucao le daqui)
+        self._it = self._values(source)
+
+    def _values(self, source):
+        if isinstance(source, str): source = io.StringIO(source)
+        if hasattr(source, "read"):
+            if self.mode == "char":
+                while True:
+                    chunk = source.read(4096)
+                    if not chunk: return
+                    yield from (ord(c) & MASK_16BIT for c in chunk)
+            for line in source:
+                yield from (int(tok, 0) & MASK_16BIT for tok in line.split())
+            return
+        for v in source:
+            yield (ord(v) if isinstance(v, str) else v) & MASK_16BIT
+
+    def read(self, off: int) -> int:
+        pos = self.pos
+        self.pos = pos + 1
+        hist = self.history
+        if pos < len(hist): return hist[pos]
+        val = next(self._it, EOF)
+        hist.append(val)
+        return val
+
+class CycleCounter(Device):
+    """Instrucoes buscadas desde o reset: base+0 = bits 0-15, base+1 = bits 16-31"""
+    size = 2
+    clocked = True
+
+    def read(self, off: int) -> int:
+        return (self.pos >> 16 * off) & MASK_16BIT
+
+def standard_io(mem, out: Optional[IO[str]] = None, inp=(), mode: str = "int"):
+    """Liga os tres dispositivos no mapa padrao (OUT_CHAR, OUT_INT, IN_PORT,
+    CYCLES_LO/HI) e devolve (saida, entrada, contador)"""
+    devs = OutputPort(out), InputPort(inp, mode), CycleCounter()
+    for base, dev in zip((OUT_CHAR, IN_PORT, CYCLES_LO), devs): mem.attach(base, dev)
+    return devs
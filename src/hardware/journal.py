@@ -0,0 +1,195 @@
+"""Diario de execucao: permite voltar instrucoes (step back / reverse continue).
+
+Andando pra frente o diario so guarda um checkpoint completo (snapshot) a cada
+`checkpoint_every` instrucoes, entao quase nao pesa no Mic1CPU.run. Os
+checkpoints ficam num buffer limitado que cobre pelo menos as `capacity`
+ultimas instrucoes.
+
+Pra voltar, o trecho entre o checkpoint anterior e a posicao atual e
+re-executado gravando o que cada instrucao mudou: os registradores de antes, o
+status das caches e o valor antigo de tudo que a RAM e as caches mudaram
+(palavra escrita, linha preenchida num miss, flush). Dai cada step back so
+desfaz esses deltas. Voltar muito longe restaura direto o checkpoint mais
+proximo do alvo, entao o custo depende do intervalo entre checkpoints e nao do
+tamanho do historico.
+"""
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Campos de uma entrada: registradores de antes da instrucao (mesma ordem do
+# cpu_regs()) + last_addr, status das caches (tupla, uma por mem.caches) e tamanho do log
+REGS_LEN = 13
+E_LOG = 15
+
+@contextmanager
+def _profiler_paused(cpu):
+    # Re-execucao nao conta de novo no profiler (src/hardware/profiler.py)
+    prof, cpu.profiler = cpu.profiler, None
+    try:
+        yield
+    finally:
+        cpu.profiler = prof
+
+class Journal:
+    """Historico limitado das ultimas instrucoes de uma Mic1CPU"""
+    def __init__(self, cpu, capacity=100_000, checkpoint_every=1000):
+        self.cpu = cpu
+        self.capacity = capacity
+        self.checkpoint_every = checkpoint_every
+        self.pos = 0 # Quantas instrucoes ja foram gravadas (contador global)
+        self.cp_pos = [] # Posicoes dos checkpoints (crescente)
+        self.cp_data = []
+        # Deltas das instrucoes entre o ultimo checkpoint e pos (so depois de
+        # voltar): uma tupla por instrucao + o log onde RAM e caches anotam
+        # os valores antigos (formato em MemorySystem.__init__)
+        self.entries = []
+        self.log = array('q')
+        self.attach()
+
+    def attach(self):
+        self.cpu.journal = self
+
+    def detach(self):
+        self.cpu.journal = None
+
+    def clear(self):
+        # Esquece o historico (ex: programa novo ou RAM editada na mao)
+        self.pos = 0
+        self.cp_pos, self.cp_data = [], []
+        self.drop_window()
+
+    def drop_window(self):
+        # Descarta os deltas (a CPU vai andar pra frente de novo)
+        self.entries.clear()
+        del self.log[:]
+
+    @property
+    def oldest(self) -> int:
+        return self.cp_pos[0] if self.cp_pos else self.pos
+
+    @property
+    def count(self) -> int:
+        return self.pos - self.oldest
+
+    # --- Gravacao ---
+
+    def cpu_regs(self):
+        c, r = self.cpu, self.cpu.regs
+        return (r.pc, r.sp, r.h, r.mar, r.mdr, r.mbr,
+                r.opc, c.alu.n, c.alu.z, c.alu.last_res, c.halted, c.curr_op, c.cycle)
+
+    def until_checkpoint(self) -> int:
+        # Quantas instrucoes faltam pro proximo checkpoint (0 = agora)
+        return -self.pos % self.checkpoint_every
+
+    def checkpoint(self, regs, pos):
+        """Guarda o estado inteiro (regs + memoria) como o da posicao `pos`"""
+        if self.cp_pos and self.cp_pos[-1] == pos: return # Ja tinha (voltou e andou de novo)
+        self.cp_pos.append(pos)
+        self.cp_data.append((regs, self.cpu.mem.snapshot()))
+        # Mantem so os checkpoints necessarios pra cobrir `capacity` instrucoes
+        if len(self.cp_pos) > 1 and self.cp_pos[1] <= pos - self.capacity:
+            del self.cp_pos[0], self.cp_data[0]
+
+    def record(self, regs):
+        """Chamado antes de cada instrucao com o estado dos registradores
+        (o Mic1CPU.run faz a mesma coisa sem chamar esse metodo)"""
+        if self.entries: self.drop_window()
+        if not self.until_checkpoint(): self.checkpoint(regs, self.pos)
+        self.pos += 1
+
+    # --- Voltando no tempo ---
+
+    def _set_state(self, regs):
+        c, r = self.cpu, self.cpu.regs
+        (r.pc, r.sp, r.h, r.mar, r.mdr, r.mbr,
+         r.opc, c.alu.n, c.alu.z, c.alu.last_res, c.halted, c.curr_op, c.cycle) = regs
+        c.ctrl_sig = "VOLTOU"
+        c._reset_bus()
+
+    def _load_checkpoint(self, target):
+        # Restaura o checkpoint mais proximo antes (ou em) target; devolve a posicao dele
+        i = bisect_right(self.cp_pos, target) - 1
+        regs, blob = self.cp_data[i]
+        self.cpu.mem.restore(blob)
+        self._set_state(regs)
+        return self.cp_pos[i]
+
+    def _drop_checkpoints_after(self, pos):
+        i = bisect_right(self.cp_pos, pos)
+        del self.cp_pos[i:], self.cp_data[i:]
+
+    def _rebuild_window(self):
+        # Re-executa do checkpoint anterior ate pos gravando os deltas
+        self.drop_window()
+        cpu, mem, log = self.cpu, self.cpu.mem, self.log
+        self.detach()
+        try:
+            start = self._load_checkpoint(self.pos - 1)
+            mem.set_log(log)
+            with cpu.breakpoints.paused(), mem.stats_paused(), _profiler_paused(cpu):
+                for _ in range(self.pos - start):
+                    self.entries.append(self.cpu_regs() + (mem.last_addr, tuple(c.last_status for c in mem.caches),
+                                                           len(log)))
+                    cpu.run(1, until_halt=False)
+        finally:
+            mem.set_log(None)
+            self.attach()
+
+    def step_back(self) -> bool:
+        """Desfaz a ultima instrucao gravada. False se o historico acabou."""
+        if self.pos <= self.oldest: return False
+        if not self.entries: self._rebuild_window()
+        e = self.entries.pop()
+        mem = self.cpu.mem
+        log = self.log
+        while len(log) > e[E_LOG]:
+            mem.undo(log.pop())
+        mem.last_addr, status = e[REGS_LEN:E_LOG]
+        for c, st in zip(mem.caches, status): c.last_status = st
+        self._set_state(e[:REGS_LEN])
+        self.pos -= 1
+        self._drop_checkpoints_after(self.pos)
+        return True
+
+    def goto(self, target: int):
+        """Volta ate a posicao `target` (entre oldest e pos)"""
+        if not (self.oldest <= target <= self.pos):
+            raise ValueError(f"Posicao {target} fora do historico ({self.oldest}..{self.pos})")
+        if self.pos - len(self.entries) <= target:
+            # Ainda dentro dos deltas ja gravados
+            while self.pos > target: self.step_back()
+            return
+        # Restaura o checkpoint e re-executa ate o alvo (sem gravar de novo)
+        self.drop_window()
+        self.detach()
+        try:
+            cp = self._load_checkpoint(target)
+            if target > cp:
+                with self.cpu.breakpoints.paused(), self.cpu.mem.stats_paused(), _profiler_paused(self.cpu):
+                    self.cpu.run(target - cp, until_halt=False)
+        finally:
+            self.attach()
+        self.pos = target
+        self._drop_checkpoints_after(target)
+
+    def rewind(self, n: int):
+        self.goto(max(self.oldest, self.pos - n))
+
+    def reverse_continue(self, stop: Optional[Callable] = None) -> int:
+        """Volta instrucao por instrucao ate stop(cpu) ser verdadeiro ou o historico acabar.
+        Devolve quantas instrucoes voltou."""
+        n = 0
+        while self.step_back():
+            n += 1
+            if stop is not None and stop(self.cpu): break
+        return n
+
+    # --- Execucao gravada ---
+
+    def step(self):
+        # Uma instrucao completa (mesmo efeito de cycle_all)
+        self.record(self.cpu_regs())
+        self.cpu.cycle_all()
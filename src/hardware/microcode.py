@@ -0,0 +1,364 @@
+"""MIC-1 de verdade: control store de 256 microinstrucoes de 32 bits + MPC.
+
+Formato da microinstrucao (igual ao do Tanenbaum):
+
+    31    AMUX  (0 = latch A, 1 = MBR)
+    30-29 COND  (0 = nao pula, 1 = pula se N, 2 = pula se Z, 3 = sempre)
+    28-27 ALU   (0 = A+B, 1 = A AND B, 2 = A, 3 = NOT A)
+    26-25 SH    (0 = nada, 1 = direita, 2 = esquerda)
+    24 MBR, 23 MAR, 22 RD, 21 WR, 20 ENC
+    19-16 C, 15-12 B, 11-8 A (registradores do scratchpad)
+    7-0   ADDR  (proximo MPC quando o COND manda pular)
+
+O microprograma abaixo implementa o mesmo conjunto de instrucoes da Mic1CPU
+(mesmas palavras de maquina, LOCO com sinal, EXT com funcao nos 12 bits de
+baixo). Leitura e escrita na memoria levam dois ciclos com RD/WR ligados, e
+passam pelo mesmo MemorySystem (I-Cache na busca, D-Cache nos dados).
+
+Diferencas de registradores visiveis: aqui o MBR e o registrador de dados de
+verdade (fica com o ultimo valor lido/escrito) e o MAR com o ultimo endereco;
+na Mic1CPU eles sempre mostram a instrucao. PC, SP, AC (H), flags, RAM,
+caches, halted e cycle batem instrucao por instrucao.
+"""
+from typing import Optional
+from src.common.constants import MASK_12BIT, MASK_16BIT
+from src.hardware.components import MemorySystem
+from src.hardware.cpu import RunResult
+
+# Scratchpad (16 registradores). As constantes nunca sao escritas.
+PC, AC, SP, IR, TIR, ZERO, PLUS1, MINUS1, AMASK, SMASK = range(10)
+A, B, C, D, E, F = range(10, 16)
+# E = 1 quando a maquina parou (HALT); F = resultado da ultima instrucao que
+# passou pela ULA (as flags N/Z dos jumps condicionais saem dele)
+HALT_REG, FLAG_REG = E, F
+SCRATCH_NAMES = ("PC", "AC", "SP", "IR", "TIR", "0", "+1", "-1", "AMASK", "SMASK",
+                 "A", "B", "C", "D", "E", "F")
+
+# Campos
+ALU_ADD, ALU_AND, ALU_A, ALU_INV = range(4)
+SH_NONE, SH_RIGHT, SH_LEFT = range(3)
+COND_NONE, COND_N, COND_Z, COND_ALWAYS = range(4)
+
+CS_SIZE = 256
+
+def encode(amux=0, cond=COND_NONE, alu=ALU_A, sh=SH_NONE, mbr=0, mar=0, rd=0, wr=0,
+           c=None, b=0, a=0, addr=0) -> int:
+    """Monta uma microinstrucao de 32 bits (c=None = ENC desligado)"""
+    enc = 0 if c is None else 1
+    return (amux << 31 | cond << 29 | alu << 27 | sh << 25 | mbr << 24 | mar << 23 |
+            rd << 22 | wr << 21 | enc << 20 | (c or 0) << 16 | b << 12 | a << 8 | addr)
+
+def decode(word: int) -> tuple:
+    """Campos da microinstrucao na ordem
+    (amux, cond, alu, sh, mbr, mar, rd, wr, enc, c, b, a, addr)"""
+    return (word >> 31 & 1, word >> 29 & 3, word >> 27 & 3, word >> 25 & 3,
+            word >> 24 & 1, word >> 23 & 1, word >> 22 & 1, word >> 21 & 1,
+            word >> 20 & 1, word >> 16 & 15, word >> 12 & 15, word >> 8 & 15, word & 255)
+
+def _u(label=None, goto=None, cond=None, **fields):
+    # Uma linha do microprograma: goto sem cond = pulo incondicional
+    if goto is not None and cond is None: cond = COND_ALWAYS
+    return (label, goto, cond or COND_NONE, fields)
+
+# Abreviacoes pras linhas mais comuns
+def _inc(r, **kw): return _u(c=r, a=r, b=PLUS1, alu=ALU_ADD, **kw)
+def _dec(r, **kw): return _u(c=r, a=r, b=MINUS1, alu=ALU_ADD, **kw)
+def _mov(dst, src, **kw): return _u(c=dst, a=src, **kw)
+
+# Endereco onde a leitura de busca termina (vai pela I-Cache)
+FETCH_READ_ADDR = 1
+
+_PROGRAM = [
+    # Busca: MAR <- PC, le a instrucao, PC + 1
+    _u("FETCH", b=PC, mar=1, rd=1),
+    _inc(PC, rd=1),
+    _u(c=IR, amux=1),
+    _u(a=HALT_REG, cond=COND_Z, goto="DEC"),
+    _u(goto="FETCH"), # Parada: so busca
+
+    # Decodificacao bit a bit (testando N com o opcode deslocado)
+    _u("DEC", a=IR, cond=COND_N, goto="D1"),
+    _u(c=TIR, a=IR, b=IR, alu=ALU_ADD, sh=SH_LEFT, cond=COND_N, goto="D01"),
+    _u(c=TIR, a=TIR, sh=SH_LEFT, cond=COND_N, goto="D001"),
+    _u(a=TIR, cond=COND_N, goto="STOD"),
+
+    # 0000 LODD
+    _u("LODD", b=IR, mar=1, rd=1),
+    _u(rd=1),
+    _u(c=AC, amux=1),
+    _mov(FLAG_REG, AC, label="SETF", goto="FETCH"),
+
+    # 0001 STOD
+    _u("STOD", b=IR, mar=1, a=AC, mbr=1, wr=1),
+    _u(wr=1, goto="FETCH"),
+
+    _u("D001", a=TIR, cond=COND_N, goto="SUBD"),
+    # 0010 ADDD
+    _u("ADDD", b=IR, mar=1, rd=1),
+    _u(rd=1),
+    _u(c=AC, amux=1, b=AC, alu=ALU_ADD, goto="SETF"),
+    # 0011 SUBD: AC + (NOT MBR) + 1
+    _u("SUBD", b=IR, mar=1, rd=1),
+    _u(rd=1),
+    _u("SUB_MBR", c=A, amux=1, alu=ALU_INV),
+    _inc(A),
+    _u(c=AC, a=AC, b=A, alu=ALU_ADD, goto="SETF"),
+
+    _u("D01", c=TIR, a=TIR, sh=SH_LEFT, cond=COND_N, goto="D011"),
+    _u(a=TIR, cond=COND_N, goto="JZER"),
+    # 0100 JPOS
+    _u("JPOS", a=FLAG_REG, cond=COND_N, goto="FETCH"),
+    _u(a=FLAG_REG, cond=COND_Z, goto="FETCH"),
+    _u("TAKE", c=PC, a=IR, b=AMASK, alu=ALU_AND, goto="FETCH"),
+    # 0101 JZER
+    _u("JZER", a=FLAG_REG, cond=COND_Z, goto="TAKE"),
+    _u(goto="FETCH"),
+
+    _u("D011", a=TIR, cond=COND_N, goto="LOCO"),
+    # 0110 JUMP
+    _u("JUMP", goto="TAKE"),
+    # 0111 LOCO: constante de 12 bits com sinal (bit 11 vai pro N depois de << 4)
+    _u("LOCO", c=A, a=IR, b=IR, alu=ALU_ADD, sh=SH_LEFT),
+    _u(c=A, a=A, b=A, alu=ALU_ADD, sh=SH_LEFT),
+    _u(c=AC, a=IR, b=AMASK, alu=ALU_AND),
+    _u(a=A, cond=COND_N, goto="LOCO_NEG"),
+    _u(goto="SETF"),
+    _u("LOCO_NEG", c=A, a=AMASK, alu=ALU_INV),
+    _u(c=AC, a=AC, b=A, alu=ALU_ADD, goto="SETF"),
+
+    _u("D1", c=TIR, a=IR, b=IR, alu=ALU_ADD, sh=SH_LEFT, cond=COND_N, goto="D11"),
+    _u(c=TIR, a=TIR, sh=SH_LEFT, cond=COND_N, goto="D101"),
+    _u(a=TIR, cond=COND_N, goto="STOL"),
+    # 1000 LODL
+    _u("LODL", c=A, a=IR, b=SP, alu=ALU_ADD),
+    _u(b=A, mar=1, rd=1),
+    _u(rd=1),
+    _u(c=AC, amux=1, goto="SETF"),
+    # 1001 STOL
+    _u("STOL", c=A, a=IR, b=SP, alu=ALU_ADD),
+    _u(b=A, mar=1, a=AC, mbr=1, wr=1),
+    _u(wr=1, goto="FETCH"),
+
+    _u("D101", a=TIR, cond=COND_N, goto="SUBL"),
+    # 1010 ADDL
+    _u("ADDL", c=A, a=IR, b=SP, alu=ALU_ADD),
+    _u(b=A, mar=1, rd=1),
+    _u(rd=1),
+    _u(c=AC, amux=1, b=AC, alu=ALU_ADD, goto="SETF"),
+    # 1011 SUBL
+    _u("SUBL", c=A, a=IR, b=SP, alu=ALU_ADD),
+    _u(b=A, mar=1, rd=1),
+    _u(rd=1, goto="SUB_MBR"),
+
+    _u("D11", c=TIR, a=TIR, sh=SH_LEFT, cond=COND_N, goto="D111"),
+    _u(a=TIR, cond=COND_N, goto="JNZE"),
+    # 1100 JNEG
+    _u("JNEG", a=FLAG_REG, cond=COND_N, goto="TAKE"),
+    _u(goto="FETCH"),
+    # 1101 JNZE
+    _u("JNZE", a=FLAG_REG, cond=COND_Z, goto="FETCH"),
+    _u(goto="TAKE"),
+
+    _u("D111", a=TIR, cond=COND_N, goto="EXT"),
+    # 1110 CALL
+    _u("CALL", c=SP, a=SP, b=MINUS1, alu=ALU_ADD),
+    _u(b=SP, mar=1, a=PC, mbr=1, wr=1),
+    _u(c=PC, a=IR, b=AMASK, alu=ALU_AND, wr=1, goto="FETCH"),
+
+    # 1111 EXT: funcao = IR AND AMASK, testada subtraindo 1 ate dar zero
+    _u("EXT", c=A, a=IR, b=AMASK, alu=ALU_AND, cond=COND_Z, goto="HALT"),
+    _dec(A, cond=COND_Z, goto="PSHI"),
+    _dec(A, cond=COND_Z, goto="POPI"),
+    _dec(A, cond=COND_Z, goto="PUSH"),
+    _dec(A, cond=COND_Z, goto="POP"),
+    _dec(A, cond=COND_Z, goto="RETN"),
+    _dec(A, cond=COND_Z, goto="SWAP"),
+    _dec(A, cond=COND_Z, goto="INSP"),
+    _dec(A, cond=COND_Z, goto="DESP"),
+    _u(goto="FETCH"), # Funcao desconhecida = NOP
+
+    _mov(HALT_REG, PLUS1, label="HALT", goto="FETCH"),
+    # PSHI: Mem[AC] -> pilha
+    _u("PSHI", b=AC, mar=1, rd=1),
+    _dec(SP, rd=1),
+    _u(b=SP, mar=1, wr=1),
+    _u(wr=1, goto="FETCH"),
+    # POPI: pilha -> Mem[AC]
+    _u("POPI", b=SP, mar=1, rd=1),
+    _inc(SP, rd=1),
+    _u(b=AC, mar=1, wr=1),
+    _u(wr=1, goto="FETCH"),
+    _dec(SP, label="PUSH"),
+    _u(b=SP, mar=1, a=AC, mbr=1, wr=1),
+    _u(wr=1, goto="FETCH"),
+    _u("POP", b=SP, mar=1, rd=1),
+    _inc(SP, rd=1),
+    _u(c=AC, amux=1, goto="SETF"),
+    _u("RETN", b=SP, mar=1, rd=1),
+    _inc(SP, rd=1),
+    _u(c=PC, amux=1, goto="FETCH"),
+    _mov(A, AC, label="SWAP"),
+    _mov(AC, SP),
+    _mov(SP, A, goto="FETCH"),
+    _inc(SP, label="INSP", goto="FETCH"),
+    _dec(SP, label="DESP", goto="FETCH"),
+]
+
+def assemble_microprogram(program=_PROGRAM):
+    """Resolve os rotulos e devolve o control store (256 palavras de 32 bits)"""
+    if len(program) > CS_SIZE:
+        raise ValueError(f"Microprograma com {len(program)} palavras (maximo {CS_SIZE})")
+    labels = {label: i for i, (label, _, _, _) in enumerate(program) if label is not None}
+    store = [0] * CS_SIZE
+    for i, (_, goto, cond, fields) in enumerate(program):
+        store[i] = encode(cond=cond, addr=labels[goto] if goto is not None else 0, **fields)
+    return store, labels
+
+CONTROL_STORE, LABELS = assemble_microprogram()
+
+class MicroMic1:
+    """Executa a MIC-1 microinstrucao por microinstrucao a partir do control store.
+
+    Os campos sao pre-decodificados uma vez em tuplas, entao o laco de
+    micro-passos so desempacota e faz contas com inteiros.
+    """
+    def __init__(self, store=None, mem: Optional[MemorySystem] = None):
+        self.store = list(CONTROL_STORE if store is None else store)
+        # (campos..., leitura de busca?) pra cada endereco do control store
+        self._pre = [decode(w) + (addr == FETCH_READ_ADDR,) for addr, w in enumerate(self.store)]
+        self.mem = mem if mem is not None else MemorySystem()
+        self.reset()
+
+    def reset(self):
+        self.scratch = [0] * 16
+        s = self.scratch
+        s[PLUS1], s[MINUS1], s[AMASK], s[SMASK] = 1, MASK_16BIT, MASK_12BIT, 0xFF
+        s[SP] = 4095
+        # F = 1 da N=0 e Z=0, igual as flags da Mic1CPU depois do reset
+        s[FLAG_REG] = 1
+        self.mpc = 0
+        self.mar = 0
+        self.mbr = 0
+        self._rd = self._wr = False # RD/WR do ciclo anterior (memoria leva 2 ciclos)
+        self.cycle = 0      # Instrucoes executadas (como Mic1CPU.cycle)
+        self.micro_cycles = 0
+        self._was_halted = False # Instrucao atual comecou com a maquina parada?
+        self.last_mi = None # Campos da ultima microinstrucao (pra interface acender os fios)
+        self.mem.flush_all()
+        self.mem.reset_stall()
+        self.mem.reset_devices()
+        self.mem.last_addr = -1
+
+    # Registradores no mesmo nome da Mic1CPU
+    @property
+    def pc(self) -> int: return self.scratch[PC]
+    @property
+    def sp(self) -> int: return self.scratch[SP]
+    @property
+    def h(self) -> int: return self.scratch[AC]
+    @property
+    def halted(self) -> bool: return self.scratch[HALT_REG] != 0
+    @property
+    def last_res(self) -> int: return self.scratch[FLAG_REG]
+    @property
+    def n(self) -> bool: return self.scratch[FLAG_REG] >= 0x8000
+    @property
+    def z(self) -> bool: return self.scratch[FLAG_REG] == 0
+
+    def load_bin(self, code):
+        self.mem.load_bin(code)
+
+    def bus(self) -> dict:
+        """Barramentos ativos na ultima microinstrucao (mesmas chaves do Mic1CPU.bus)"""
+        mi = self.last_mi
+        if mi is None: return {'a': False, 'b': False, 'c': False, 'rd': False, 'wr': False}
+        amux, cond, alu, sh, mbrf, marf, rd, wr, enc, c, b, a, addr, fetch = mi
+        used = bool(enc or mbrf or cond in (COND_N, COND_Z)) # Resultado da ULA serve pra algo?
+        return {'a': used and not amux, 'b': (used and alu in (ALU_ADD, ALU_AND)) or bool(marf),
+                'c': bool(enc), 'rd': bool(rd), 'wr': bool(wr)}
+
+    def _exec(self, instrs: int, until_halt: bool, micro: int = -1):
+        # Laco de microinstrucoes. Para no comeco de uma instrucao quando acabar
+        # o orcamento `instrs` (-1 = sem limite) ou a maquina estiver parada
+        # (until_halt), ou no meio de uma quando acabar `micro` (-1 = sem limite)
+        pre = self._pre
+        s = self.scratch
+        mem = self.mem
+        read_instr, read_data, write = mem.read_instr, mem.read_data, mem.write
+        M = MASK_16BIT
+        mpc, mar, mbr = self.mpc, self.mar, self.mbr
+        rd_prev, wr_prev = self._rd, self._wr
+        was_halted = self._was_halted
+        cycle = self.cycle
+        mi = self.last_mi
+        executed = 0
+
+        while micro:
+            if mpc == 0:
+                if not instrs or (until_halt and s[HALT_REG]): break
+                instrs -= 1
+                was_halted = s[HALT_REG] != 0
+            micro -= 1
+            executed += 1
+
+            mi = pre[mpc]
+            amux, cond, alu, sh, mbrf, marf, rd, wr, enc, c, b, a, addr, fetch = mi
+            bv = s[b]
+            av = mbr if amux else s[a]
+            if alu == ALU_A: out = av
+            elif alu == ALU_ADD: out = (av + bv) & M
+            elif alu == ALU_AND: out = av & bv
+            else: out = ~av & M
+            if sh == SH_LEFT: res = (out << 1) & M
+            elif sh == SH_RIGHT: res = out >> 1
+            else: res = out
+
+            if marf: mar = bv & MASK_12BIT
+            if mbrf: mbr = res
+            if enc: s[c] = res
+
+            # Memoria: a operacao termina no segundo ciclo seguido com RD/WR
+            if rd:
+                if rd_prev:
+                    mbr = read_instr(mar) if fetch else read_data(mar)
+                    rd_prev = False
+                else: rd_prev = True
+            else: rd_prev = False
+            if wr:
+                if wr_prev:
+                    write(mar, mbr)
+                    wr_prev = False
+                else: wr_prev = True
+            else: wr_prev = False
+
+            if cond == COND_ALWAYS or (cond == COND_N and out >= 0x8000) or (cond == COND_Z and out == 0):
+                mpc = addr
+            else:
+                mpc += 1
+            # Fim de instrucao (parada so busca, nao conta ciclo)
+            if mpc == 0 and not was_halted: cycle += 1
+
+        self.mpc, self.mar, self.mbr = mpc, mar, mbr
+        self._rd, self._wr = rd_prev, wr_prev
+        self._was_halted = was_halted
+        self.cycle = cycle
+        self.micro_cycles += executed
+        self.last_mi = mi
+
+    def run_micro(self, n: int = 1):
+        """Executa n microinstrucoes (pode parar no meio de uma instrucao)"""
+        self._exec(-1, False, n)
+
+    def step(self):
+        """Termina a instrucao atual, ou executa uma inteira (igual Mic1CPU.cycle_all)"""
+        self._exec(0 if self.mpc else 1, False)
+
+    def run(self, max_cycles: Optional[int] = None, until_halt: bool = True) -> RunResult:
+        """Mesmo contrato do Mic1CPU.run (conta instrucoes, nao microinstrucoes).
+        Se estiver no meio de uma instrucao, ela termina antes (fora do orcamento)."""
+        if max_cycles is None and not until_halt:
+            raise ValueError("max_cycles e obrigatorio quando until_halt=False")
+        start, stall = self.cycle, self.mem.stall_cycles
+        self._exec(-1 if max_cycles is None else max_cycles, until_halt)
+        if self.mem.devices: self.mem.flush_devices()
+        return RunResult(self.cycle - start, "HALT" if self.halted else "MAX_CYCLES", self.mem.stall_cycles - stall)
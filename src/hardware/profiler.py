@@ -0,0 +1,271 @@
+"""Profiler por instrucao: quantas vezes cada PC rodou, quantos ciclos gastou e
+quantos misses da D-Cache causou.
+
+Os contadores ficam em arrays('Q') de MEM_SIZE posicoes alocados uma vez so;
+o Mic1CPU.run soma direto neles (o modo traduzido fica desligado enquanto o
+profiler estiver ligado) e o passo a passo soma em fetch()/execute(). Ciclos =
+1 por instrucao + os ciclos de espera da memoria (com TimingConfig). Os misses
+vem do MemorySystem.set_miss_count, que so existe enquanto o profiler estiver
+ligado.
+
+Os relatorios usam o mapa endereco -> (linha, label) do montador
+(src/assembler/core.py, source_map):
+
+    prof = Profiler(cpu)
+    cpu.run(100000)
+    mc, msg, symbols, lines = assemble_with_info(src)
+    smap = source_map(symbols, lines)
+    print(prof.hotspots(smap))       # labels mais caras
+    print(prof.listing(src, smap))   # fonte com os contadores de cada linha
+
+Com stacks=True o profiler tambem guarda uma pilha sombra das chamadas (ver
+CallTree): cada CALL empilha a rotina chamada, cada RETN desempilha, e os
+ciclos vao pro contexto de chamada atual. Dai saem os ciclos inclusivos e
+exclusivos de cada rotina (routines) e as pilhas no formato "collapsed" do
+flamegraph.pl (collapsed/write_collapsed).
+"""
+from array import array
+from typing import Dict, List, Optional, Tuple
+from src.common.constants import MASK_12BIT, MASK_16BIT, MEM_SIZE
+from src.common.opcodes import OPCODE_MAP, Opcode
+
+RETN_WORD = OPCODE_MAP["RETN"]
+
+# Colunas de cada linha dos relatorios
+FIELDS = ("count", "cycles", "d_misses")
+
+# Profundidade maxima da pilha sombra (CALL alem disso conta na rotina atual)
+MAX_DEPTH = 256
+
+def _zeros(n):
+    return array('Q', bytes(8 * n))
+
+class CallTree:
+    """Arvore de contextos de chamada montada pela pilha sombra.
+
+    Cada no e um caminho de chamadas (raiz -> ... -> rotina) e guarda os ciclos
+    gastos com ele no topo (exclusivos). A pilha sombra (frames) tem o no, o
+    endereco de retorno e a posicao da pilha da CPU onde o CALL guardou esse
+    endereco. Como o programa mexe no SP como quiser (SWAP, INSP, DESP, PUSH
+    sem POP), nada aqui confia no SP pra desempilhar no RETN:
+        CALL: antes de empilhar, tira do topo os frames cujo endereco de retorno
+              ja saiu da pilha (SP acima dele: CALL usado como desvio e a
+              volta limpa com INSP/POP)
+        RETN: desempilha ate o frame mais de cima com aquele endereco de
+              retorno; se nenhum bater o RETN e tratado como um desvio
+    """
+    def __init__(self, root: int = 0):
+        self.addr = [root]   # Rotina (endereco de entrada) de cada no
+        self.parent = [-1]
+        self.weight = [0]    # Ciclos com o no no topo
+        self.calls = [0]     # Quantas vezes o no foi chamado
+        self.children = {}   # (no, rotina) -> no
+        self.frames = []     # Pilha sombra: (no, endereco de retorno, slot do SP)
+        self.node = 0        # No atual
+
+    def call(self, target: int, ret: int, slot: int) -> int:
+        """CALL pra target que guardou ret na posicao slot da pilha; devolve o no novo"""
+        frames = self.frames
+        while frames and frames[-1][2] < slot + 1: self._pop()
+        node = self.node
+        if len(frames) < MAX_DEPTH:
+            key = (node, target)
+            child = self.children.get(key)
+            if child is None:
+                child = self.children[key] = len(self.addr)
+                self.addr.append(target)
+                self.parent.append(node)
+                self.weight.append(0)
+                self.calls.append(0)
+            frames.append((node, ret, slot))
+            node = self.node = child
+        self.calls[node] += 1
+        return node
+
+    def retn(self, pc: int) -> int:
+        """RETN que foi pra pc; devolve o no atual depois dele"""
+        frames = self.frames
+        for i in range(len(frames) - 1, -1, -1):
+            if frames[i][1] == pc:
+                self.node = frames[i][0]
+                del frames[i:]
+                break
+        return self.node
+
+    def _pop(self):
+        self.node = self.frames.pop()[0]
+
+    def path(self, node: int):
+        # Rotinas da raiz ate o no
+        out = []
+        while node >= 0:
+            out.append(self.addr[node])
+            node = self.parent[node]
+        return out[::-1]
+
+class Profiler:
+    """Contadores por PC de uma Mic1CPU (cpu.profiler enquanto ligado)"""
+    def __init__(self, cpu, size: int = MEM_SIZE, stacks: bool = False):
+        self.cpu = cpu
+        # Pilha sombra (stacks=True): a raiz e a rotina onde o PC estava
+        self.tree = CallTree(cpu.regs.pc & (size - 1)) if stacks else None
+        self.counts = _zeros(size)
+        self.cycles = _zeros(size)
+        self.d_misses = _zeros(size)
+        self._zero = _zeros(size)
+        self._stall = self._miss = 0 # Totais no comeco da instrucao (passo a passo)
+        self.attach()
+
+    def attach(self):
+        self.cpu.profiler = self
+        self.cpu.mem.set_miss_count(True)
+
+    def detach(self):
+        self.cpu.profiler = None
+        self.cpu.mem.set_miss_count(False)
+
+    def clear(self):
+        # Zera no lugar (o run() pode estar com os arrays em variaveis locais)
+        self.counts[:] = self._zero
+        self.cycles[:] = self._zero
+        self.d_misses[:] = self._zero
+        if self.tree is not None: self.tree = CallTree(self.cpu.regs.pc & (len(self.counts) - 1))
+
+    # --- Passo a passo (Mic1CPU.fetch/execute) ---
+
+    def begin(self, mem):
+        self._stall = mem.stall_cycles
+        self._miss = mem.d_misses or 0
+
+    def end(self, pc: int, mem, word: int = 0, regs=None):
+        # word = instrucao que rodou, regs = registradores depois dela (pilha sombra)
+        stall, miss = mem.stall_cycles, mem.d_misses or 0
+        c = 1 + max(stall - self._stall, 0)
+        self.counts[pc] += 1
+        self.cycles[pc] += c
+        self.d_misses[pc] += max(miss - self._miss, 0)
+        self._stall, self._miss = stall, miss
+        tree = self.tree
+        if tree is not None:
+            tree.weight[tree.node] += c
+            if word >> 12 == Opcode.CALL: tree.call(word & MASK_12BIT, (regs.opc + 1) & MASK_16BIT, regs.sp)
+            elif word == RETN_WORD: tree.retn(regs.pc)
+
+    # --- Relatorios ---
+
+    def totals(self) -> Tuple[int, int, int]:
+        return sum(self.counts), sum(self.cycles), sum(self.d_misses)
+
+    def by_address(self) -> Dict[int, Tuple[int, int, int]]:
+        # So os enderecos que rodaram
+        c, cy, dm = self.counts, self.cycles, self.d_misses
+        return {a: (c[a], cy[a], dm[a]) for a in range(len(c)) if c[a]}
+
+    def by_line(self, smap: Dict[int, Tuple[int, Optional[str]]]) -> Dict[int, Tuple[int, int, int]]:
+        """Linha do fonte -> (execucoes, ciclos, misses); PC fora do mapa fica de fora"""
+        out = {}
+        for a, row in self.by_address().items():
+            if a in smap: out[smap[a][0]] = row
+        return out
+
+    def by_label(self, smap: Dict[int, Tuple[int, Optional[str]]]) -> Dict[Optional[str], Tuple[int, int, int]]:
+        """Label -> soma das instrucoes dela (None = antes da primeira label ou fora do mapa)"""
+        out = {}
+        for a, row in self.by_address().items():
+            label = smap[a][1] if a in smap else None
+            old = out.get(label, (0, 0, 0))
+            out[label] = (old[0] + row[0], old[1] + row[1], old[2] + row[2])
+        return out
+
+    def top(self, smap: Dict[int, Tuple[int, Optional[str]]], n: int = 10,
+            by: str = "label", key: str = "cycles") -> List[Tuple[object, int, int, int]]:
+        """As n labels (ou linhas, by="line") com mais ciclos (ou key="count"/"d_misses"):
+        lista de (label ou linha, execucoes, ciclos, misses)"""
+        k = FIELDS.index(key)
+        rows = self.by_label(smap) if by == "label" else self.by_line(smap)
+        top = sorted(rows.items(), key=lambda kv: kv[1][k], reverse=True)[:n]
+        return [(name,) + row for name, row in top]
+
+    def hotspots(self, smap: Dict[int, Tuple[int, Optional[str]]], n: int = 10,
+                 by: str = "label", key: str = "cycles") -> str:
+        """Tabela do top() com a porcentagem do total"""
+        k = FIELDS.index(key)
+        total = self.totals()[k] or 1
+        head = "label" if by == "label" else "linha"
+        out = [f"{head:<16} {'execucoes':>10} {'ciclos':>12} {'misses D':>9} {'%' + key:>9}"]
+        for name, c, cy, dm in self.top(smap, n, by, key):
+            name = "-" if name is None else str(name)
+            out.append(f"{name:<16} {c:>10} {cy:>12} {dm:>9} {100 * (c, cy, dm)[k] / total:>8.1f}%")
+        return "\n".join(out)
+
+    def listing(self, src: str, smap: Dict[int, Tuple[int, Optional[str]]]) -> str:
+        """Fonte com execucoes, ciclos e misses da D-Cache na frente de cada linha"""
+        rows = self.by_line(smap)
+        out = [f"{'execucoes':>10} {'ciclos':>12} {'misses D':>9} | fonte"]
+        for lno, text in enumerate(src.splitlines(), 1):
+            r = rows.get(lno)
+            nums = f"{r[0]:>10} {r[1]:>12} {r[2]:>9}" if r else " " * 33
+            out.append(f"{nums} | {text}")
+        return "\n".join(out)
+
+    def line_heat(self, smap: Dict[int, Tuple[int, Optional[str]]], key: str = "cycles") -> Dict[int, float]:
+        """Linha -> fracao (0..1] da linha mais quente (pro editor colorir)"""
+        # So os enderecos do mapa (a interface chama a cada quadro)
+        col = (self.counts, self.cycles, self.d_misses)[FIELDS.index(key)]
+        size = len(col)
+        vals = {lno: col[a] for a, (lno, _) in smap.items() if a < size and col[a]}
+        top = max(vals.values(), default=0)
+        return {lno: v / top for lno, v in vals.items()}
+
+    # --- Pilha de chamadas (stacks=True) ---
+
+    def routine_names(self, smap: Dict[int, Tuple[int, Optional[str]]]) -> Dict[int, str]:
+        """Rotina (endereco) -> nome: a label do source_map, ou o endereco em hex
+        (a raiz sem label vira "inicio")"""
+        tree = self.tree
+        out = {}
+        for a in set(tree.addr):
+            label = smap[a][1] if a in smap else None
+            out[a] = label if label is not None else f"0x{a:03X}"
+        if out[tree.addr[0]].startswith("0x"): out[tree.addr[0]] = "inicio"
+        return out
+
+    def collapsed(self, smap: Dict[int, Tuple[int, Optional[str]]]) -> str:
+        """Uma linha "raiz;...;rotina ciclos" por contexto de chamada (formato
+        do flamegraph.pl / speedscope), ciclos exclusivos de cada contexto"""
+        tree = self.tree
+        names = self.routine_names(smap)
+        out = {}
+        for node, w in enumerate(tree.weight):
+            if not w: continue
+            key = ";".join(names[a] for a in tree.path(node))
+            out[key] = out.get(key, 0) + w
+        return "".join(f"{k} {w}\n" for k, w in out.items())
+
+    def write_collapsed(self, path: str, smap: Dict[int, Tuple[int, Optional[str]]]):
+        with open(path, "w", encoding="utf-8") as f: f.write(self.collapsed(smap))
+
+    def routines(self, smap: Dict[int, Tuple[int, Optional[str]]]) -> Dict[str, Tuple[int, int, int]]:
+        """Rotina -> (chamadas, ciclos inclusivos, ciclos exclusivos). Recursao
+        conta uma vez so no inclusivo de cada contexto."""
+        tree = self.tree
+        names = self.routine_names(smap)
+        out = {}
+        for node, w in enumerate(tree.weight):
+            name = names[tree.addr[node]]
+            calls, inc, exc = out.get(name, (0, 0, 0))
+            out[name] = (calls + tree.calls[node], inc, exc + w)
+            if not w: continue
+            for name in {names[a] for a in tree.path(node)}:
+                calls, inc, exc = out[name] if name in out else (0, 0, 0)
+                out[name] = (calls, inc + w, exc)
+        return out
+
+    def routine_table(self, smap: Dict[int, Tuple[int, Optional[str]]], n: int = 10) -> str:
+        """Tabela das n rotinas com mais ciclos inclusivos"""
+        rows = sorted(self.routines(smap).items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+        total = sum(self.tree.weight) or 1
+        out = [f"{'rotina':<16} {'chamadas':>9} {'inclusivo':>12} {'exclusivo':>12} {'%incl':>7}"]
+        for name, (calls, inc, exc) in rows:
+            out.append(f"{name:<16} {calls:>9} {inc:>12} {exc:>12} {100 * inc / total:>6.1f}%")
+        return "\n".join(out)
@@ -0,0 +1,128 @@
+"""Contadores de desempenho das caches e da RAM.
+
+Ficam desligados por padrao: sem CacheStats a cache usa o caminho rapido e
+nada e contado. MemorySystem.enable_stats() liga (zerando), MemorySystem.stats()
+devolve tudo num dict e export_json/export_ram_csv/export_cache_csv salvam
+depois de uma execucao.
+
+Os misses sao classificados assim:
+    compulsory: primeiro acesso ao bloco
+    flush:      o bloco saiu da cache por flush ou invalidacao (escrita no endereco)
+    conflict:   uma cache totalmente associativa LRU do mesmo tamanho teria acertado
+    capacity:   nem a totalmente associativa teria o bloco
+"""
+import csv
+import json
+from array import array
+from collections import OrderedDict
+
+MISS_KINDS = ("compulsory", "capacity", "conflict", "flush")
+COMPULSORY, CAPACITY, CONFLICT, FLUSH = range(4)
+
+# Contadores escalares de cada cache (ordem das colunas no CSV)
+CACHE_FIELDS = ("reads", "writes", "read_hits", "read_misses", "write_hits", "write_misses",
+                "evictions", "writebacks", "flushes", "invalidations", "ram_words_read", "ram_words_written")
+
+def _zeros(n):
+    return array('Q', bytes(8 * n))
+
+class CacheStats:
+    """Contadores de uma Cache (cache.stats quando ligados)"""
+    def __init__(self, lines: int, sets: int, block: int, mem_size: int):
+        self.lines = lines
+        self.block_shift = block.bit_length() - 1
+        self.set_bits = sets.bit_length() - 1
+        for f in CACHE_FIELDS[2:]: setattr(self, f, 0)
+        self.miss_kinds = [0] * len(MISS_KINDS)
+        # Acessos (acerto ou preenchimento) por linha e por conjunto
+        self.line_access = _zeros(lines)
+        self.set_access = _zeros(sets)
+        # Histograma por endereco (pedidos da CPU, nao trafego de blocos)
+        self.addr_reads = _zeros(mem_size)
+        self.addr_writes = _zeros(mem_size)
+        # Estado pra classificar os misses (por bloco)
+        self.seen = bytearray(mem_size >> self.block_shift)
+        self.flushed = bytearray(mem_size >> self.block_shift)
+        self.shadow = OrderedDict() # Cache totalmente associativa LRU de mesmo tamanho
+
+    # reads/writes saem dos acertos + misses (um contador a menos no caminho quente)
+    @property
+    def reads(self) -> int:
+        return self.read_hits + self.read_misses
+
+    @property
+    def writes(self) -> int:
+        return self.write_hits + self.write_misses
+
+    @classmethod
+    def for_cache(cls, cache, mem_size: int) -> "CacheStats":
+        return cls(cache.size, cache.config.sets, cache.block, mem_size)
+
+    def miss(self, blk: int):
+        # Chamado antes do access() do bloco que faltou
+        if not self.seen[blk]: kind = COMPULSORY
+        elif self.flushed[blk]: kind = FLUSH
+        elif blk in self.shadow: kind = CONFLICT
+        else: kind = CAPACITY
+        self.miss_kinds[kind] += 1
+
+    def access(self, slot: int, s: int, blk: int):
+        # Linha slot (do conjunto s) acertou ou recebeu o bloco blk
+        self.line_access[slot] += 1
+        self.set_access[s] += 1
+        self.seen[blk] = 1
+        self.flushed[blk] = 0
+        shadow = self.shadow
+        if blk in shadow: shadow.move_to_end(blk)
+        else:
+            shadow[blk] = None
+            if len(shadow) > self.lines: shadow.popitem(last=False)
+
+    def flush(self, cache):
+        # Marca os blocos que estavam na cache (o proximo miss deles e FLUSH)
+        self.flushes += 1
+        self.shadow.clear()
+        valid = cache.valid
+        if 1 not in valid: return
+        tags, dirty, ways, sb = cache.tags, cache.dirty, cache.ways, self.set_bits
+        for slot in [i for i, v in enumerate(valid) if v]:
+            self.flushed[tags[slot] << sb | slot // ways] = 1
+            if dirty[slot]:
+                self.writebacks += 1
+                self.ram_words_written += cache.block
+
+    def as_dict(self) -> dict:
+        d = {f: getattr(self, f) for f in CACHE_FIELDS}
+        d["hits"] = self.read_hits + self.write_hits
+        d["misses"] = self.read_misses + self.write_misses
+        total = self.reads + self.writes
+        d["hit_rate"] = d["hits"] / total if total else 0.0
+        d["miss_kinds"] = dict(zip(MISS_KINDS, self.miss_kinds))
+        d["line_access"] = self.line_access.tolist()
+        d["set_access"] = self.set_access.tolist()
+        return d
+
+def export_json(stats: dict, path: str):
+    """Salva o dict do MemorySystem.stats()"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=1)
+
+def export_ram_csv(stats: dict, path: str):
+    """Histograma da RAM: uma linha por endereco acessado (addr, reads, writes)"""
+    ram = stats["ram"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(("addr", "reads", "writes"))
+        for a, (r, wr) in enumerate(zip(ram["reads_by_addr"], ram["writes_by_addr"])):
+            if r or wr: w.writerow((a, r, wr))
+
+def export_cache_csv(stats: dict, path: str):
+    """Contadores das caches: uma linha por cache"""
+    cols = ("hits", "misses", "hit_rate") + CACHE_FIELDS
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(("cache",) + cols + MISS_KINDS)
+        for name in ("i_cache", "d_cache", "l2"):
+            if name not in stats: continue
+            c = stats[name]
+            w.writerow((name,) + tuple(c[k] for k in cols) + tuple(c["miss_kinds"][k] for k in MISS_KINDS))
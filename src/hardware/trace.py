@@ -0,0 +1,159 @@
+"""Trace de enderecos: grava uma vez, analisa varias configuracoes de cache.
+
+record() roda a CPU com MemorySystem.set_trace ligado e devolve um array('H')
+com uma palavra por acesso (TRACE_FETCH/TRACE_READ/TRACE_WRITE | endereco).
+Dai o mesmo trace serve pra:
+
+    stack_sweep(): analise de distancia de pilha (Mattson). Numa passada so
+                   pelo trace sai a taxa de miss LRU de todos os tamanhos e
+                   associatividades pedidos.
+    simulate():    re-executa o trace numa Cache de verdade (qualquer politica).
+
+A I-Cache ve as buscas (e perde a linha quando um dado e escrito nela, igual ao
+MemorySystem.write); a D-Cache ve leituras e escritas. A analise de pilha vale
+pra LRU com write-allocate (a escrita entra na cache como uma leitura); pra
+FIFO, RANDOM, PLRU ou sem write-allocate use simulate().
+"""
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional
+from src.common.constants import MEM_SIZE
+from src.hardware.components import Cache, CacheConfig, TRACE_FETCH, TRACE_READ, TRACE_WRITE
+
+FETCH, READ, WRITE = TRACE_FETCH >> 12, TRACE_READ >> 12, TRACE_WRITE >> 12
+CACHES = ("i", "d")
+
+# Linha invalidada na pilha LRU (ver stack_sweep)
+_HOLE = -1
+
+# Status de Cache que contam como miss
+_MISSES = {"MISS", "MISS-WB", "WR-MISS", "WR-MISS-WB"}
+
+def record(cpu, max_cycles: Optional[int] = None) -> array:
+    """Roda a CPU (cpu.run) gravando todos os acessos a memoria"""
+    trace = array('H')
+    cpu.mem.set_trace(trace)
+    try:
+        cpu.run(max_cycles)
+    finally:
+        cpu.mem.set_trace(None)
+    return trace
+
+def save(trace: array, path: str):
+    # uint16 little-endian, 2 bytes por acesso
+    a = array('H', trace)
+    if sys.byteorder == "big": a.byteswap()
+    with open(path, "wb") as f: f.write(a.tobytes())
+
+def load(path: str) -> array:
+    a = array('H')
+    with open(path, "rb") as f: a.frombytes(f.read())
+    if sys.byteorder == "big": a.byteswap()
+    return a
+
+def geometries(lines: Iterable[int], blocks: Iterable[int], ways: Iterable[int]):
+    # (linhas, bloco, vias) validos; vias 0 = totalmente associativa
+    out = []
+    for b in blocks:
+        for n in lines:
+            for w in ways:
+                w = w or n
+                if w > n or n * b > MEM_SIZE: continue
+                out.append((n, b, w))
+    return sorted(set(out), key=lambda g: (g[1], g[0], g[2]))
+
+def stack_sweep(trace: array, cache: str = "d", lines=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+                blocks=(1, 2, 4, 8), ways=(1, 2, 4, 8, 0)) -> List[Dict]:
+    """Taxa de miss LRU (write-allocate) de todas as combinacoes de linhas,
+    palavras por linha e vias (0 = totalmente associativa), numa passada so.
+
+    Cada (bloco, conjuntos) tem uma pilha LRU por conjunto; a posicao onde o
+    bloco e achado e a distancia de pilha, e uma cache com W vias acerta
+    exatamente quando a distancia e menor que W. As pilhas so guardam ate a
+    maior associatividade pedida (mais fundo ja e miss em todas). Uma linha
+    invalidada vira um buraco no lugar dela: a cache de verdade fica com a
+    linha vazia, e o proximo miss ocupa o buraco em vez de expulsar alguem.
+    """
+    if cache not in CACHES: raise ValueError(f"Cache {cache} invalida (use i ou d)")
+    geos = geometries(lines, blocks, ways)
+    # Profundidade necessaria por (bloco, conjuntos)
+    depth = {}
+    for n, b, w in geos:
+        key = (b, n // w)
+        depth[key] = max(depth.get(key, 0), w)
+    keys = sorted(depth)
+    stacks = [[[] for _ in range(s)] for b, s in keys]
+    hists = [[0] * depth[k] for k in keys]
+    shifts = [b.bit_length() - 1 for b, s in keys]
+    masks = [s - 1 for b, s in keys]
+    cfgs = list(zip(shifts, masks, stacks, [depth[k] for k in keys], hists))
+
+    icache = cache == "i"
+    n_acc = 0
+    for word in trace:
+        kind, addr = word >> 12, word & 0xFFF
+        if icache:
+            if kind == WRITE:
+                # Escrita de dado tira a linha da I-Cache (de todos os tamanhos)
+                for sh, m, st, dp, h in cfgs:
+                    blk = addr >> sh
+                    s = st[blk & m]
+                    if blk in s: s[s.index(blk)] = _HOLE
+                continue
+            if kind != FETCH: continue
+        elif kind == FETCH: continue
+        n_acc += 1
+        for sh, m, st, dp, h in cfgs:
+            blk = addr >> sh
+            s = st[blk & m]
+            try:
+                d = s.index(blk)
+            except ValueError:
+                if icache and _HOLE in s: s.remove(_HOLE) # Ocupa o buraco mais recente
+                elif len(s) == dp: s.pop()
+                s.insert(0, blk)
+                continue
+            h[d] += 1
+            if d:
+                # Buraco acima: as caches menores que d (miss) ocupam o buraco e
+                # nas maiores (acerto) ele fica, agora no lugar do bloco
+                if icache and _HOLE in s and s.index(_HOLE) < d:
+                    s[d] = _HOLE
+                    del s[s.index(_HOLE)]
+                else:
+                    del s[d]
+                s.insert(0, blk)
+
+    hist = dict(zip(keys, hists))
+    rows = []
+    for n, b, w in geos:
+        hits = sum(hist[(b, n // w)][:w])
+        rows.append(_row(cache, n, b, w, "LRU", "stack", n_acc, n_acc - hits))
+    return rows
+
+def simulate(trace: array, config: CacheConfig, cache: str = "d") -> Dict:
+    """Re-executa o trace numa Cache com essa configuracao (qualquer politica)"""
+    if cache not in CACHES: raise ValueError(f"Cache {cache} invalida (use i ou d)")
+    c = Cache(config)
+    ram = [0] * MEM_SIZE
+    read, misses, n_acc = c.read, 0, 0
+    icache = cache == "i"
+    for word in trace:
+        kind, addr = word >> 12, word & 0xFFF
+        if icache:
+            if kind == WRITE:
+                c.invalidate(addr)
+                continue
+            if kind != FETCH: continue
+            read(addr, ram)
+        elif kind == READ: read(addr, ram)
+        elif kind == WRITE: c.write(addr, 0, ram)
+        else: continue
+        n_acc += 1
+        if c.last_status in _MISSES: misses += 1
+    return _row(cache, config.lines, config.block, config.ways, config.policy, "sim", n_acc, misses)
+
+def _row(cache, lines, block, ways, policy, method, accesses, misses):
+    return {"cache": cache, "lines": lines, "block": block, "ways": ways, "policy": policy,
+            "method": method, "accesses": accesses, "misses": misses,
+            "miss_rate": misses / accesses if accesses else 0.0}
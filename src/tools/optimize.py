@@ -0,0 +1,51 @@
+"""Otimizador peephole de um programa: o que mudou e quanto economizou.
+
+Uso:
+    python -m src.tools.optimize programa.asm
+    python -m src.tools.optimize programa.asm --timing 0,10,100 --save programa.bin
+
+Monta, passa o otimizador (src/assembler/peephole.py) e roda a imagem original
+e a otimizada lado a lado na Mic1CPU: imprime cada mudanca (linha e regra), as
+palavras de codigo a menos, as instrucoes (e, com --timing, os ciclos efetivos)
+a menos e se o resultado final das duas bateu. --save grava a imagem otimizada
+(.bin, ver MemorySystem.save_image) pro runner.
+"""
+import argparse
+import sys
+from src.assembler.peephole import compare, optimize, report
+from src.hardware.components import TimingConfig
+from src.hardware.cpu import Mic1CPU
+from src.tools.runner import parse_ints
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Otimizador peephole de um programa MIC-1")
+    ap.add_argument("program", help="Arquivo .asm")
+    ap.add_argument("--max-cycles", type=int, default=1_000_000, help="Limite de instrucoes (0 = sem limite)")
+    ap.add_argument("--timing", default=None, help="Latencias L1,L2,RAM em ciclos (ex: 0,10,100)")
+    ap.add_argument("--io", action="store_true", help="Liga a E/S mapeada em memoria nas duas execucoes")
+    ap.add_argument("--input", default=None, help="Arquivo lido pela porta de entrada (implica --io)")
+    ap.add_argument("--save", metavar="ARQUIVO", help="Salva a imagem otimizada (.bin)")
+    args = ap.parse_args(argv)
+
+    try: timing = TimingConfig(*parse_ints(args.timing, 3, "--timing")) if args.timing else None
+    except ValueError as e: ap.error(str(e))
+    io_input = "" if args.io else None
+    try:
+        with open(args.program, encoding="utf-8") as f: src = f.read()
+        if args.input:
+            with open(args.input, encoding="utf-8") as f: io_input = f.read()
+    except OSError as e: ap.error(str(e))
+    res = optimize(src)
+    if res.status != "OK": ap.error(f"{args.program}: {res.status}")
+
+    cmp = compare(res, args.max_cycles or None, timing, io_input)
+    sys.stdout.write(report(res, cmp) + "\n")
+    if args.save:
+        cpu = Mic1CPU()
+        cpu.mem.load_bin(res.mc)
+        try: cpu.mem.save_image(args.save)
+        except OSError as e: ap.error(str(e))
+    return 0 if cmp.same_result else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Profile de um programa: onde foram as execucoes, os ciclos e os misses da D-Cache.
+
+Uso:
+    python -m src.tools.profile programa.asm --top 15 --by line
+    python -m src.tools.profile programa.asm --timing 0,10,100 --listing
+    python -m src.tools.profile programa.asm --stacks prog.folded   # flamegraph.pl prog.folded > prog.svg
+
+Roda o programa com o profiler ligado (src/hardware/profiler.py) e imprime a
+tabela das labels (ou linhas) mais caras; --listing imprime tambem o fonte com
+os contadores na frente de cada linha. --stacks liga a pilha sombra das
+chamadas: imprime os ciclos inclusivos/exclusivos de cada rotina e salva as
+pilhas no formato "collapsed" (flamegraph.pl, speedscope, inferno).
+"""
+import argparse
+import sys
+from src.assembler.core import assemble_with_info, source_map
+from src.hardware.components import TimingConfig
+from src.hardware.cpu import Mic1CPU
+from src.hardware.profiler import FIELDS, Profiler
+from src.tools.runner import parse_ints
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Contadores por linha e por label de um programa MIC-1")
+    ap.add_argument("program", help="Arquivo .asm")
+    ap.add_argument("--max-cycles", type=int, default=1_000_000, help="Limite de instrucoes (0 = sem limite)")
+    ap.add_argument("--timing", default=None, help="Latencias L1,L2,RAM em ciclos (ex: 0,10,100)")
+    ap.add_argument("--top", type=int, default=10, help="Linhas na tabela")
+    ap.add_argument("--by", choices=("label", "line"), default="label", help="Agrupa por label ou por linha")
+    ap.add_argument("--key", choices=FIELDS, default="cycles", help="Coluna que ordena a tabela")
+    ap.add_argument("--listing", action="store_true", help="Imprime o fonte anotado")
+    ap.add_argument("--stacks", metavar="ARQUIVO", help="Salva as pilhas de chamada (collapsed) nesse arquivo")
+    args = ap.parse_args(argv)
+
+    try: timing = TimingConfig(*parse_ints(args.timing, 3, "--timing")) if args.timing else None
+    except ValueError as e: ap.error(str(e))
+    try:
+        with open(args.program, encoding="utf-8") as f: src = f.read()
+    except OSError as e: ap.error(str(e))
+    mc, msg, symbols, lines = assemble_with_info(src)
+    if msg != "OK": ap.error(f"{args.program}: {msg}")
+
+    cpu = Mic1CPU(timing=timing)
+    cpu.mem.load_bin(mc)
+    prof = Profiler(cpu, stacks=bool(args.stacks))
+    res = cpu.run(args.max_cycles or None)
+    smap = source_map(symbols, lines)
+    sys.stdout.write(f"{res.cycles} instrucoes ({res.reason}), {cpu.effective_cycles} ciclos\n\n")
+    sys.stdout.write(prof.hotspots(smap, args.top, args.by, args.key) + "\n")
+    if args.stacks:
+        sys.stdout.write("\n" + prof.routine_table(smap, args.top) + "\n")
+        try: prof.write_collapsed(args.stacks, smap)
+        except OSError as e: ap.error(str(e))
+    if args.listing: sys.stdout.write("\n" + prof.listing(src, smap) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
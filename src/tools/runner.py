@@ -0,0 +1,210 @@
+"""Roda varios programas .asm sem interface, usando todos os nucleos.
+
+Uso:
+    python -m src.tools.runner programas/ "testes/**/*.asm" --max-cycles 100000 --dump 400-40F
+
+Cada programa e montado, carregado e executado num processo do pool. Imagens
+.bin (RAM crua, ver MemorySystem.save_image) sao mapeadas direto, sem montar.
+Cada resultado sai assim que termina, como uma linha JSON no stdout.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.assembler.cache import ImageCache
+from src.assembler.core import assemble_with_info, source_map
+from src.assembler.peephole import optimize
+from src.hardware.components import CacheConfig, MemorySystem, TimingConfig
+from src.hardware.cpu import Mic1CPU
+from src.hardware.devices import standard_io
+from src.hardware.profiler import FIELDS, Profiler
+
+# Ciclos por chamada de run() entre as checagens de timeout
+CHUNK = 20000
+
+_cpu = None # CPU "quente" de cada processo (criada uma vez so)
+_asm_cache = None # Cache de imagens montadas (--asm-cache), compartilhado entre os processos pelo disco
+
+def _init_worker(l2=None, timing=None, asm_cache=None, asm_cache_bytes=None):
+    global _cpu, _asm_cache
+    _cpu = Mic1CPU(l2=l2, timing=timing)
+    if asm_cache is not None: _asm_cache = ImageCache(asm_cache, asm_cache_bytes)
+
+def cache_info(cache):
+    return {"valid_lines": sum(cache.valid), "last_status": cache.last_status}
+
+def run_job(path, max_cycles, timeout, dump, translate=False, stats=False, ram_hash=False, io_input=None,
+            profile=0, peephole=False):
+    """Monta (ou mapeia, se for .bin) e executa um arquivo. Devolve um dict pronto pra virar JSON.
+    Com io_input (texto, pode ser vazio) liga os dispositivos padrao de E/S:
+    a entrada le desse texto e o que o programa imprimir vai em "output".
+    Com profile=N (so .asm) as N labels com mais ciclos vao em "hotspots".
+    Com peephole=True o .asm passa pelo otimizador (src/assembler/peephole.py)
+    antes do load_bin, sem o cache de imagens; o resumo vai em "peephole"."""
+    cpu = _cpu if _cpu is not None else Mic1CPU()
+    mem = cpu.mem
+    if stats and not mem.stats_enabled: mem.enable_stats()
+    out = {"file": path}
+    image = path.lower().endswith(".bin")
+    try:
+        if image: img = MemorySystem.open_image(path)
+        else:
+            with open(path, encoding="utf-8") as f: src = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        out.update(status="IO_ERROR", error=str(e))
+        return out
+
+    if not image and peephole:
+        opt = optimize(src)
+        mc, msg, symbols, lines = opt.mc, opt.status, opt.symbols, opt.lines
+        if msg != "OK":
+            out.update(status="ASM_ERROR", error=msg)
+            return out
+        out["peephole"] = {"words_saved": opt.words_saved, "changes": len(opt.changes), "skipped": opt.skipped}
+    elif not image:
+        if _asm_cache is not None:
+            hits = _asm_cache.hits
+            mc, msg, symbols, lines = _asm_cache.assemble_with_info(src)
+            out["asm_cache"] = "hit" if _asm_cache.hits > hits else "miss"
+        else: mc, msg, symbols, lines = assemble_with_info(src)
+        if msg != "OK":
+            out.update(status="ASM_ERROR", error=msg)
+            return out
+
+    # Reaproveita a CPU do processo: so reseta e recarrega a RAM
+    cpu.reset()
+    try:
+        if image: mem.load_image(img)
+        else: mem.load_bin(mc)
+    except ValueError as e:
+        out.update(status="IMAGE_ERROR", error=str(e))
+        return out
+    mem.reset_stats()
+    devs = standard_io(mem, inp=io_input) if io_input is not None else ()
+    prof = Profiler(cpu) if profile and not image else None
+
+    t0 = time.monotonic()
+    status = None
+    try:
+        while status is None:
+            left = CHUNK if max_cycles is None else min(CHUNK, max_cycles - cpu.cycle)
+            res = cpu.run(left, translate=translate)
+            if res.reason == "HALT": status = "OK"
+            elif max_cycles is not None and cpu.cycle >= max_cycles: status = "MAX_CYCLES"
+            elif timeout is not None and time.monotonic() - t0 > timeout: status = "TIMEOUT"
+    finally:
+        for d in devs: mem.detach(d)
+        if prof is not None: prof.detach()
+
+    out.update(
+        status=status,
+        cycles=cpu.cycle,
+        halt_reason=res.reason,
+        seconds=round(time.monotonic() - t0, 4),
+        cache={"i": cache_info(mem.i_cache), "d": cache_info(mem.d_cache)},
+        mem={str(a): mem.ram[a] for a in dump},
+    )
+    if mem.l2 is not None: out["cache"]["l2"] = cache_info(mem.l2)
+    if ram_hash: out["ram_hash"] = mem.ram_hash()
+    if devs: out["output"] = devs[0].text()
+    if prof is not None:
+        out["hotspots"] = [dict(zip(("label",) + FIELDS, row)) for row in prof.top(source_map(symbols, lines), profile)]
+    if mem.timing is not None:
+        out.update(stall_cycles=cpu.stall_cycles, effective_cycles=cpu.effective_cycles)
+    if stats: out["stats"] = stats_summary(mem.stats())
+    return out
+
+def stats_summary(st):
+    # So os totais (os histogramas por endereco/linha ficam de fora da linha JSON)
+    out = {k: {f: v for f, v in c.items() if not isinstance(v, list)} for k, c in st.items() if k != "ram"}
+    out["ram"] = {f: v for f, v in st["ram"].items() if not isinstance(v, list)}
+    return out
+
+def parse_ints(spec, n, what):
+    # "256,4,4" -> [256, 4, 4] (exatamente n numeros)
+    try: vals = [int(v) for v in spec.split(",")]
+    except ValueError: vals = []
+    if len(vals) != n: raise ValueError(f"{what}: esperado {n} numeros separados por virgula")
+    return vals
+
+def parse_addrs(spec):
+    # "400,0x190-0x19F" -> [400, 0x190, ..., 0x19F]
+    def num(s): return int(s, 16) if "0X" in s.upper() else int(s)
+    addrs = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            addrs.extend(range(num(lo), num(hi) + 1))
+        else:
+            addrs.append(num(part))
+    for a in addrs:
+        if not (0 <= a < 4096): raise ValueError(f"Endereco {a} fora do limite")
+    return addrs
+
+def find_sources(targets):
+    # Aceita diretorios (pega os *.asm e *.bin) e padroes glob
+    files = []
+    for t in targets:
+        if os.path.isdir(t):
+            files.extend(sorted(glob.glob(os.path.join(t, "*.asm")) + glob.glob(os.path.join(t, "*.bin"))))
+        else: files.extend(sorted(glob.glob(t, recursive=True)))
+    return list(dict.fromkeys(files)) # Tira repetidos mantendo a ordem
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Executa programas MIC-1 em lote (saida em JSON lines)")
+    ap.add_argument("targets", nargs="+", help="Diretorios ou padroes glob de arquivos .asm (ou imagens .bin)")
+    ap.add_argument("--max-cycles", type=int, default=1_000_000, help="Limite de ciclos por programa (0 = sem limite)")
+    ap.add_argument("--timeout", type=float, default=None, help="Tempo maximo por programa (s)")
+    ap.add_argument("--dump", default="", help="Enderecos da RAM no resultado (ex: 400,0x190-0x19F)")
+    ap.add_argument("--jobs", type=int, default=None, help="Numero de processos (padrao: todos os nucleos)")
+    ap.add_argument("--translate", action="store_true", help="Usa o modo de blocos traduzidos")
+    ap.add_argument("--stats", action="store_true", help="Inclui os contadores das caches e da RAM")
+    ap.add_argument("--hash", action="store_true", help="Inclui um hash da RAM final (comparar execucoes)")
+    ap.add_argument("--l2", default=None, help="L2 unificada: linhas,palavras por linha,vias (ex: 256,4,4)")
+    ap.add_argument("--timing", default=None,
+                    help="Latencias L1,L2,RAM em ciclos (ex: 0,10,100); inclui stall_cycles/effective_cycles")
+    ap.add_argument("--io", action="store_true",
+                    help="Liga a E/S mapeada em memoria (src/hardware/devices.py); a saida vai em \"output\"")
+    ap.add_argument("--input", default=None, help="Arquivo lido pela porta de entrada (implica --io)")
+    ap.add_argument("--asm-cache", default=None, metavar="DIR",
+                    help="Guarda as imagens montadas nesse diretorio (chave: hash do fonte)")
+    ap.add_argument("--asm-cache-mb", type=float, default=64, help="Tamanho maximo do --asm-cache (MB)")
+    ap.add_argument("--profile", type=int, default=0, metavar="N",
+                    help="Inclui as N labels com mais ciclos (\"hotspots\", so arquivos .asm)")
+    ap.add_argument("--optimize", action="store_true",
+                    help="Passa os .asm pelo otimizador peephole antes de carregar (resumo em \"peephole\")")
+    args = ap.parse_args(argv)
+
+    try:
+        dump = parse_addrs(args.dump)
+        l2 = CacheConfig(*parse_ints(args.l2, 3, "--l2")) if args.l2 else None
+        timing = TimingConfig(*parse_ints(args.timing, 3, "--timing")) if args.timing else None
+    except ValueError as e: ap.error(str(e))
+    io_input = "" if args.io else None
+    if args.input:
+        try:
+            with open(args.input, encoding="utf-8") as f: io_input = f.read()
+        except OSError as e: ap.error(str(e))
+    files = find_sources(args.targets)
+    if not files: ap.error("Nenhum arquivo .asm ou .bin encontrado")
+    max_cycles = args.max_cycles or None
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker, initargs=(l2, timing, args.asm_cache, int(args.asm_cache_mb * (1 << 20)))) as pool:
+        futs = {pool.submit(run_job, f, max_cycles, args.timeout, dump, args.translate, args.stats, args.hash, io_input,
+                            args.profile, args.optimize): f
+                for f in files}
+        for fut in as_completed(futs):
+            # Erro inesperado num worker vira uma linha de erro, o lote continua
+            try: res = fut.result()
+            except Exception as e: res = {"file": futs[fut], "status": "ERROR", "error": f"{type(e).__name__}: {e}"}
+            if res["status"] != "OK": failed += 1
+            sys.stdout.write(json.dumps(res) + "\n")
+            sys.stdout.flush()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Taxa de miss de varias configuracoes de cache a partir de um trace so.
+
+Uso:
+    python -m src.tools.sweep programa.asm --save-trace prog.trace
+    python -m src.tools.sweep --trace prog.trace --lines 1-256 --blocks 1,2,4 --ways 1,2,4,full --csv sweep.csv
+
+O programa roda uma vez gravando os enderecos (src/hardware/trace.py). LRU com
+write-allocate sai da analise de pilha (todas as geometrias numa passada); as
+outras politicas, ou --no-write-allocate, re-executam o trace numa Cache.
+"""
+import argparse
+import csv
+import sys
+from src.assembler.core import assemble
+from src.hardware import trace as tr
+from src.hardware.components import CacheConfig, REPL_POLICIES
+from src.hardware.cpu import Mic1CPU
+
+COLUMNS = ("cache", "lines", "block", "ways", "policy", "method", "accesses", "misses", "miss_rate")
+
+def parse_sizes(spec, allow_full=False):
+    # "1-256" -> potencias de 2 de 1 a 256; "1,2,full" -> [1, 2, 0]
+    out = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if allow_full and part.lower() == "full":
+            out.append(0)
+        elif "-" in part:
+            lo, hi = (int(v) for v in part.split("-", 1))
+            out.extend(1 << k for k in range(hi.bit_length()) if lo <= 1 << k <= hi)
+        else:
+            out.append(int(part))
+    for v in out:
+        if v and v & (v - 1): raise ValueError(f"{v} nao e potencia de 2")
+    return out
+
+def sweep(trace, caches=("i", "d"), lines=(1, 2, 4, 8, 16, 32, 64, 128, 256), blocks=(1, 2, 4, 8),
+          ways=(1, 2, 4, 8, 0), policies=("LRU",), write_allocate=True):
+    """Linhas (dicts com COLUMNS) de todas as combinacoes pedidas"""
+    rows = []
+    for cache in caches:
+        for policy in policies:
+            if policy == "LRU" and (write_allocate or cache == "i"):
+                rows.extend(tr.stack_sweep(trace, cache, lines, blocks, ways))
+                continue
+            for n, b, w in tr.geometries(lines, blocks, ways):
+                # Mapeamento direto nao tem escolha de vitima: so a LRU conta
+                if w == 1 and policy != "LRU": continue
+                cfg = CacheConfig(n, b, w, policy, write_allocate=write_allocate)
+                rows.append(tr.simulate(trace, cfg, cache))
+    return rows
+
+def write_table(rows, f):
+    f.write(f"{'cache':5} {'linhas':>6} {'bloco':>5} {'vias':>4} {'politica':8} {'metodo':6} "
+            f"{'acessos':>9} {'misses':>8} {'taxa':>7}\n")
+    for r in rows:
+        f.write(f"{r['cache']:5} {r['lines']:6} {r['block']:5} {r['ways']:4} {r['policy']:8} {r['method']:6} "
+                f"{r['accesses']:9} {r['misses']:8} {r['miss_rate']:7.2%}\n")
+
+def write_csv(rows, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=COLUMNS)
+        w.writeheader()
+        w.writerows(rows)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Taxa de miss de varias caches a partir de um trace de enderecos")
+    ap.add_argument("program", nargs="?", help="Arquivo .asm pra rodar e gravar o trace")
+    ap.add_argument("--trace", help="Usa um trace ja gravado (--save-trace) em vez de rodar o programa")
+    ap.add_argument("--save-trace", help="Salva o trace gravado nesse arquivo")
+    ap.add_argument("--max-cycles", type=int, default=1_000_000, help="Limite de instrucoes (0 = sem limite)")
+    ap.add_argument("--cache", default="i,d", help="Quais caches analisar (i, d ou i,d)")
+    ap.add_argument("--lines", default="1-256", help="Numero de linhas (ex: 1-256 ou 16,32)")
+    ap.add_argument("--blocks", default="1,2,4,8", help="Palavras por linha")
+    ap.add_argument("--ways", default="1,2,4,8,full", help="Vias (full = totalmente associativa)")
+    ap.add_argument("--policies", default="LRU", help=f"Politicas ({','.join(REPL_POLICIES)})")
+    ap.add_argument("--no-write-allocate", action="store_true", help="D-Cache sem write-allocate (so simulacao)")
+    ap.add_argument("--csv", help="Salva o resultado em CSV (senao imprime uma tabela)")
+    args = ap.parse_args(argv)
+
+    try:
+        lines, blocks = parse_sizes(args.lines), parse_sizes(args.blocks)
+        ways = parse_sizes(args.ways, allow_full=True)
+    except ValueError as e: ap.error(str(e))
+    caches = [c.strip() for c in args.cache.split(",") if c.strip()]
+    policies = [p.strip().upper() for p in args.policies.split(",") if p.strip()]
+    if any(c not in tr.CACHES for c in caches): ap.error("--cache aceita i e d")
+    if any(p not in REPL_POLICIES for p in policies): ap.error(f"--policies aceita {', '.join(REPL_POLICIES)}")
+
+    if args.trace:
+        trace = tr.load(args.trace)
+    elif args.program:
+        with open(args.program, encoding="utf-8") as f: mc, msg = assemble(f.read())
+        if msg != "OK": ap.error(f"{args.program}: {msg}")
+        cpu = Mic1CPU()
+        cpu.mem.load_bin(mc)
+        trace = tr.record(cpu, args.max_cycles or None)
+        sys.stderr.write(f"{cpu.cycle} instrucoes, {len(trace)} acessos gravados\n")
+    else:
+        ap.error("Passe um programa .asm ou --trace")
+    if args.save_trace: tr.save(trace, args.save_trace)
+
+    rows = sweep(trace, caches, lines, blocks, ways, policies, not args.no_write_allocate)
+    if args.csv: write_csv(rows, args.csv)
+    else: write_table(rows, sys.stdout)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
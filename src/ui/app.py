@@ -1,24 +1,47 @@
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
+from src.hardware.components import TimingConfig
 from src.hardware.cpu import Mic1CPU
+from src.hardware.journal import Journal
+from src.hardware.profiler import Profiler
+from src.hardware.stats import export_json, export_ram_csv, export_cache_csv
 from src.common.opcodes import Opcode, OPCODE_MAP
-from src.assembler.core import assemble
+from src.assembler.core import source_map
+from src.assembler.frontend import assemble_all
+from src.assembler.incremental import IncrementalAssembler
 from src.ui.widgets import CodeEditor
 
+# Modo turbo: a CPU roda em fatias de cpu.run() e a tela e redesenhada a cada quadro
+TURBO_FPS = 30
+TURBO_CHUNK = 2000 # Instrucoes por fatia (poucos ms, entao o Stop responde dentro do quadro)
+MAX_ERRORS_SHOWN = 20 # Erros de montagem listados na janela
+
 class Mic1GUI:
     """Interface Principal do Simulador"""
-    def __init__(self, root):
+    def __init__(self, root, i_cache=None, d_cache=None, l2=None, timing=None):
         self.root = root
         self.root.title("Simulador MIC-1")
         self.root.geometry("1400x900")
         
-        self.cpu = Mic1CPU()
+        # Configuracao das caches (CacheConfig ou None = padrao), L2 opcional e latencias (TimingConfig)
+        self.cpu = Mic1CPU(i_cache, d_cache, l2, timing)
+        self.timing = timing or TimingConfig() # Usado quando liga "Tempo" na interface
+        self.journal = Journal(self.cpu) # Historico pro "Step Back"
+        # Montador incremental: "Montar" so re-monta as linhas editadas
+        self.asm = IncrementalAssembler()
+        self.asm_ram = None # RAM logo depois da ultima montagem (pra aplicar so o patch)
+        self.profiler = None # Contadores por linha ("Perfil": pinta o numero das linhas no editor)
+        self.smap = {} # Endereco -> (linha, label) da ultima montagem sem erro (source_map)
         self.running = False
         self.hex_mode = True # Comeca mostrando em Hex
         self.speed = 500
         self.job = None
         self.reset_job = None
+        self.turbo_job = None
+        self.ram_shown = None # Copia da RAM do ultimo quadro do turbo
         self.u_step = 0 # Contador de micro-passos (0 a 4)
+        self.bp_resume = False # Pula a checagem de breakpoint na primeira instrucao
         
         self.follow_pc = tk.BooleanVar(value=True)
         self.interacting = False 
@@ -107,7 +130,9 @@ Fim:
         btns = ttk.Frame(ctrl)
         btns.pack(fill=tk.X)
         ttk.Button(btns, text="Run", command=self.toggle_run).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btns, text="Turbo", command=self.do_turbo).pack(side=tk.LEFT, padx=2)
         ttk.Button(btns, text="Step", command=self.do_step).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btns, text="Step Back", command=self.do_step_back).pack(side=tk.LEFT, padx=2)
         ttk.Button(btns, text="Stop", command=self.do_stop).pack(side=tk.LEFT, padx=2)
         ttk.Button(btns, text="Reset", command=self.do_reset).pack(side=tk.LEFT, padx=2)
         
@@ -126,35 +151,43 @@ Fim:
         self.lbl_phase.pack(side=tk.RIGHT, padx=5)
 
         # Caches
-        c_fr = ttk.LabelFrame(rhs, text="L1 Cache (Instrucao e Dados)")
+        l2 = self.cpu.mem.l2
+        c_fr = ttk.LabelFrame(rhs, text="L1 Cache (Instrucao e Dados)" if l2 is None else "Caches (L1 I/D + L2)")
         c_fr.pack(fill=tk.X, padx=5, pady=5)
         split = ttk.Frame(c_fr)
         split.pack(fill=tk.X)
-        headers = ("V", "Tag", "Dado")
         
-        # I-Cache
-        i_fr = ttk.Frame(split)
-        i_fr.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=2)
-        ttk.Label(i_fr, text="I-Cache", font=("Arial", 8)).pack()
-        self.i_tree = ttk.Treeview(i_fr, columns=headers, show="headings", height=8)
-        for h in headers: 
-            self.i_tree.heading(h, text=h)
-            self.i_tree.column(h, width=35, anchor="center")
-        self.i_tree.pack(fill=tk.BOTH, expand=True)
-
-        # D-Cache
-        d_fr = ttk.Frame(split)
-        d_fr.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=2)
-        ttk.Label(d_fr, text="D-Cache", font=("Arial", 8)).pack()
-        self.d_tree = ttk.Treeview(d_fr, columns=headers, show="headings", height=8)
-        for h in headers: 
-            self.d_tree.heading(h, text=h)
-            self.d_tree.column(h, width=35, anchor="center")
-        self.d_tree.pack(fill=tk.BOTH, expand=True)
+        # Uma tabela por cache, com as colunas e o tamanho da configuracao dela
+        self.i_tree = self.make_cache_tree(split, self.cpu.mem.i_cache)
+        self.d_tree = self.make_cache_tree(split, self.cpu.mem.d_cache)
+        self.l2_tree = None
+        if l2 is not None:
+            l2_fr = ttk.Frame(c_fr)
+            l2_fr.pack(fill=tk.X)
+            self.l2_tree = self.make_cache_tree(l2_fr, l2)
         
         self.lbl_cache = ttk.Label(c_fr, text="Status: --", foreground="blue")
         self.lbl_cache.pack()
 
+        # Contadores de desempenho (desligados deixam o Turbo mais rapido)
+        st_fr = ttk.Frame(c_fr)
+        st_fr.pack()
+        self.stats_on = tk.BooleanVar(value=False)
+        ttk.Checkbutton(st_fr, text="Contadores", variable=self.stats_on, command=self.toggle_stats).pack(side=tk.LEFT)
+        ttk.Button(st_fr, text="Exportar...", command=self.export_stats).pack(side=tk.LEFT, padx=2)
+        # Modo didatico antigo (limpa a I-Cache a cada escrita) e detector de codigo auto-modificavel
+        self.icache_flush = tk.BooleanVar(value=False)
+        ttk.Checkbutton(st_fr, text="Flush I-Cache", variable=self.icache_flush,
+                        command=lambda: setattr(self.cpu.mem, "flush_icache_on_write", self.icache_flush.get())).pack(side=tk.LEFT)
+        self.smc_on = tk.BooleanVar(value=False)
+        ttk.Checkbutton(st_fr, text="SMC", variable=self.smc_on,
+                        command=lambda: self.cpu.mem.set_smc_detect(self.smc_on.get())).pack(side=tk.LEFT)
+        # Modelo de tempo: mostra ciclos de espera e efetivos na linha de Ciclos
+        self.timing_on = tk.BooleanVar(value=self.cpu.mem.timing is not None)
+        ttk.Checkbutton(st_fr, text="Tempo", variable=self.timing_on, command=self.toggle_timing).pack(side=tk.LEFT)
+        self.prof_on = tk.BooleanVar(value=False)
+        ttk.Checkbutton(st_fr, text="Perfil", variable=self.prof_on, command=self.toggle_profile).pack(side=tk.LEFT)
+
         # RAM
         mem_fr = ttk.LabelFrame(rhs, text="Memoria RAM")
         mem_fr.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -171,9 +204,33 @@ Fim:
         sb.config(command=self.mem_list.yview)
         
         self.mem_list.bind("<Double-Button-1>", self.edit_mem)
+        self.mem_list.bind("<Button-3>", self.toggle_break)
+        self.mem_list.bind("<Shift-Button-3>", self.toggle_watch)
         self.mem_list.bind("<Enter>", lambda e: self.set_int(True))
         self.mem_list.bind("<Leave>", lambda e: self.set_int(False))
 
+    def make_cache_tree(self, parent, cache):
+        cfg = cache.config
+        headers = (("Conj",) if cfg.ways > 1 else ()) + ("V",) + (("D",) if cfg.write_back else ()) + ("Tag", "Dado")
+        fr = ttk.Frame(parent)
+        fr.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=2)
+        ttk.Label(fr, text=f"{cache.name} ({cfg.lines}x{cfg.block}, {cfg.ways} via(s))", font=("Arial", 8)).pack()
+        tree = ttk.Treeview(fr, columns=headers, show="headings", height=min(cfg.lines, 8))
+        for h in headers: 
+            tree.heading(h, text=h)
+            tree.column(h, width=35 * min(cfg.block, 4) if h == "Dado" else 35, anchor="center")
+        tree.pack(fill=tk.BOTH, expand=True)
+        return tree
+
+    def cache_rows(self, cache):
+        # Valores de cada linha na ordem das colunas do make_cache_tree
+        cfg = cache.config
+        for slot in range(cache.size):
+            valid, dirty, tag, words = cache.line(slot)
+            row = (f"{slot // cfg.ways}.{slot % cfg.ways}",) if cfg.ways > 1 else ()
+            row += ("1" if valid else "0",) + (("1" if dirty else "0",) if cfg.write_back else ())
+            yield row + (f"{tag:02X}", " ".join(self.fval(w) for w in words))
+
     # --- Logica da GUI ---
 
     def set_int(self, val): self.interacting = val
@@ -454,6 +511,8 @@ Fim:
             if acc: c = "#fff9c4"
             elif pc: c = "#bbdefb"
             elif sp: c = "#ffcdd2"
+            elif self.cpu.breakpoints.pc[idx]: c = "#e1bee7"
+            elif self.cpu.breakpoints.watching(idx): c = "#c8e6c9"
             self.mem_list.itemconfig(idx, {'bg': c})
         except: pass
 
@@ -480,6 +539,9 @@ Fim:
             for i in range(4096):
                 val = self.cpu.mem.ram[i]
                 self.mem_list.insert(tk.END, f"[{i:03X}]: {self.fval(val)}")
+            bp = self.cpu.breakpoints
+            for i in range(4096):
+                if bp.pc[i] or bp.watching(i): self.update_mem_row(i)
             
             if 0 <= cpc < 4096: self.update_mem_row(cpc, pc=True)
             if 0 <= csp < 4096: self.update_mem_row(csp, sp=True)
@@ -493,15 +555,23 @@ Fim:
         self.last_pc, self.last_sp, self.last_acc = cpc, csp, caddr
 
         # Atualiza arvores da Cache
-        for t in [self.i_tree, self.d_tree]:
+        mem = self.cpu.mem
+        for t, cache in ((self.i_tree, mem.i_cache), (self.d_tree, mem.d_cache), (self.l2_tree, mem.l2)):
+            if t is None: continue
             for x in t.get_children(): t.delete(x)
-
-        for l in self.cpu.mem.i_cache.lines:
-            self.i_tree.insert("", "end", values=("1" if l.valid else "0", f"{l.tag:02X}", self.fval(l.data)))
-        for l in self.cpu.mem.d_cache.lines:
-            self.d_tree.insert("", "end", values=("1" if l.valid else "0", f"{l.tag:02X}", self.fval(l.data)))
-
-        self.lbl_cache.config(text=f"I: {self.cpu.mem.i_cache.last_status} | D: {self.cpu.mem.d_cache.last_status}")
+            for row in self.cache_rows(cache): t.insert("", "end", values=row)
+
+        txt = f"I: {mem.i_cache.last_status} | D: {mem.d_cache.last_status}"
+        if mem.l2 is not None: txt += f" | L2: {mem.l2.last_status}"
+        if self.cpu.mem.stats_enabled:
+            i, d = self.cpu.mem.i_cache.stats, self.cpu.mem.d_cache.stats
+            rate = lambda s: (s.read_hits + s.write_hits) / max(1, s.reads + s.writes)
+            txt += f"  (acertos I {rate(i):.0%} D {rate(d):.0%})"
+        if self.cpu.mem.smc_count:
+            addr, old, new = self.cpu.mem.smc_hits[-1]
+            txt += f"  SMC x{self.cpu.mem.smc_count} [{addr:03X}] {old:04X}->{new:04X}"
+        self.lbl_cache.config(text=txt)
+        if self.profiler is not None: self.refresh_heat()
 
     def refresh_vals(self):
         # Atualiza os valores dentro dos retangulos
@@ -511,7 +581,10 @@ Fim:
                 self.canvas.itemconfig(self.reg_txt[name], text=self.fval(v))
         
         self.canvas.itemconfig(self.sig_lbl, text=self.cpu.ctrl_sig)
-        self.lbl_stats.config(text=f"Ciclos: {self.cpu.cycle} | N={int(self.cpu.alu.n)} Z={int(self.cpu.alu.z)}")
+        txt = f"Ciclos: {self.cpu.cycle}"
+        if self.cpu.mem.timing is not None:
+            txt += f" (efetivos {self.cpu.effective_cycles}, espera {self.cpu.stall_cycles})"
+        self.lbl_stats.config(text=f"{txt} | N={int(self.cpu.alu.n)} Z={int(self.cpu.alu.z)}")
         self.hl_wires()
 
     def edit_mem(self, event):
@@ -525,19 +598,63 @@ Fim:
         if res:
             try:
                 val = int(res, 16) if "0X" in res.upper() else int(res)
+                self.journal.clear() # Edicao manual nao entra no historico
                 self.cpu.mem.write(addr, val)
                 self.update_mem_row(addr, addr==self.cpu.pc.value, addr==self.cpu.sp.value, True)
             except: messagebox.showerror("Erro", "Valor invalido")
 
+    def toggle_break(self, event):
+        # Botao direito liga/desliga breakpoint no endereco
+        addr = self.mem_list.nearest(event.y)
+        self.cpu.breakpoints.toggle(addr)
+        self.update_mem_row(addr, addr==self.cpu.pc.value, addr==self.cpu.sp.value)
+
+    def toggle_watch(self, event):
+        # Shift + botao direito vigia leitura e escrita no endereco
+        addr = self.mem_list.nearest(event.y)
+        bp = self.cpu.breakpoints
+        if bp.watching(addr): bp.unwatch(addr)
+        else: bp.watch(addr, read=True, write=True)
+        self.update_mem_row(addr, addr==self.cpu.pc.value, addr==self.cpu.sp.value)
+
+    def show_asm_errors(self, errors):
+        # Lista todos os erros e poe o cursor no primeiro
+        first = errors[0]
+        self.editor.area.mark_set("insert", f"{first.line}.{first.col}")
+        self.editor.area.see("insert")
+        msg = "\n".join(e.msg for e in errors[:MAX_ERRORS_SHOWN])
+        if len(errors) > MAX_ERRORS_SHOWN: msg += f"\n... e mais {len(errors) - MAX_ERRORS_SHOWN}"
+        messagebox.showerror("Erro no Assembler", msg)
+
     def do_assemble(self):
-        mc, msg = assemble(self.editor.get_src())
+        src = self.editor.get_src()
+        patch, msg = self.asm.update(src)
         if msg != "OK":
-            messagebox.showerror("Erro no Assembler", msg)
+            self.show_asm_errors(assemble_all(src).errors)
             return
-        self.do_reset()
-        self.cpu.mem.load_bin(mc)
-        self.update_ui(full=True)
-        messagebox.showinfo("Assembler", f"Compilado com sucesso: {len(mc)} palavras.")
+        mem = self.cpu.mem
+        stale = {self.last_pc, self.last_sp, self.last_acc}
+        # RAM ainda igual a da ultima montagem: so aplica o patch
+        same = self.asm_ram is not None and mem.ram == self.asm_ram
+        self.do_reset(full=False)
+        if same:
+            rows = [a for a in patch if 0 <= a < len(mem.ram)]
+            for a in rows: mem.poke(a, patch[a])
+        else:
+            # Programa escreveu na RAM (ou primeira montagem): recarrega e
+            # atualiza as linhas que mudaram (em fatias de 64, igual ao sync_frame)
+            old = mem.ram
+            mem.load_bin(self.asm.mc)
+            ram = mem.ram
+            rows = [i for base in range(0, len(ram), 64) if ram[base:base + 64] != old[base:base + 64]
+                    for i in range(base, min(base + 64, len(ram))) if ram[i] != old[i]]
+        self.asm_ram = mem.ram[:]
+        self.smap = source_map(self.asm.symbols, self.asm.line_map())
+        mem.reset_stats()
+        self.journal.clear()
+        for a in stale.union(rows): self.update_mem_row(a)
+        self.update_ui()
+        messagebox.showinfo("Assembler", f"Compilado com sucesso: {len(self.asm.mc)} palavras ({len(rows)} alteradas).")
 
     def micro_step(self):
         # Maquina de estados dos micro-passos
@@ -547,6 +664,7 @@ Fim:
 
         if self.u_step == 0:
             self.u_step = 1
+            self.journal.record(self.journal.cpu_regs()) # Estado antes da instrucao
             self.cpu.fetch() 
             self.update_ui()
             return False
@@ -574,27 +692,146 @@ Fim:
         if self.running: return 
         self.micro_step()
 
+    def do_step_back(self):
+        # No meio de uma instrucao volta pro comeco dela, senao desfaz a anterior
+        if self.running: return
+        if not self.journal.step_back():
+            self.lbl_phase.config(text="SEM HISTORICO")
+            return
+        self.u_step = 0
+        self.clear_wires()
+        self.update_ui(full=True)
+        self.lbl_phase.config(text="VOLTOU")
+
     def toggle_run(self):
         if not self.running:
             self.running = True
+            self.bp_resume = self.u_step == 0 # Nao para de novo no breakpoint onde ja esta
+            self.cpu.mem.watch_hit = None
             self.loop()
 
     def loop(self):
         if not self.running or self.cpu.halted:
             self.running = False
             return
+        bp = self.cpu.breakpoints
+        if self.u_step == 0:
+            r = self.cpu.regs
+            hit = None if self.bp_resume else bp.check(r.pc, r.sp, r.h)
+            self.bp_resume = False
+            if hit: return self.stop_at(hit)
+            self.cpu.mem.watch_hit = None
         self.micro_step()
+        if self.u_step == 4 and bp.has_watch:
+            hit = bp.take_watch_hit()
+            if hit: return self.stop_at(hit)
         if self.follow_pc.get() and not self.interacting:
              self.mem_list.see(self.cpu.pc.value)
         self.root.after(self.speed, self.loop)
 
+    def stop_at(self, hit):
+        # Parou num breakpoint/watchpoint: mostra o motivo e deixa o resto como esta
+        self.running = False
+        self.cpu.breakpoints.hit = hit
+        self.lbl_phase.config(text=str(hit))
+        if hit.addr >= 0: self.mem_list.see(hit.addr)
+
+    def do_turbo(self):
+        # Roda em velocidade maxima ate HALT, breakpoint ou Stop
+        if self.running: return
+        while self.u_step and not self.cpu.halted: self.micro_step() # Termina a instrucao atual
+        if self.cpu.halted: return
+        self.running = True
+        self.turbo_resume = True # Nao para de novo no breakpoint onde ja esta
+        self.clear_wires()
+        self.ram_shown = self.cpu.mem.ram[:]
+        self.turbo_frame()
+
+    def turbo_frame(self):
+        self.turbo_job = None
+        if not self.running: return
+        # Gasta o tempo de um quadro em fatias e so depois redesenha. Como tudo roda
+        # na thread do Tk, a tela sempre mostra o estado entre duas instrucoes
+        t0 = time.perf_counter()
+        end = t0 + 1 / TURBO_FPS
+        n = 0
+        while True:
+            res = self.cpu.run(TURBO_CHUNK, resume=self.turbo_resume)
+            self.turbo_resume = False
+            n += res.cycles
+            if res.reason != "MAX_CYCLES" or time.perf_counter() >= end: break
+        self.sync_frame()
+        if res.reason == "BREAK": return self.stop_at(self.cpu.breakpoints.hit)
+        if res.reason == "HALT":
+            self.running = False
+            self.lbl_phase.config(text="HALT")
+            return
+        self.lbl_phase.config(text=f"TURBO {n / (time.perf_counter() - t0):,.0f} instr/s")
+        self.turbo_job = self.root.after(1, self.turbo_frame)
+
+    def sync_frame(self):
+        # Atualiza so as linhas da RAM que mudaram desde o ultimo quadro
+        # (compara em fatias de 64 palavras: array contra array e em C)
+        ram, old = self.cpu.mem.ram, self.ram_shown
+        for base in range(0, len(ram), 64):
+            if ram[base:base + 64] != old[base:base + 64]:
+                for i in range(base, min(base + 64, len(ram))):
+                    if ram[i] != old[i]: self.update_mem_row(i)
+        self.ram_shown = ram[:]
+        self.update_ui()
+
+    def toggle_stats(self):
+        self.cpu.mem.enable_stats(self.stats_on.get())
+        self.update_ui()
+
+    def toggle_profile(self):
+        # Liga/desliga o profiler; ligado, o editor mostra as linhas com mais ciclos
+        if self.prof_on.get():
+            self.profiler = Profiler(self.cpu)
+        else:
+            self.profiler.detach()
+            self.profiler = None
+            self.editor.set_heat({})
+        self.update_ui()
+
+    def refresh_heat(self):
+        # Roda a cada quadro: o mapa e o da ultima montagem sem erro (linhas
+        # editadas depois ficam defasadas ate montar de novo)
+        self.editor.set_heat(self.profiler.line_heat(self.smap))
+
+    def toggle_timing(self):
+        # Liga/desliga as latencias; a espera recomeca do zero e o historico
+        # antigo (gravado com outro modelo) e esquecido
+        self.cpu.mem.set_timing(self.timing if self.timing_on.get() else None)
+        self.cpu.mem.reset_stall()
+        self.journal.clear()
+        self.refresh_vals()
+
+    def export_stats(self):
+        # Salva os contadores em JSON (tudo) ou CSV (histograma da RAM + resumo das caches)
+        st = self.cpu.mem.stats()
+        if not st:
+            messagebox.showinfo("Contadores", "Ligue os contadores e rode o programa antes de exportar.")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+        if not path: return
+        if path.lower().endswith(".csv"):
+            export_ram_csv(st, path)
+            export_cache_csv(st, path[:-4] + "_caches.csv")
+        else:
+            export_json(st, path)
+
     def do_stop(self): 
         self.running = False
+        if self.turbo_job:
+            self.root.after_cancel(self.turbo_job)
+            self.turbo_job = None
         self.clear_wires()
         self.lbl_phase.config(text="PAUSA")
         self.update_ui(full=True)
     
-    def do_reset(self):
+    def do_reset(self, full=True):
         self.do_stop()
         if self.reset_job: self.root.after_cancel(self.reset_job)
         if self.job: self.root.after_cancel(self.job)
@@ -605,4 +842,8 @@ Fim:
         self.u_step = 0
         self.lbl_phase.config(text="IDLE")
         self.cpu.reset()
-        self.update_ui(full=True)
\ No newline at end of file
+        self.cpu.mem.reset_stats()
+        if self.profiler is not None: self.profiler.clear()
+        self.cpu.mem.set_smc_detect(self.smc_on.get())
+        self.journal.clear()
+        self.update_ui(full=full)
\ No newline at end of file
@@ -1,6 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
-from src.common.opcodes import OPCODE_MAP
+from src.assembler.frontend import COMMENT, DIRECTIVE, LABEL, MNEMONIC, NUMBER, tokens
+
+# Tipo de token -> tag de cor do editor
+HL_TAGS = {MNEMONIC: "kw", NUMBER: "num", COMMENT: "com", LABEL: "lbl", DIRECTIVE: "dir"}
+# Fundo do numero da linha no modo "Perfil" (frio -> quente)
+HEAT_COLORS = ("#fff5cc", "#ffe08a", "#ffb65c", "#ff8040", "#e04020")
 
 class CodeEditor(tk.Frame):
     """Editor customizado com numeros de linha e cores"""
@@ -31,6 +36,8 @@ class CodeEditor(tk.Frame):
         self.area.tag_configure("com", foreground="#008000") 
         self.area.tag_configure("lbl", foreground="#800080", font=("Consolas", 10, "bold"))
         self.area.tag_configure("dir", foreground="#804000", font=("Consolas", 10, "bold"))
+        for k, color in enumerate(HEAT_COLORS): self.linenum.tag_configure(f"heat{k}", background=color)
+        self.heat = {}
 
         # Bind pra atualizar cores quando digita
         self.area.bind("<<Change>>", self.on_change)
@@ -62,43 +69,28 @@ class CodeEditor(tk.Frame):
             self.linenum.insert('1.0', content)
             self.linenum.config(state='disabled')
             self.last_lines = lines
+            if self.heat: self.set_heat(self.heat)
         self.linenum.yview_moveto(self.area.yview()[0])
 
+    def set_heat(self, heat):
+        # Pinta o numero de cada linha pela fracao (0..1] da linha mais quente ({} apaga)
+        self.heat = heat
+        n = len(HEAT_COLORS)
+        spans = [[] for _ in range(n)]
+        for lno, f in heat.items(): spans[min(int(f * n), n - 1)] += (f"{lno}.0", f"{lno}.end")
+        for k, idx in enumerate(spans):
+            self.linenum.tag_remove(f"heat{k}", "1.0", tk.END)
+            if idx: self.linenum.tag_add(f"heat{k}", *idx)
+
     def highlight(self):
-        # Remove tags antigas
-        for tag in ["kw", "num", "com", "lbl", "dir"]:
+        # Um tokens() do texto todo e um tag_add por cor (sem search do Tk por palavra)
+        spans = {tag: [] for tag in HL_TAGS.values()}
+        for t in tokens(self.area.get("1.0", "end-1c")):
+            tag = HL_TAGS.get(t.kind)
+            if tag: spans[tag] += (f"{t.line}.{t.col}", f"{t.line}.{t.end}")
+        for tag, idx in spans.items():
             self.area.tag_remove(tag, "1.0", tk.END)
-        
-        kws = list(OPCODE_MAP.keys())
-        
-        # Pinta comentarios (;)
-        start = "1.0"
-        while True:
-            pos = self.area.search(';', start, stopindex=tk.END)
-            if not pos: break
-            eol = self.area.index(f"{pos} lineend")
-            self.area.tag_add("com", pos, eol)
-            start = eol
-
-        # Pinta palavras reservadas e numeros
-        start = "1.0"
-        while True:
-            pos = self.area.search(r'[\.\w]+', start, stopindex=tk.END, regexp=True)
-            if not pos: break
-            end = f"{pos} wordend"
-            word = self.area.get(pos, end).upper()
-            
-            if "com" not in self.area.tag_names(pos): # Ignora se for comentario
-                if word in kws:
-                    self.area.tag_add("kw", pos, end)
-                elif word.startswith("."):
-                     self.area.tag_add("dir", pos, end)
-                elif word.isdigit() or (word.startswith('0X') and len(word)>2):
-                    self.area.tag_add("num", pos, end)
-                else:
-                    if self.area.get(end, f"{end}+1c") == ':':
-                        self.area.tag_add("lbl", pos, f"{end}+1c")
-            start = end
+            if idx: self.area.tag_add(tag, *idx)
 
     def get_src(self): return self.area.get("1.0", tk.END)
     def set_src(self, text):